@@ -1,6 +1,15 @@
+"""АЛУ.
+
+По умолчанию (`word_width=None`) значения - неограниченные целые Python, `DIV` и `MOD`
+округляют вниз, как `//` и `%`. С заданной разрядностью операнды и результат - слова
+в дополнительном коде: арифметика заворачивается по модулю `2 ** word_width`,
+`DIV` и `MOD` округляют к нулю, выставляются флаги переноса и переполнения.
+Деление на ноль в обоих режимах вызывает `DivisionByZeroError`.
+"""
+
 from __future__ import annotations
 
-from typing import Callable
+from collections.abc import Callable
 
 from isa import Opcode
 
@@ -13,6 +22,24 @@ operations: dict[Opcode, Callable[[int, int], int]] = {
     Opcode.CMP: lambda x, y: x - y,
 }
 
+DIVISIONS = frozenset({Opcode.DIV, Opcode.MOD})
+
+
+def truncating_div(x: int, y: int) -> int:
+    quotient = abs(x) // abs(y)
+    return quotient if (x < 0) == (y < 0) else -quotient
+
+
+fixed_operations: dict[Opcode, Callable[[int, int], int]] = {
+    **operations,
+    Opcode.DIV: truncating_div,
+    Opcode.MOD: lambda x, y: x - truncating_div(x, y) * y,
+}
+
+
+class DivisionByZeroError(ZeroDivisionError):
+    """Аппаратное исключение: `DIV` или `MOD` на ноль. Машина останавливается с причиной `trap`."""
+
 
 class ALU:
     right = 0
@@ -20,9 +47,20 @@ class ALU:
     out = 0
     negative = False
     zero = True
+    carry = False
+    overflow = False
+
+    def __init__(self, word_width: int | None = None):
+        assert word_width is None or word_width > 1, "word width should be at least 2 bits"
+        self.word_width = word_width
+        self.mask = (1 << word_width) - 1 if word_width is not None else -1
+        self.sign = 1 << (word_width - 1) if word_width is not None else 0
 
-    def __init__(self):
-        pass
+    def wrap(self, value: int) -> int:
+        """Значение как слово АЛУ (без изменений, если разрядность не задана)."""
+        if self.word_width is None:
+            return value
+        return ((value + self.sign) & self.mask) - self.sign
 
     def signal_sel_left(self, buffer: int, signal: bool):
         self.left = buffer if signal else 0
@@ -31,8 +69,32 @@ class ALU:
         self.right = accumulator if signal else 0
 
     def signal_alu_operation(self, operation: Opcode):
-        out = operations[operation](self.right, self.left)
+        if self.word_width is None:
+            if self.left == 0 and operation in DIVISIONS:
+                raise DivisionByZeroError()
+            out = operations[operation](self.right, self.left)
+        else:
+            out = self._fixed_operation(operation)
         if operation is not Opcode.CMP:
             self.out = out
         self.negative = out < 0
         self.zero = out == 0
+
+    def _fixed_operation(self, operation: Opcode) -> int:
+        """Операция над словами: результат заворачивается, перенос считается по беззнаковым значениям,
+        переполнение - по знаковым.
+        """
+        right, left = self.wrap(self.right), self.wrap(self.left)
+        if left == 0 and operation in DIVISIONS:
+            raise DivisionByZeroError()
+        exact = fixed_operations[operation](right, left)
+        out = self.wrap(exact)
+        unsigned_right, unsigned_left = right & self.mask, left & self.mask
+        if operation is Opcode.ADD:
+            self.carry = unsigned_right + unsigned_left > self.mask
+        elif operation in {Opcode.SUB, Opcode.CMP}:
+            self.carry = unsigned_right < unsigned_left
+        else:
+            self.carry = operation is Opcode.MUL and unsigned_right * unsigned_left > self.mask
+        self.overflow = out != exact
+        return out
@@ -0,0 +1,356 @@
+"""Предварительная компиляция программы в модуль Python.
+
+Код программы разбивается на блоки, каждый блок превращается в линейный код на Python,
+который держит аккумулятор и флаги в локальных переменных, а переходы с непосредственной
+адресацией становятся присваиванием константы в `pc`. Модуль содержит функцию `run(m, budget)`,
+которая исполняет блоки, пока PC указывает на начало блока, и возвращает количество инструкций и тактов.
+
+Инструкции, которые не компилируются (`HLT`, `FAA`, переходы по адресу из памяти, обращения
+к портам через указатель), исполняет интерпретатор `FastMachine`. Он же исполняет инструкцию,
+если во время исполнения блока оказалось, что указатель ведет в порт или за пределы памяти,
+делитель равен нулю, буфер ввода пуст, значение для вывода не является символом
+или запись попадает в скомпилированный код:
+блок выходит перед такой инструкцией с точными счетчиками. Блоки, чей код перезаписан, больше не исполняются.
+
+Сгенерированные модули кэшируются на диске по хэшу машинного кода.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from types import ModuleType
+
+from alu import DivisionByZeroError
+from fast_machine import FastMachine
+from isa import Addressing, Instruction, Opcode, instruction_ticks, is_arithmetic_instruction, read_json
+from machine import DEFAULT_SPACE, INPUT_PORT, MEMORY_SIZE, OUTPUT_PORT, DataPath
+from translator import convert_to_json
+
+# меняется вместе с генерируемым кодом, чтобы не загружать устаревшие модули из кэша
+GENERATOR_VERSION = 2
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("CSA_AOT_CACHE", Path.home() / ".cache" / "csa-aot"))
+
+OPERATORS = {
+    Opcode.ADD: "+",
+    Opcode.SUB: "-",
+    Opcode.MUL: "*",
+    Opcode.DIV: "//",
+    Opcode.MOD: "%",
+    Opcode.CMP: "-",
+}
+
+
+def _is_memory(address: int | None) -> bool:
+    return address is not None and 0 <= address < MEMORY_SIZE
+
+
+def _is_compilable(instruction: Instruction) -> bool:
+    opcode, arg, addressing = instruction
+    if opcode in {Opcode.JMP, Opcode.JZ}:
+        return addressing is Addressing.IMMEDIATE and arg is not None
+    if opcode is not Opcode.LD and opcode is not Opcode.ST and not is_arithmetic_instruction(opcode):
+        return False
+    if addressing is Addressing.IMMEDIATE:
+        if opcode is Opcode.ST:
+            return arg == OUTPUT_PORT or _is_memory(arg)
+        return arg is not None and not (arg == 0 and opcode in {Opcode.DIV, Opcode.MOD})
+    if addressing is Addressing.DIRECT:
+        return _is_memory(arg) or (arg == INPUT_PORT and opcode is not Opcode.ST)
+    return _is_memory(arg)
+
+
+class _Block:
+    """Генерация кода одного блока. `exit_lines` - выход из блока перед инструкцией с адресом `address`."""
+
+    def __init__(self, memory: Sequence[Instruction], start: int, end: int, cover: set[int]):
+        self.memory = memory
+        self.start = start
+        self.end = end
+        self.cover = cover
+        self.instructions = 0
+        self.ticks = 0
+        self.lines: list[str] = []
+
+    def exit_lines(self, address: int) -> list[str]:
+        counters = [f"    n += {self.instructions}", f"    t += {self.ticks}"] if self.instructions else []
+        return [*counters, f"    pc = {address}", "    break"]
+
+    def guard(self, condition: str, address: int):
+        self.lines += [f"if {condition}:", *self.exit_lines(address)]
+
+    def operand(self, instruction: Instruction, address: int) -> str:
+        """Код выборки операнда; возвращает выражение со значением `MEM_OUT`.
+
+        Символ из порта ввода проверяется до чтения: после выхода из блока его прочитает интерпретатор.
+        Ячейка без аргумента (инструкция вроде `HLT`) тоже исполняется интерпретатором. Запись всегда
+        кладет в ячейку число, поэтому для прямой адресации проверка нужна, только если аргумента нет при загрузке.
+        """
+        arg = instruction.arg
+        if instruction.addressing is Addressing.IMMEDIATE:
+            return str(arg)
+        if instruction.addressing is Addressing.DIRECT and arg == INPUT_PORT:
+            divides = instruction.opcode in {Opcode.DIV, Opcode.MOD}
+            self.guard('not dp.input or dp.input[0] == "\\0"' if divides else "not dp.input", address)
+            self.lines += ["v = ord(dp.input[0])", "dp.input = dp.input[1:]"]
+            return "v"
+        if instruction.addressing is Addressing.DIRECT:
+            if arg >= len(self.memory) or self.memory[arg].arg is not None:  # type: ignore[operator, index]
+                return f"mem[{arg}].arg"
+            self.lines += [f"v = mem[{arg}].arg"]
+        else:
+            self.lines += [f"p = mem[{arg}].arg"]
+            self.guard(f"p is None or not 0 <= p < {MEMORY_SIZE}", address)
+            self.lines += ["v = mem[p].arg"]
+        self.guard("v is None", address)
+        return "v"
+
+    def store(self, instruction: Instruction, address: int) -> bool:
+        """Код `ST`. Возвращает True, если запись попала в скомпилированный код и блок нужно завершить."""
+        target = self.operand(instruction, address)
+        if instruction.addressing is Addressing.IMMEDIATE:
+            if instruction.arg == OUTPUT_PORT:
+                self.guard(f"not 0 <= acc <= {sys.maxunicode}", address)
+            self.lines += ["out = acc", "zero = acc == 0", "negative = acc < 0"]
+            if instruction.arg == OUTPUT_PORT:
+                self.lines += ["output.append(chr(acc))"]
+                return False
+            if instruction.arg in self.cover:
+                self.lines += [f"m.write({target}, acc)"]
+                return True
+            self.lines += [f"mem[{target}] = Instruction(VAR, acc)"]
+            return False
+        self.lines += [f"a = {target}"]
+        self.guard(f"a != {OUTPUT_PORT} and (a is None or a in COVER or not 0 <= a < {MEMORY_SIZE})", address)
+        self.guard(f"a == {OUTPUT_PORT} and not 0 <= acc <= {sys.maxunicode}", address)
+        self.lines += [
+            "out = acc",
+            "zero = acc == 0",
+            "negative = acc < 0",
+            f"if a == {OUTPUT_PORT}:",
+            "    output.append(chr(acc))",
+            "else:",
+            "    mem[a] = Instruction(VAR, acc)",
+        ]
+        return False
+
+    def arithmetic(self, instruction: Instruction, address: int):
+        operand = self.operand(instruction, address)
+        if instruction.addressing is not Addressing.IMMEDIATE:
+            if operand != "v":
+                self.lines += [f"v = {operand}"]
+            operand = "v"
+            if instruction.opcode in {Opcode.DIV, Opcode.MOD}:
+                self.guard("v == 0", address)
+        result = "r" if instruction.opcode is Opcode.CMP else "out"
+        self.lines += [
+            f"{result} = acc {OPERATORS[instruction.opcode]} {operand}",
+            f"zero = {result} == 0",
+            f"negative = {result} < 0",
+        ]
+        if instruction.opcode is not Opcode.CMP:
+            self.lines += ["acc = out"]
+
+    def instruction(self, instruction: Instruction, address: int) -> bool:
+        """Код одной инструкции. Возвращает True, если инструкция завершает блок."""
+        opcode = instruction.opcode
+        ends = opcode in {Opcode.JMP, Opcode.JZ}
+        if opcode is Opcode.LD:
+            self.lines += [f"acc = {self.operand(instruction, address)}"]
+        elif opcode is Opcode.ST:
+            ends = self.store(instruction, address)
+        elif opcode is Opcode.JMP:
+            self.lines += [f"pc = {instruction.arg}"]
+        elif opcode is Opcode.JZ:
+            self.lines += [f"pc = {instruction.arg} if zero else {address + 1}"]
+        else:
+            self.arithmetic(instruction, address)
+        self.instructions += 1
+        self.ticks += instruction_ticks(instruction)
+        if ends and opcode is Opcode.ST:
+            self.lines += [f"pc = {address + 1}"]
+        return ends
+
+    def generate(self) -> list[str]:
+        for address in range(self.start, self.end):
+            if self.instruction(self.memory[address], address):
+                break
+        else:
+            self.lines += [f"pc = {self.end}"]
+        length = self.end - self.start
+        return [
+            f"if n > budget - {length}:",
+            "    break",
+            *self.lines,
+            f"n += {self.instructions}",
+            f"t += {self.ticks}",
+        ]
+
+
+def _leaders(memory: Sequence[Instruction], pc: int) -> set[int]:
+    leaders = {pc}
+    for address, instruction in enumerate(memory):
+        if instruction.opcode in {Opcode.JMP, Opcode.JZ} and instruction.addressing is Addressing.IMMEDIATE:
+            leaders.add(instruction.arg)  # type: ignore[arg-type]
+            leaders.add(address + 1)
+        elif instruction.opcode is not Opcode.VAR and not _is_compilable(instruction):
+            leaders.add(address + 1)
+    return leaders
+
+
+def find_blocks(memory: Sequence[Instruction], pc: int) -> list[range]:
+    """Блоки компилируемых инструкций. Блок начинается в точке входа, цели перехода или после
+    некомпилируемой инструкции и заканчивается переходом, некомпилируемой инструкцией или началом другого блока.
+    """
+    leaders = _leaders(memory, pc)
+    blocks = []
+    for start in sorted(leader for leader in leaders if _is_memory(leader)):
+        end = start
+        while end < len(memory) and _is_compilable(memory[end]) and (end == start or end not in leaders):
+            end += 1
+            if memory[end - 1].opcode in {Opcode.JMP, Opcode.JZ}:
+                break
+        if end > start:
+            blocks.append(range(start, end))
+    return blocks
+
+
+def generate_module(memory: Sequence[Instruction], pc: int) -> str:
+    blocks = find_blocks(memory, pc)
+    cover = {address: block.start for block in blocks for address in block}
+    lines = [
+        f'"""Generated by aot.py (version {GENERATOR_VERSION}). Do not edit."""',
+        "",
+        "from isa import Instruction, Opcode",
+        "",
+        "VAR = Opcode.VAR",
+        f"COVER = {cover!r}",
+        "",
+        "",
+        "def run(m, budget):",
+        "    mem = m.memory",
+        "    dp = m.data_path",
+        "    alu = m.alu",
+        "    stale = m.stale",
+        "    output = dp.output",
+        "    pc = m.program_counter",
+        "    acc = dp.accumulator",
+        "    zero, negative, out = alu.zero, alu.negative, alu.out",
+        "    n = t = 0",
+        "    while pc not in stale:",
+    ]
+    for i, block in enumerate(blocks):
+        lines += [f"        {'if' if i == 0 else 'elif'} pc == {block.start}:"]
+        lines += [f"            {line}" for line in _Block(memory, block.start, block.stop, set(cover)).generate()]
+    lines += [
+        f"        {'else' if blocks else 'if True'}:",
+        "            break",
+        "    dp.accumulator = acc",
+        "    alu.zero, alu.negative, alu.out = zero, negative, out",
+        "    m.program_counter = pc",
+        "    return n, t",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def load_module(instructions: list[Instruction], pc: int, cache_dir: Path = DEFAULT_CACHE_DIR) -> ModuleType:
+    """Загружает скомпилированный модуль из кэша, при промахе генерирует и сохраняет его."""
+    key = hashlib.sha256(f"{GENERATOR_VERSION}\n{convert_to_json(instructions, pc)}".encode()).hexdigest()
+    path = Path(cache_dir) / f"program_{key}.py"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(generate_module(instructions, pc), encoding="utf-8")
+        temporary.replace(path)
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class AotMachine(FastMachine):
+    """`FastMachine`, который исполняет скомпилированные блоки и интерпретирует все остальное."""
+
+    def __init__(self, pc: int, data_path: DataPath, module: ModuleType):
+        super().__init__(pc, data_path, fusion=False, fast_forward=False)
+        self.module = module
+        self.stale: set[int] = set()
+        self.compiled_instructions = 0
+
+    def write(self, address: int, value: int):
+        super().write(address, value)
+        if address in self.module.COVER:
+            self.stale.add(self.module.COVER[address])
+
+    def run(self, limit: int = 1000000) -> str:
+        # скомпилированные блоки считают в неограниченных целых Python и используют стандартные адреса портов
+        if self.alu.word_width is not None or self.space != DEFAULT_SPACE:
+            return super().run(limit)
+        end = self._instruction_number + limit
+        try:
+            while self._instruction_number < end:
+                instructions, ticks = self.module.run(self, end - self._instruction_number)
+                self._instruction_number += instructions
+                self._tick += ticks
+                self.compiled_instructions += instructions
+                if instructions == 0:
+                    self.step()
+            self.halt_reason = "limit"
+        except StopIteration:
+            self.halt_reason = "halt"
+        except EOFError:
+            self.halt_reason = "eof"
+        except DivisionByZeroError:
+            self.halt_reason = "trap"
+        return self.halt_reason
+
+
+def simulate_aot(
+    instructions: list[Instruction],
+    pc: int,
+    input_text: str,
+    limit: int = 1000000,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+) -> tuple[str, DataPath, AotMachine]:
+    data_path = DataPath(input_text, instructions)
+    machine = AotMachine(pc, data_path, load_module(instructions, pc, cache_dir))
+    machine.run(limit)
+    return "".join(data_path.output), data_path, machine
+
+
+def main(code_file: str, input_file: str, cache_dir: Path = DEFAULT_CACHE_DIR):
+    with open(input_file) as f:
+        input_text = f.read()
+        input_text += "\0"
+    with open(code_file) as f:
+        instructions, pc = read_json(f.read())
+    output, _datapath, machine = simulate_aot(instructions, pc, input_text, cache_dir=cache_dir)
+    if machine.halt_reason == "halt":
+        print("Program halted successfully")
+    elif machine.halt_reason == "eof":
+        print("Program tried to read empty input")
+    elif machine.halt_reason == "trap":
+        print("Program trapped on division by zero")
+    print(output)
+    print("Total instructions", machine.get_instruction_number())
+    print("Total ticks", machine.get_current_tick())
+
+
+if __name__ == "__main__":
+    usage = "Wrong arguments: aot.py build <code_file> <module_file> | aot.py run <code_file> <input_file> [cache_dir]"
+    assert len(sys.argv) in [4, 5], usage
+    assert sys.argv[1] in {"build", "run"}, usage
+    if sys.argv[1] == "build":
+        with open(sys.argv[2]) as f:
+            instructions, pc = read_json(f.read())
+        with open(sys.argv[3], "w", encoding="utf-8") as f:
+            f.write(generate_module(instructions, pc))
+    else:
+        main(sys.argv[2], sys.argv[3], *[Path(arg) for arg in sys.argv[4:]])
@@ -0,0 +1,270 @@
+"""Асинхронный запуск модели процессора с потоковым вводом-выводом.
+
+В отличие от `machine.main`, входные данные не читаются целиком заранее:
+порт ввода ожидает данные из асинхронного потока (stdin, pipe, сокет),
+а порт вывода пишет в асинхронный поток с учетом backpressure.
+Каждые `yield_every` инструкций управление возвращается в event loop,
+поэтому в одном процессе могут параллельно работать несколько машин.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import logging
+import os
+import stat
+import sys
+from collections.abc import Sequence
+from typing import Protocol
+
+from alu import DivisionByZeroError
+from cli import space_fields, split_options, word_width_option
+from dma import DMA_READ
+from isa import Addressing, Instruction, Opcode, read_json
+from machine import DEFAULT_SPACE, INPUT_PORT, ControlUnit, DataPath
+from memory import AddressSpace
+
+
+class OutputStream(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+    async def drain(self) -> None: ...
+
+
+class _FileOutputStream:
+    """Вывод в обычный файл, для которого нельзя создать pipe transport."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def write(self, data: bytes) -> None:
+        os.write(self.fd, data)
+
+    async def drain(self) -> None:
+        return
+
+
+def input_reads(instruction: Instruction, memory: Sequence[Instruction], pc: int, input_port: int = INPUT_PORT) -> int:
+    """Количество чтений из порта ввода, которое выполнит инструкция.
+
+    Повторяет логику `ControlUnit.address_fetch` и `ControlUnit.operand_fetch`.
+    Для косвенной адресации через сам порт второе чтение не учитывается:
+    его адрес становится известен только после первого.
+    """
+    reads = 1 if pc == input_port else 0
+    if instruction.addressing is Addressing.DIRECT:
+        return reads + (instruction.arg == input_port)
+    if instruction.addressing is Addressing.INDIRECT:
+        if instruction.arg == input_port:
+            return reads + 1
+        if instruction.arg is None or not 0 <= instruction.arg < len(memory):
+            return reads
+        return reads + (memory[instruction.arg].arg == input_port)
+    return reads
+
+
+def dma_input_reads(instruction: Instruction, data_path: DataPath) -> int:
+    """Сколько символов ввода может забрать команда `DMA_READ`, запускаемая инструкцией.
+
+    Учитывается только `ST` с непосредственным адресом регистра команды.
+    """
+    if instruction.opcode is not Opcode.ST or instruction.addressing is not Addressing.IMMEDIATE:
+        return 0
+    if instruction.arg != data_path.dma.control_port or data_path.accumulator != DMA_READ:
+        return 0
+    return data_path.dma.length
+
+
+class AsyncRunner:
+    """Запускает `ControlUnit`, подкачивая ввод из `reader` и отдавая вывод в `writer`.
+
+    По окончании входного потока в буфер ввода дописывается `"\\0"`,
+    как это делает `machine.main` для файла.
+    """
+
+    def __init__(
+        self,
+        control_unit: ControlUnit,
+        reader: asyncio.StreamReader,
+        writer: OutputStream,
+        yield_every: int = 1000,
+        chunk_size: int = 4096,
+    ):
+        assert yield_every > 0, "yield_every should be positive"
+        self.control_unit = control_unit
+        self.data_path = control_unit.data_path
+        self.reader = reader
+        self.writer = writer
+        self.yield_every = yield_every
+        self.chunk_size = chunk_size
+        self.eof = False
+        self.written = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+
+    async def fill_input(self, count: int, until_zero: bool = False):
+        """Дожидается, пока в буфере ввода окажется хотя бы `count` символов или поток закончится.
+
+        С `until_zero` ожидание заканчивается и на `"\\0"` среди первых `count` символов:
+        на нем останавливается `DMA_READ`, и ждать остальных символов не нужно.
+        """
+        while len(self.data_path.input) < count and not self.eof:
+            if until_zero and "\0" in self.data_path.input[:count]:
+                return
+            chunk = await self.reader.read(self.chunk_size)
+            if chunk == b"":
+                self.data_path.input += self.decoder.decode(b"", final=True) + "\0"
+                self.eof = True
+            else:
+                self.data_path.input += self.decoder.decode(chunk)
+
+    async def flush_output(self):
+        output = self.data_path.output
+        if len(output) == self.written:
+            return
+        self.writer.write("".join(output[self.written :]).encode("utf-8"))
+        self.written = len(output)
+        await self.writer.drain()
+
+    async def prepare_input(self):
+        """Подкачивает ввод, необходимый следующей инструкции."""
+        pc = self.control_unit.program_counter
+        memory = self.data_path.memory
+        if 0 <= pc < len(memory):
+            reads = input_reads(memory[pc], memory, pc, self.data_path.space.input_port)
+            dma_reads = dma_input_reads(memory[pc], self.data_path)
+            if reads or dma_reads:
+                await self.fill_input(reads + dma_reads, until_zero=dma_reads > 0)
+
+    async def run(self, limit: int = 1000000) -> str:
+        """Выполняет не более `limit` инструкций и возвращает причину останова.
+
+        `decode_and_execute` вызывается прямо здесь: `StopIteration`,
+        вылетевший из вложенной корутины, превратился бы в `RuntimeError`.
+        """
+        reason = "limit"
+        try:
+            for i in range(limit):
+                await self.prepare_input()
+                self.control_unit.decode_and_execute()
+                await self.flush_output()
+                if (i + 1) % self.yield_every == 0:
+                    await asyncio.sleep(0)
+        except StopIteration:
+            reason = "halt"
+        except EOFError:
+            reason = "eof"
+        except DivisionByZeroError:
+            reason = "trap"
+        await self.flush_output()
+        return reason
+
+
+async def simulate_async(
+    instructions: list[Instruction],
+    pc: int,
+    reader: asyncio.StreamReader,
+    writer: OutputStream,
+    debug_mode: bool = False,
+    yield_every: int = 1000,
+    limit: int = 1000000,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+) -> tuple[str, DataPath, ControlUnit]:
+    """Аналог `machine.simulate`. Вывод уже отдан в `writer`, поэтому вместо него возвращается причина останова."""
+    data_path = DataPath("", instructions, word_width, space)
+    data_path.logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
+    control_unit = ControlUnit(pc, data_path)
+    control_unit.logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
+    reason = await AsyncRunner(control_unit, reader, writer, yield_every).run(limit)
+    return reason, data_path, control_unit
+
+
+def _is_regular_file(fd: int) -> bool:
+    return stat.S_ISREG(os.fstat(fd).st_mode)
+
+
+async def open_stdio() -> tuple[asyncio.StreamReader, OutputStream]:
+    """Оборачивает stdin/stdout в асинхронные потоки.
+
+    Обычные файлы (перенаправление `< input.txt`) не поддерживают pipe transport,
+    поэтому их содержимое передается в reader напрямую.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    if _is_regular_file(sys.stdin.fileno()):
+        reader.feed_data(sys.stdin.buffer.read())
+        reader.feed_eof()
+    else:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    sys.stdout.flush()
+    if _is_regular_file(sys.stdout.fileno()):
+        return reader, _FileOutputStream(sys.stdout.fileno())
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+
+async def serve(
+    instructions: list[Instruction],
+    pc: int,
+    socket_path: str,
+    debug: bool,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+):
+    """Запускает отдельную машину на каждое подключение к Unix-сокету."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        _, _, control_unit = await simulate_async(
+            instructions, pc, reader, writer, debug, word_width=word_width, space=space
+        )
+        print(
+            f"Connection done: {control_unit.get_instruction_number()} instructions, "
+            f"{control_unit.get_current_tick()} ticks",
+            file=sys.stderr,
+        )
+        writer.close()
+        await writer.wait_closed()
+
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    async with server:
+        await server.serve_forever()
+
+
+async def main_async(
+    instructions: list[Instruction],
+    pc: int,
+    debug: bool,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+):
+    reader, writer = await open_stdio()
+    reason, _datapath, control_unit = await simulate_async(
+        instructions, pc, reader, writer, debug, word_width=word_width, space=space
+    )
+    if reason == "halt":
+        print("Program halted successfully", file=sys.stderr)
+    elif reason == "eof":
+        print("Program tried to read empty input", file=sys.stderr)
+    elif reason == "trap":
+        print("Program trapped on division by zero", file=sys.stderr)
+    print("Total instructions", control_unit.get_instruction_number(), file=sys.stderr)
+    print("Total ticks", control_unit.get_current_tick(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    args, options = split_options(sys.argv[1:])
+    assert len(args) in [1, 2, 3], (
+        "Wrong arguments: async_machine.py <code_file> [debug: true | false] [socket_path] [--word-width=<bits>] "
+        "[--memory-size=<words>] [--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+    )
+    code_file = args[0]
+    debug = (args[1].lower() == "true") if len(args) >= 2 else False
+    word_width = word_width_option(options)
+    space = DEFAULT_SPACE._replace(**space_fields(options))
+    with open(code_file) as f:
+        instructions, pc = read_json(f.read())
+    if len(args) == 3:
+        asyncio.run(serve(instructions, pc, args[2], debug, word_width, space))
+    else:
+        asyncio.run(main_async(instructions, pc, debug, word_width, space))
@@ -0,0 +1,174 @@
+"""Пакетная трансляция каталога программ.
+
+`build` транслирует все `.asm` из каталога исходников (с подкаталогами) в образы `.json`
+с той же относительной структурой и пишет рядом с ними `manifest.json`.
+Образ зависит от текста исходника, от транслятора (`TOOLCHAIN_FILES`, включая модули,
+задающие адресное пространство по умолчанию) и от имен портов выбранного адресного пространства:
+если хэш совпадает с записанным в манифесте и образ на месте, файл не транслируется заново.
+Образы удаленных исходников и исходников с ошибками трансляции удаляются.
+
+Трансляция идет в пуле процессов. Пакеты меньше `POOL_THRESHOLD` файлов транслируются
+в текущем процессе: запуск пула дороже их трансляции.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import NamedTuple
+
+from cli import space_fields, split_options
+from machine import DEFAULT_SPACE
+from memory import AddressSpace
+from translator import convert_to_json, parse_lines
+
+MANIFEST = "manifest.json"
+# имена портов в исходниках разрешаются по `machine.DEFAULT_SPACE` (`memory.AddressSpace.symbols`, `dma`)
+TOOLCHAIN_FILES = ["translator.py", "isa.py", "machine.py", "memory.py", "dma.py"]
+POOL_THRESHOLD = 8
+
+
+class Translation(NamedTuple):
+    source: str
+    image: str | None
+    lines: int
+    instructions: int
+    error: str | None
+
+
+class BuildReport(NamedTuple):
+    translated: list[str]
+    unchanged: list[str]
+    removed: list[str]
+    failed: dict[str, str]
+
+
+def toolchain_hash(space: AddressSpace = DEFAULT_SPACE) -> str:
+    digest = hashlib.sha256()
+    for name in TOOLCHAIN_FILES:
+        digest.update((Path(__file__).parent / name).read_bytes())
+    digest.update(json.dumps(space.symbols, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def source_hash(text: str, toolchain: str) -> str:
+    return hashlib.sha256(f"{toolchain}\0{text}".encode()).hexdigest()
+
+
+def image_name(source: str) -> str:
+    return PurePosixPath(source).with_suffix(".json").as_posix()
+
+
+def translate(source: str, text: str, space: AddressSpace = DEFAULT_SPACE) -> Translation:
+    """Транслирует один исходник. Исполняется в процессах пула, поэтому ошибка возвращается, а не выбрасывается."""
+    lines = text.splitlines(keepends=True)
+    try:
+        instructions, pc = parse_lines(lines, space)
+    except Exception as e:
+        return Translation(source, None, len(lines), 0, f"{type(e).__name__}: {e}")
+    return Translation(source, convert_to_json(instructions, pc), len(lines), len(instructions), None)
+
+
+def translate_all(
+    pending: list[tuple[str, str]], jobs: int | None, space: AddressSpace = DEFAULT_SPACE
+) -> Iterator[Translation]:
+    if jobs == 1 or len(pending) < POOL_THRESHOLD:
+        for source, text in pending:
+            yield translate(source, text, space)
+        return
+    workers = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        sources, texts = zip(*pending)
+        chunksize = max(1, len(pending) // (workers * 4))
+        yield from pool.map(translate, sources, texts, itertools.repeat(space), chunksize=chunksize)
+
+
+def read_manifest(output_dir: Path) -> dict[str, dict]:
+    """Записи манифеста по относительному пути исходника; пустой словарь, если манифеста нет."""
+    try:
+        with open(output_dir / MANIFEST, encoding="utf-8") as f:
+            return json.load(f)["images"]
+    except FileNotFoundError:
+        return {}
+
+
+def write_manifest(output_dir: Path, toolchain: str, entries: dict[str, dict]):
+    """Манифест пишется через временный файл, чтобы прерванная сборка не оставила его поврежденным."""
+    path = output_dir / MANIFEST
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"toolchain": toolchain, "images": dict(sorted(entries.items()))}, f, indent=2)
+    temporary.replace(path)
+
+
+def _remove_image(output_dir: Path, entry: dict | None):
+    if entry is not None:
+        (output_dir / entry["image"]).unlink(missing_ok=True)
+
+
+def build(
+    source_dir: Path, output_dir: Path, jobs: int | None = None, space: AddressSpace = DEFAULT_SPACE
+) -> BuildReport:
+    toolchain = toolchain_hash(space)
+    old = read_manifest(output_dir)
+    sources = {path.relative_to(source_dir).as_posix(): path for path in sorted(source_dir.rglob("*.asm"))}
+    texts = {source: path.read_text(encoding="utf-8") for source, path in sources.items()}
+    hashes = {source: source_hash(text, toolchain) for source, text in texts.items()}
+    entries = {
+        source: old[source]
+        for source in sources
+        if source in old and old[source]["hash"] == hashes[source] and (output_dir / old[source]["image"]).exists()
+    }
+    report = BuildReport([], list(entries), [source for source in old if source not in sources], {})
+    pending = [(source, texts[source]) for source in sources if source not in entries]
+    for result in translate_all(pending, jobs, space):
+        if result.image is None:
+            report.failed[result.source] = result.error or ""
+            _remove_image(output_dir, old.get(result.source))
+            continue
+        image = image_name(result.source)
+        (output_dir / image).parent.mkdir(parents=True, exist_ok=True)
+        (output_dir / image).write_text(result.image, encoding="utf-8")
+        entries[result.source] = {
+            "hash": hashes[result.source],
+            "image": image,
+            "lines": result.lines,
+            "instructions": result.instructions,
+        }
+        report.translated.append(result.source)
+    for source in report.removed:
+        _remove_image(output_dir, old[source])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    write_manifest(output_dir, toolchain, entries)
+    return report
+
+
+def main(source_dir: str, output_dir: str, jobs: int | None = None, space: AddressSpace = DEFAULT_SPACE) -> bool:
+    started = time.perf_counter()
+    report = build(Path(source_dir), Path(output_dir), jobs, space)
+    for source, error in report.failed.items():
+        print(f"{source}: {error}")
+    print(
+        f"Translated {len(report.translated)}, unchanged {len(report.unchanged)}, "
+        f"removed {len(report.removed)}, failed {len(report.failed)} "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return not report.failed
+
+
+if __name__ == "__main__":
+    args, options = split_options(sys.argv[1:])
+    assert len(args) in [2, 3], (
+        "Wrong arguments: builder.py <source_dir> <output_dir> [jobs] "
+        "[--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+    )
+    jobs = int(args[2]) if len(args) == 3 else None
+    space = DEFAULT_SPACE._replace(**space_fields(options)).validate()
+    sys.exit(0 if main(args[0], args[1], jobs, space) else 1)
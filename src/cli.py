@@ -0,0 +1,60 @@
+"""Разбор командной строки `machine.py` и `machine_client.py`.
+
+Модуль не импортирует модель процессора: им пользуется клиент, который должен запускаться быстро.
+"""
+
+from __future__ import annotations
+
+import sys
+
+USAGE = (
+    "<code_file> <input_file> [<debug: true | false>] "
+    "[--metrics=<file | ->] [--memory-profile=<file.csv | file | ->] [--word-width=<bits>] "
+    "[--memory-size=<words>] [--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+)
+
+SPACE_OPTIONS = ("memory-size", "input-port", "output-port", "dma-port")
+OPTIONS = ("metrics", "memory-profile", "word-width", *SPACE_OPTIONS)
+
+
+def usage_error(program: str, message: str):
+    """Печатает сообщение и справку в stderr и завершает процесс с кодом 2, как `argparse`."""
+    print(f"usage: {program} {USAGE}", file=sys.stderr)
+    print(f"{program}: error: {message}", file=sys.stderr)
+    sys.exit(2)
+
+
+def parse_arguments(argv: list[str], program: str = "machine.py") -> tuple[str, str, bool, dict[str, str]]:
+    """Возвращает `(code_file, input_file, debug, options)`, где `options` - опции `--name=value` по имени."""
+    options: dict[str, str] = {}
+    args = []
+    for arg in argv:
+        if not arg.startswith("--"):
+            args.append(arg)
+            continue
+        name, separator, value = arg[2:].partition("=")
+        if name not in OPTIONS or not separator:
+            usage_error(program, f"unrecognized option {arg}")
+        options[name] = value
+    if len(args) not in [2, 3]:
+        usage_error(program, "expected <code_file> <input_file> [<debug>]")
+    debug = len(args) == 3 and args[2].lower() == "true"
+    return args[0], args[1], debug, options
+
+
+def split_options(argv: list[str]) -> tuple[list[str], dict[str, str]]:
+    """Разделяет позиционные аргументы и опции `--name=value` (`--name` без значения дает пустую строку).
+
+    Для утилит, у которых свои позиционные аргументы, но опции машины те же, что у `machine.py`.
+    """
+    options = dict(arg[2:].partition("=")[::2] for arg in argv if arg.startswith("--"))
+    return [arg for arg in argv if not arg.startswith("--")], options
+
+
+def word_width_option(options: dict[str, str]) -> int | None:
+    return int(options["word-width"]) if "word-width" in options else None
+
+
+def space_fields(options: dict[str, str]) -> dict[str, int]:
+    """Поля `memory.AddressSpace`, заданные опциями (`--memory-size` -> `memory_size`)."""
+    return {name.replace("-", "_"): int(options[name]) for name in SPACE_OPTIONS if name in options}
@@ -0,0 +1,752 @@
+"""Компилятор языка выражений в ассемблер аккумуляторной машины.
+
+Программа - последовательность операторов:
+```
+i = 0                          # присваивание, переменные - целые, по умолчанию 0
+while i != 10 { ... }          # цикл
+if a == b or not c { ... } else if d { ... } else { ... }
+print "hello"                  # вывод строки
+print i * 2                    # вывод неотрицательного числа в десятичной записи
+putc 'a' + i                   # вывод символа
+```
+Выражения: `+ - * / %` (деление округляет вниз, как `ALU` без заданной разрядности), унарный минус,
+скобки, числа, символы `'a'`, переменные и `getc` - чтение символа из ввода.
+В ISA есть только переход по нулю, поэтому условия - `==`, `!=` или выражение (истинно, если не ноль),
+объединенные `not`, `and`, `or` с сокращенным вычислением (без скобок).
+
+Результат - строки для `translator.parse_lines`. Оптимизации:
+- константные выражения сворачиваются, константы верхнего уровня до первого `if`/`while`
+  становятся начальными значениями ячеек;
+- операнд - непосредственный для неотрицательных констант, прямой для переменных,
+  у коммутативных операций операнды переставляются так, чтобы не нужна была временная ячейка;
+- временные ячейки выделяются стеком и переиспользуются между выражениями;
+- компилятор помнит, какие значения лежат в аккумуляторе и чему соответствует флаг нуля,
+  и не повторяет `LD` и `CMP` (в том числе между итерациями цикла и после переходов);
+- циклы компилируются с проверкой условия в конце, строки выводятся посимвольно или через DMA -
+  что дешевле по тактам.
+
+Порты адресуются именами (`memory.AddressSpace.symbols`), их адреса подставляет транслятор.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+from alu import operations
+from dma import DMA_WRITE
+from fast_machine import simulate_fast
+from isa import Opcode
+from translator import parse_lines
+
+DIGITS = 20  # наибольшее число знаков в `print` числа
+BENCHMARK_INPUT = "hello, world\0"
+
+COMMUTATIVE = frozenset({Opcode.ADD, Opcode.MUL})
+KEYWORDS = frozenset({"while", "if", "else", "print", "putc", "getc", "not", "and", "or"})
+ESCAPES = {"n": "\n", "t": "\t", "0": "\0", "\\": "\\", "'": "'", '"': '"'}
+BINARY = {"+": Opcode.ADD, "-": Opcode.SUB, "*": Opcode.MUL, "/": Opcode.DIV, "%": Opcode.MOD}
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<space>\s+|\#[^\n]*)
+    |(?P<number>\d+)
+    |(?P<char>'(?:\\.|[^'\\])')
+    |(?P<string>"(?:\\.|[^"\\])*")
+    |(?P<name>[A-Za-z_]\w*)
+    |(?P<op>==|!=|[-+*/%=(){}])
+    """,
+    re.VERBOSE,
+)
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    line: int
+
+
+class Num(NamedTuple):
+    value: int
+
+
+class Var(NamedTuple):
+    name: str
+
+
+class Temp(NamedTuple):
+    """Временная ячейка, только внутри генератора."""
+
+    label: str
+
+
+class Getc(NamedTuple):
+    pass
+
+
+class BinOp(NamedTuple):
+    op: Opcode
+    left: Expr
+    right: Expr
+
+
+Expr = Num | Var | Temp | Getc | BinOp
+
+
+class Compare(NamedTuple):
+    equal: bool
+    left: Expr
+    right: Expr
+
+
+class Not(NamedTuple):
+    cond: Cond
+
+
+class Logic(NamedTuple):
+    is_and: bool
+    left: Cond
+    right: Cond
+
+
+Cond = Compare | Not | Logic
+
+
+class Assign(NamedTuple):
+    name: str
+    value: Expr
+
+
+class While(NamedTuple):
+    cond: Cond
+    body: list[Stmt]
+
+
+class If(NamedTuple):
+    cond: Cond
+    body: list[Stmt]
+    orelse: list[Stmt]
+
+
+class Print(NamedTuple):
+    """Вывод числа в десятичной записи."""
+
+    value: Expr
+
+
+class PrintStr(NamedTuple):
+    text: str
+
+
+class Putc(NamedTuple):
+    value: Expr
+
+
+Stmt = Assign | While | If | Print | PrintStr | Putc
+
+
+def tokenize(text: str) -> list[Token]:
+    tokens = []
+    position = 0
+    line = 1
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        assert match is not None, f"line {line}: unexpected symbol {text[position]!r}"
+        kind = match.lastgroup
+        assert kind is not None
+        if kind != "space":
+            tokens += [Token(kind, match.group(), line)]
+        line += match.group().count("\n")
+        position = match.end()
+    return [*tokens, Token("end", "", line)]
+
+
+def unescape(literal: str) -> str:
+    return re.sub(r"\\(.)", lambda match: ESCAPES.get(match.group(1), match.group(1)), literal[1:-1])
+
+
+def reads_input(expr: Expr) -> bool:
+    if isinstance(expr, BinOp):
+        return reads_input(expr.left) or reads_input(expr.right)
+    return isinstance(expr, Getc)
+
+
+def binary(op: Opcode, left: Expr, right: Expr) -> Expr:
+    """Узел выражения со сверткой констант и тождеств (`x + 0`, `x * 1`, `x - (-c)`)."""
+    if isinstance(left, Num) and isinstance(right, Num) and not (op in {Opcode.DIV, Opcode.MOD} and right.value == 0):
+        return Num(operations[op](left.value, right.value))
+    if isinstance(right, Num) and op in {Opcode.ADD, Opcode.SUB} and right.value < 0:
+        return binary(Opcode.SUB if op is Opcode.ADD else Opcode.ADD, left, Num(-right.value))
+    if right in {Num(0) if op in {Opcode.ADD, Opcode.SUB} else Num(1)} and op is not Opcode.MOD:
+        return left
+    if left == Num(0 if op is Opcode.ADD else 1) and op in COMMUTATIVE:
+        return right
+    return BinOp(op, left, right)
+
+
+class Parser:
+    """Рекурсивный спуск. Приоритеты: `or` < `and` < `not` < сравнение < `+ -` < `* / %` < унарный минус."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self) -> Token:
+        return self.tokens[self.position]
+
+    def accept(self, text: str) -> bool:
+        token = self.peek()
+        if token.kind in {"op", "name"} and token.text == text:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, text: str):
+        token = self.peek()
+        assert self.accept(text), f"line {token.line}: expected {text!r}, got {token.text!r}"
+
+    def take(self) -> Token:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def program(self) -> list[Stmt]:
+        statements = []
+        while self.peek().kind != "end":
+            statements += [self.statement()]
+        return statements
+
+    def block(self) -> list[Stmt]:
+        self.expect("{")
+        statements = []
+        while not self.accept("}"):
+            assert self.peek().kind != "end", "unexpected end of program, expected '}'"
+            statements += [self.statement()]
+        return statements
+
+    def statement(self) -> Stmt:
+        if self.accept("while"):
+            return While(self.condition(), self.block())
+        if self.accept("if"):
+            return self.if_statement()
+        if self.accept("print"):
+            if self.peek().kind == "string":
+                return PrintStr(unescape(self.take().text))
+            return Print(self.expression())
+        if self.accept("putc"):
+            return Putc(self.expression())
+        name = self.variable()
+        self.expect("=")
+        return Assign(name, self.expression())
+
+    def if_statement(self) -> If:
+        cond, body = self.condition(), self.block()
+        if not self.accept("else"):
+            return If(cond, body, [])
+        if self.accept("if"):
+            return If(cond, body, [self.if_statement()])
+        return If(cond, body, self.block())
+
+    def variable(self) -> str:
+        token = self.take()
+        assert token.kind == "name", f"line {token.line}: expected statement, got {token.text!r}"
+        assert token.text not in KEYWORDS, f"line {token.line}: unexpected keyword {token.text!r}"
+        return token.text
+
+    def condition(self) -> Cond:
+        cond = self.conjunction()
+        while self.accept("or"):
+            cond = Logic(False, cond, self.conjunction())
+        return cond
+
+    def conjunction(self) -> Cond:
+        cond = self.negation()
+        while self.accept("and"):
+            cond = Logic(True, cond, self.negation())
+        return cond
+
+    def negation(self) -> Cond:
+        if self.accept("not"):
+            return Not(self.negation())
+        left = self.expression()
+        if self.accept("=="):
+            return Compare(True, left, self.expression())
+        if self.accept("!="):
+            return Compare(False, left, self.expression())
+        return Compare(False, left, Num(0))
+
+    def expression(self) -> Expr:
+        expr = self.term()
+        while self.peek().text in {"+", "-"} and self.peek().kind == "op":
+            expr = binary(BINARY[self.take().text], expr, self.term())
+        return expr
+
+    def term(self) -> Expr:
+        expr = self.unary()
+        while self.peek().text in {"*", "/", "%"} and self.peek().kind == "op":
+            expr = binary(BINARY[self.take().text], expr, self.unary())
+        return expr
+
+    def unary(self) -> Expr:
+        if self.accept("-"):
+            return binary(Opcode.SUB, Num(0), self.unary())
+        return self.atom()
+
+    def atom(self) -> Expr:
+        token = self.peek()
+        if self.accept("("):
+            expr = self.expression()
+            self.expect(")")
+            return expr
+        if self.accept("getc"):
+            return Getc()
+        if token.kind == "number":
+            return Num(int(self.take().text))
+        if token.kind == "char":
+            return Num(ord(unescape(self.take().text)))
+        return Var(self.variable())
+
+
+def parse(text: str) -> list[Stmt]:
+    return Parser(text).program()
+
+
+class AccState(NamedTuple):
+    """Что известно об аккумуляторе: равные ему значения и значение, с которым его сравнивает флаг нуля."""
+
+    values: frozenset[Expr]
+    flags: Expr | None
+
+
+UNKNOWN = AccState(frozenset(), None)
+
+
+def meet(a: AccState, b: AccState) -> AccState:
+    return AccState(a.values & b.values, a.flags if a.flags == b.flags else None)
+
+
+def includes(actual: AccState, assumed: AccState) -> bool:
+    return actual.values >= assumed.values and assumed.flags in {None, actual.flags}
+
+
+def is_operand(expr: Expr) -> bool:
+    """Значение можно передать инструкции аргументом, не загружая в аккумулятор."""
+    return isinstance(expr, Var | Temp) or (isinstance(expr, Num) and expr.value >= 0)
+
+
+def split_static(program: list[Stmt]) -> tuple[dict[str, int], list[Stmt]]:
+    """Отделяет присваивания неотрицательных констант в начале программы (до первого `if`/`while`)
+    переменным, которые до этого не использовались. Они становятся начальными значениями ячеек.
+    """
+    initial: dict[str, int] = {}
+    used: set[str] = set()
+    rest: list[Stmt] = []
+    for index, statement in enumerate(program):
+        if isinstance(statement, While | If):
+            return initial, rest + program[index:]
+        if isinstance(statement, Assign) and isinstance(statement.value, Num) and statement.name not in used:
+            if statement.value.value >= 0:
+                initial[statement.name] = statement.value.value
+                used.add(statement.name)
+                continue
+        used |= variables(statement)
+        rest += [statement]
+    return initial, rest
+
+
+def variables(node: object) -> set[str]:
+    if isinstance(node, Var):
+        return {node.name}
+    names = {node.name} if isinstance(node, Assign) else set()
+    for child in node if isinstance(node, tuple | list) else []:
+        names |= variables(child)
+    return names
+
+
+class CodeGenerator:
+    """Генерация ассемблера с отслеживанием состояния аккумулятора (см. `AccState`).
+
+    Состояние в метке - пересечение состояний во всех переходах на нее. Для заголовка цикла
+    переход назад еще не сгенерирован, поэтому тело компилируется заново, пока предположение
+    о состоянии в заголовке не подтвердится.
+    """
+
+    def __init__(self, initial: dict[str, int]):
+        self.variables = dict(initial)
+        self.strings: dict[str, str] = {}
+        self.temps = 0
+        self.depth = 0
+        self.digits = False
+        self.labels = 0
+        self.code: list[list[str]] = []
+        self.pending = ["START"]
+        self.aliases: dict[str, str] = {}
+        self.placed: set[str] = set()
+        self.incoming: dict[str, AccState] = {}
+        self.back_edges: dict[str, AccState] = {}
+        self.state: AccState | None = AccState(frozenset({Num(0)}), Num(0))
+
+    def snapshot(self) -> tuple:
+        return (
+            len(self.code),
+            list(self.pending),
+            dict(self.aliases),
+            set(self.placed),
+            dict(self.incoming),
+            dict(self.back_edges),
+            self.state,
+        )
+
+    def restore(self, snapshot: tuple):
+        size, self.pending, self.aliases, self.placed, self.incoming, self.back_edges, self.state = snapshot
+        del self.code[size:]
+
+    def fresh(self) -> str:
+        self.labels += 1
+        return f"L{self.labels}"
+
+    def current(self) -> AccState:
+        return UNKNOWN if self.state is None else self.state
+
+    def place(self, label: str, assumed: AccState | None = None):
+        """Ставит метку перед следующей инструкцией. `JMP`/`JZ` на саму метку удаляется."""
+        if not self.pending and self.code and self.code[-1] in (["", "JMP", label], ["", "JZ", label]):
+            self.code.pop()
+        states = [state for state in [self.incoming.pop(label, None), self.state, assumed] if state is not None]
+        self.state = states[0] if states else UNKNOWN
+        for state in states[1:]:
+            self.state = meet(self.state, state)
+        self.placed.add(label)
+        if self.pending:
+            self.aliases[label] = self.pending[0]
+        else:
+            self.pending = [label]
+
+    def emit(self, opcode: str, arg: str = ""):
+        self.code += [[self.pending[0] if self.pending else "", opcode, arg]]
+        self.pending = []
+        self.state = self.current()
+
+    def jump(self, opcode: str, label: str):
+        state = self.current()
+        if opcode == "JZ" and state.flags is not None:
+            state = AccState(state.values | {state.flags}, state.flags)
+        edges = self.back_edges if label in self.placed else self.incoming
+        edges[label] = meet(edges[label], state) if label in edges else state
+        self.emit(opcode, label)
+        if opcode == "JMP":
+            self.state = None
+
+    def argument(self, expr: Expr) -> str:
+        if isinstance(expr, Num):
+            return str(expr.value)
+        if isinstance(expr, Temp):
+            return f"({expr.label})"
+        assert isinstance(expr, Var)
+        self.variables.setdefault(expr.name, 0)
+        return f"(v_{expr.name})"
+
+    def push_temp(self) -> Temp:
+        self.depth += 1
+        self.temps = max(self.temps, self.depth)
+        return Temp(f"T{self.depth - 1}")
+
+    def pop_temp(self):
+        self.depth -= 1
+
+    def load(self, expr: Expr):
+        if expr in self.current().values:
+            return
+        if isinstance(expr, Getc):
+            self.emit("LD", "(INPUT)")
+        else:
+            self.emit("LD", self.argument(expr))
+        self.state = AccState(frozenset() if isinstance(expr, Temp | Getc) else frozenset({expr}), None)
+
+    def operate(self, op: Opcode, operand: Expr):
+        self.emit(op.name, self.argument(operand))
+        if op is Opcode.CMP:
+            self.state = AccState(self.current().values, None if isinstance(operand, Temp) else operand)
+        else:
+            self.state = AccState(frozenset(), Num(0))
+
+    def store(self, target: str):
+        """`ST` в ячейку или порт: аккумулятор не меняется, флаги выставляются по нему."""
+        self.emit("ST", target)
+        self.state = AccState(self.current().values, Num(0))
+
+    def assign(self, name: str):
+        self.variables.setdefault(name, 0)
+        self.store(f"v_{name}")
+        self.state = AccState(self.current().values | {Var(name)}, Num(0))
+
+    def evaluate(self, expr: Expr):
+        if expr in self.current().values:
+            return
+        if isinstance(expr, Num) and expr.value < 0:
+            self.evaluate(BinOp(Opcode.SUB, Num(0), Num(-expr.value)))
+            self.state = AccState(frozenset({expr}), Num(0))
+        elif isinstance(expr, BinOp):
+            self.evaluate_binary(expr)
+        else:
+            self.load(expr)
+
+    def evaluate_binary(self, expr: BinOp):
+        op, left, right = expr
+        values = self.current().values
+        if op in COMMUTATIVE and is_operand(left) and (not is_operand(right) or right in values):
+            left, right = right, left
+        if is_operand(right):
+            self.evaluate(left)
+            self.operate(op, right)
+        elif reads_input(left) and op not in COMMUTATIVE:
+            temp = self.spill(left)
+            self.evaluate_binary(BinOp(op, temp, right))
+            self.pop_temp()
+        else:
+            if op in COMMUTATIVE and reads_input(left):
+                left, right = right, left
+            temp = self.spill(right)
+            self.evaluate(left)
+            self.operate(op, temp)
+            self.pop_temp()
+
+    def spill(self, expr: Expr) -> Temp:
+        """Вычисляет выражение во временную ячейку. Ячейку освобождает вызывающий."""
+        self.evaluate(expr)
+        temp = self.push_temp()
+        self.store(temp.label)
+        return temp
+
+    def compare(self, cond: Compare):
+        """Выставляет флаг нуля: ноль, если стороны равны."""
+        left, right = cond.left, cond.right
+        values = self.current().values
+        if (is_operand(left) and (not is_operand(right) or right in values)) or (
+            reads_input(left) and not is_operand(right)
+        ):
+            left, right = right, left
+        if is_operand(right):
+            self.evaluate(left)
+            if self.current().flags != right:
+                self.operate(Opcode.CMP, right)
+            return
+        temp = self.spill(right)
+        self.evaluate(left)
+        self.operate(Opcode.CMP, temp)
+        self.pop_temp()
+
+    def branch(self, cond: Cond, target: str, when: bool):
+        """Переход на `target`, если условие равно `when`, иначе - на следующую инструкцию."""
+        if isinstance(cond, Not):
+            self.branch(cond.cond, target, not when)
+        elif isinstance(cond, Logic) and cond.is_and != when:
+            self.branch(cond.left, target, when)
+            self.branch(cond.right, target, when)
+        elif isinstance(cond, Logic):
+            skip = self.fresh()
+            self.branch(cond.left, skip, not when)
+            self.branch(cond.right, target, when)
+            self.place(skip)
+        elif isinstance(cond.left, Num) and isinstance(cond.right, Num):
+            if ((cond.left == cond.right) == cond.equal) == when:
+                self.jump("JMP", target)
+        else:
+            self.compare(cond)
+            self.branch_on_zero(target, cond.equal == when)
+
+    def branch_on_zero(self, target: str, zero: bool):
+        if zero:
+            self.jump("JZ", target)
+            return
+        skip = self.fresh()
+        self.jump("JZ", skip)
+        self.jump("JMP", target)
+        self.place(skip)
+
+    def statements(self, statements: list[Stmt]):
+        for statement in statements:
+            self.statement(statement)
+
+    def statement(self, statement: Stmt):
+        if isinstance(statement, Assign):
+            if statement.value != Var(statement.name):
+                self.evaluate(statement.value)
+                self.assign(statement.name)
+        elif isinstance(statement, While):
+            self.loop(statement)
+        elif isinstance(statement, If):
+            self.condition(statement)
+        elif isinstance(statement, PrintStr):
+            self.print_text(statement.text)
+        elif isinstance(statement, Print):
+            self.print_number(statement.value)
+        else:
+            self.evaluate(statement.value)
+            self.store("OUTPUT")
+
+    def loop(self, statement: While):
+        """Цикл с проверкой условия перед входом и в конце тела."""
+        exit_label = self.fresh()
+        self.branch(statement.cond, exit_label, False)
+        snapshot = self.snapshot()
+        assumed = self.current()
+        while True:
+            body = self.fresh()
+            self.place(body, assumed)
+            entry = self.current()
+            self.statements(statement.body)
+            self.branch(statement.cond, body, True)
+            actual = self.back_edges.get(body, entry)
+            if includes(actual, entry):
+                break
+            assumed = meet(entry, actual)
+            self.restore(snapshot)
+        self.place(exit_label)
+
+    def condition(self, statement: If):
+        else_label = self.fresh()
+        self.branch(statement.cond, else_label, False)
+        self.statements(statement.body)
+        if not statement.orelse:
+            self.place(else_label)
+            return
+        end = self.fresh()
+        self.jump("JMP", end)
+        self.place(else_label)
+        self.statements(statement.orelse)
+        self.place(end)
+
+    def print_text(self, text: str):
+        """Посимвольно (`LD c; ST OUTPUT`) или одной передачей DMA - что дешевле."""
+        if text == "":
+            return
+        characters = [Num(ord(c)) for c in text]
+        loads = sum(1 for previous, c in zip([None, *characters], characters) if c != previous)
+        if Num(ord(text[0])) in self.current().values:
+            loads -= 1
+        if 2 * loads + 2 * len(text) <= 8 + len(text) + 1:
+            for c in characters:
+                self.evaluate(c)
+                self.store("OUTPUT")
+            return
+        label = self.strings.setdefault(text, f"S{len(self.strings)}")
+        self.emit("LD", label)
+        self.state = UNKNOWN
+        self.dma_write()
+
+    def dma_write(self):
+        """Вывод строки, адрес которой в аккумуляторе."""
+        self.store("DMA_ADDRESS")
+        self.evaluate(Num(DMA_WRITE))
+        self.store("DMA_CONTROL")
+
+    def print_number(self, value: Expr):
+        """Цифры пишутся с конца буфера `DIGITS` и выводятся через DMA."""
+        if isinstance(value, Num) and value.value >= 0:
+            self.print_text(str(value.value))
+            return
+        self.digits = True
+        self.evaluate(value)
+        number, pointer = self.push_temp(), self.push_temp()
+        self.store(number.label)
+        self.emit("LD", "DIGITS_END")
+        self.state = UNKNOWN
+        self.store(pointer.label)
+        digit = self.fresh()
+        self.place(digit, UNKNOWN)
+        self.evaluate(BinOp(Opcode.SUB, pointer, Num(1)))
+        self.store(pointer.label)
+        self.evaluate(BinOp(Opcode.ADD, BinOp(Opcode.MOD, number, Num(10)), Num(ord("0"))))
+        self.store(f"({pointer.label})")
+        self.evaluate(BinOp(Opcode.DIV, number, Num(10)))
+        self.store(number.label)
+        self.branch_on_zero(digit, False)
+        self.load(pointer)
+        self.dma_write()
+        self.pop_temp()
+        self.pop_temp()
+
+    def render(self) -> list[str]:
+        self.emit("HLT")
+        lines = [self.line(label, opcode, arg) for label, opcode, arg in self.code]
+        lines += [f"v_{name}: VAR {value}" for name, value in self.variables.items()]
+        lines += [f"T{index}: VAR 0" for index in range(self.temps)]
+        for text, label in self.strings.items():
+            lines += [f"{label}: VAR {ord(text[0])}", *[f"VAR {ord(c)}" for c in text[1:]], "VAR 0"]
+        if self.digits:
+            lines += [f"{'DIGITS: ' if index == 0 else ''}VAR 0" for index in range(DIGITS)] + ["DIGITS_END: VAR 0"]
+        return lines
+
+    def line(self, label: str, opcode: str, arg: str) -> str:
+        if opcode in {"JMP", "JZ"}:
+            arg = self.aliases.get(arg, arg)
+        return f"{label}: {opcode} {arg}".strip() if label else f"{opcode} {arg}".strip()
+
+
+def compile_source(text: str) -> list[str]:
+    initial, program = split_static(parse(text))
+    generator = CodeGenerator(initial)
+    generator.statements(program)
+    return generator.render()
+
+
+class Comparison(NamedTuple):
+    """`baseline` - программа, написанная вручную: `NAME` с портами ввода-вывода или `NAME_dma` с DMA."""
+
+    name: str
+    baseline: str
+    hand_ticks: int
+    compiled_ticks: int
+    same_output: bool
+
+
+def run(lines: list[str], input_text: str) -> tuple[str, int]:
+    instructions, pc = parse_lines(lines)
+    output, _, machine = simulate_fast(instructions, pc, input_text)
+    return output, machine.get_current_tick()
+
+
+def benchmark(directory: Path, input_text: str = BENCHMARK_INPUT) -> list[Comparison]:
+    """Сравнивает программы `NAME.src` с написанными вручную `NAME.asm` и, если есть, `NAME_dma.asm`
+    из того же каталога. Компилятор выводит строки через DMA, поэтому с вариантами на DMA он сравнивается отдельно.
+    """
+    comparisons = []
+    for source in sorted(directory.glob("*.src")):
+        compiled_output, compiled_ticks = run(compile_source(source.read_text(encoding="utf-8")), input_text)
+        for hand_written in [source.with_suffix(".asm"), source.with_name(f"{source.stem}_dma.asm")]:
+            if not hand_written.exists():
+                continue
+            with open(hand_written, encoding="utf-8") as f:
+                hand_output, hand_ticks = run(f.readlines(), input_text)
+            same_output = hand_output == compiled_output
+            comparisons += [Comparison(source.stem, hand_written.stem, hand_ticks, compiled_ticks, same_output)]
+    return comparisons
+
+
+def main(input_file: str, output_file: str):
+    with open(input_file, encoding="utf-8") as f:
+        lines = compile_source(f.read())
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"Code instr: {len(parse_lines(lines)[0])}")
+
+
+def print_benchmark(directory: str):
+    for comparison in benchmark(Path(directory)):
+        speedup = comparison.hand_ticks / comparison.compiled_ticks
+        output = "" if comparison.same_output else ", OUTPUT DIFFERS"
+        print(
+            f"{comparison.name}: hand-written {comparison.baseline} {comparison.hand_ticks} ticks, "
+            f"compiled {comparison.compiled_ticks} ticks, x{speedup:.2f}{output}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1].startswith("--bench="):
+        print_benchmark(sys.argv[1].split("=", 1)[1])
+    else:
+        assert len(sys.argv) == 3, "Wrong arguments: compiler.py <input_file> <target_file> | --bench=<directory>"
+        main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,189 @@
+"""Долгоживущий сервис симуляции на Unix-сокете.
+
+Сервис держит в памяти транслированные программы и исполняет запросы без запуска нового интерпретатора.
+Протокол построчный: запрос и ответ - по одному JSON-объекту на строку.
+
+Поля запроса:
+- `program` - идентификатор ранее загруженной программы (sha256 от текста машинного кода);
+- `code` - машинный код в формате `translator.convert_to_json`, либо `source` - исходный текст на ассемблере;
+- `input` - текст для порта ввода (как содержимое input-файла, `"\\0"` дописывается сервисом);
+- `limit` - ограничение на количество инструкций (не больше `max_limit` сервиса);
+- `engine` - `"fast"` (`FastMachine`, по умолчанию) или `"reference"` (`ControlUnit`);
+- `word_width` - разрядность машинного слова (как `--word-width` у `machine.py`);
+- `space` - поля `memory.AddressSpace`, отличные от `machine.DEFAULT_SPACE`, например `{"memory_size": 65536}`.
+
+Ответ содержит `program`, `output`, `halt_reason`, `instructions`, `ticks` и `wall_time_seconds`
+или `error`, если запрос не удалось выполнить. Для неизвестного идентификатора ошибка - `unknown program`.
+
+Одновременно исполняется не больше `jobs` запросов. Симуляция идет в пуле потоков,
+поэтому сервис отвечает на новые подключения, пока идут долгие прогоны.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from alu import DivisionByZeroError
+from fast_machine import simulate_fast
+from isa import Instruction, read_json
+from machine import DEFAULT_SPACE, ControlUnit, DataPath
+from memory import AddressSpace
+from translator import convert_to_json, parse_lines
+
+UNKNOWN_PROGRAM = "unknown program"
+
+
+def program_id(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def run_program(
+    instructions: list[Instruction],
+    pc: int,
+    input_text: str,
+    limit: int,
+    engine: str,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+) -> dict:
+    """Исполняет программу и возвращает поля ответа. Вывод не печатается, логи выключены."""
+    started = time.perf_counter()
+    if engine == "fast":
+        output, _, machine = simulate_fast(
+            instructions, pc, input_text, limit=limit, word_width=word_width, space=space
+        )
+        halt_reason = machine.halt_reason
+        instructions_number, ticks = machine.get_instruction_number(), machine.get_current_tick()
+    else:
+        data_path = DataPath(input_text, instructions, word_width, space)
+        data_path.logger.setLevel(logging.ERROR)
+        control_unit = ControlUnit(pc, data_path)
+        control_unit.logger.setLevel(logging.ERROR)
+        halt_reason = "limit"
+        try:
+            for _ in range(limit):
+                control_unit.decode_and_execute()
+        except StopIteration:
+            halt_reason = "halt"
+        except EOFError:
+            halt_reason = "eof"
+        except DivisionByZeroError:
+            halt_reason = "trap"
+        output = "".join(data_path.output)
+        instructions_number, ticks = control_unit.get_instruction_number(), control_unit.get_current_tick()
+    return {
+        "output": output,
+        "halt_reason": halt_reason,
+        "instructions": instructions_number,
+        "ticks": ticks,
+        "wall_time_seconds": time.perf_counter() - started,
+    }
+
+
+class SimulatorService:
+    def __init__(self, jobs: int = 4, max_programs: int = 64, max_limit: int = 1000000):
+        assert jobs > 0, "jobs should be positive"
+        self.jobs = jobs
+        self.max_programs = max_programs
+        self.max_limit = max_limit
+        self.programs: OrderedDict[str, tuple[list[Instruction], int]] = OrderedDict()
+        self.semaphore = asyncio.Semaphore(jobs)
+        self.executor = ThreadPoolExecutor(jobs)
+        self.requests = 0
+
+    def register(self, code: str) -> str:
+        """Загружает машинный код в кэш (LRU на `max_programs` программ) и возвращает его идентификатор."""
+        key = program_id(code)
+        if key not in self.programs:
+            self.programs[key] = read_json(code)
+            while len(self.programs) > self.max_programs:
+                self.programs.popitem(last=False)
+        self.programs.move_to_end(key)
+        return key
+
+    def resolve(self, request: dict, space: AddressSpace = DEFAULT_SPACE) -> str | None:
+        """Идентификатор программы запроса. Имена портов в `source` разрешаются по `space`."""
+        if "source" in request:
+            instructions, pc = parse_lines(request["source"].splitlines(), space)
+            return self.register(convert_to_json(instructions, pc))
+        if "code" in request:
+            return self.register(request["code"])
+        key = request.get("program")
+        if not isinstance(key, str) or key not in self.programs:
+            return None
+        self.programs.move_to_end(key)
+        return key
+
+    async def execute(self, request: dict) -> dict:
+        self.requests += 1
+        try:
+            space = DEFAULT_SPACE._replace(**request.get("space", {})).validate()
+            key = self.resolve(request, space)
+            if key is None:
+                return {"error": UNKNOWN_PROGRAM}
+            engine = request.get("engine", "fast")
+            assert engine in {"fast", "reference"}, f"unknown engine {engine}"
+            limit = min(int(request.get("limit", self.max_limit)), self.max_limit)
+            input_text = request.get("input", "") + "\0"
+            instructions, pc = self.programs[key]
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self.executor,
+                    run_program,
+                    instructions,
+                    pc,
+                    input_text,
+                    limit,
+                    engine,
+                    request.get("word_width"),
+                    space,
+                )
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        return {"program": key, **result}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Обслуживает подключение: на каждую строку-запрос отвечает строкой-ответом."""
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = {"error": f"bad request: {e}"}
+            else:
+                response = await self.execute(request)
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    async def serve(self, socket_path: str, ready: asyncio.Event | None = None):
+        """Принимает подключения, пока задачу не отменят. `ready` выставляется, когда сокет создан."""
+        # логгеры общие для всех машин процесса, а конструктор `DataPath` включает DEBUG:
+        # параллельные прогоны писали бы журнал друг друга
+        logging.disable(logging.ERROR)
+        try:
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            async with server:
+                if ready is not None:
+                    ready.set()
+                await server.serve_forever()
+        finally:
+            logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) in [2, 3], "Wrong arguments: daemon.py <socket_path> [jobs]"
+    jobs = int(sys.argv[2]) if len(sys.argv) == 3 else 4
+
+    async def serve_forever():
+        await SimulatorService(jobs).serve(sys.argv[1])
+
+    asyncio.run(serve_forever())
@@ -0,0 +1,320 @@
+"""Отладчик для `ControlUnit` с точками останова и обратным выполнением.
+
+Состояние регистров сохраняется снимками каждые `snapshot_interval` инструкций,
+а изменения памяти пишутся в журнал в виде `(номер инструкции, адрес, старое значение)`.
+Шаг назад откатывает журнал до ближайшего снимка и повторяет выполнение от него,
+поэтому стоимость шага назад ограничена интервалом снимков,
+а память отладчика - `max_snapshots` снимками и записями журнала между ними.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from collections import deque
+from typing import NamedTuple
+
+from alu import DivisionByZeroError
+from cli import space_fields, split_options, word_width_option
+from isa import Instruction
+from machine import DEFAULT_SPACE, ControlUnit, DataPath
+from memory import AddressSpace
+from translator import expand_lines, parse_labels, parse_lines, remove_comment
+
+
+class JournalEntry(NamedTuple):
+    position: int
+    address: int
+    old: Instruction
+
+
+class Snapshot(NamedTuple):
+    """Состояние машины перед выполнением инструкции номер `position`.
+
+    Память в снимок не входит: она восстанавливается по журналу записей.
+    """
+
+    position: int
+    tick: int
+    program_counter: int
+    program: Instruction | None
+    accumulator: int
+    address_register: int
+    mem_out: Instruction | None
+    alu: tuple[int, int, int, bool, bool, bool, bool]
+    input: str
+    output_length: int
+    dma: tuple[int, int, int]
+    counters: tuple[int, int, int, int, int]
+
+
+class JournaledDataPath(DataPath):
+    """DataPath, записывающий прежнее содержимое ячеек перед каждой записью в память."""
+
+    def __init__(
+        self,
+        input_str: str,
+        initial_memory: list[Instruction],
+        word_width: int | None = None,
+        space: AddressSpace = DEFAULT_SPACE,
+    ):
+        super().__init__(input_str, initial_memory, word_width, space)
+        self.journal: deque[JournalEntry] = deque()
+        self.position = 0
+
+    def store_cell(self, address: int, value: int):
+        self.journal.append(JournalEntry(self.position, address, self.memory[address]))
+        super().store_cell(address, value)
+
+
+class Debugger:
+    def __init__(
+        self,
+        instructions: list[Instruction],
+        pc: int,
+        input_text: str,
+        labels: dict[str, int] | None = None,
+        snapshot_interval: int = 1000,
+        max_snapshots: int = 100,
+        debug_mode: bool = False,
+        word_width: int | None = None,
+        space: AddressSpace = DEFAULT_SPACE,
+    ):
+        assert snapshot_interval > 0, "snapshot_interval should be positive"
+        assert max_snapshots > 0, "max_snapshots should be positive"
+        self.data_path = JournaledDataPath(input_text, instructions, word_width, space)
+        self.data_path.logger.setLevel(logging.DEBUG if debug_mode else logging.WARNING)
+        self.control_unit = ControlUnit(pc, self.data_path)
+        self.control_unit.logger.setLevel(logging.DEBUG if debug_mode else logging.WARNING)
+        self.labels = labels if labels is not None else {}
+        self.snapshot_interval = snapshot_interval
+        self.max_snapshots = max_snapshots
+        self.snapshots: deque[Snapshot] = deque([self._snapshot()])
+        self.breakpoints: set[int] = set()
+        self.watchpoints: set[int] = set()
+        self.halt_reason: str | None = None
+        self.watch_hit = False
+
+    @property
+    def position(self) -> int:
+        """Количество выполненных инструкций."""
+        return self.control_unit.get_instruction_number()
+
+    def resolve(self, where: int | str) -> int:
+        if isinstance(where, int):
+            return where
+        assert where in self.labels, f"Unknown label {where}"
+        return self.labels[where]
+
+    def add_breakpoint(self, where: int | str):
+        self.breakpoints.add(self.resolve(where))
+
+    def remove_breakpoint(self, where: int | str):
+        self.breakpoints.discard(self.resolve(where))
+
+    def add_watchpoint(self, where: int | str):
+        self.watchpoints.add(self.resolve(where))
+
+    def remove_watchpoint(self, where: int | str):
+        self.watchpoints.discard(self.resolve(where))
+
+    def _snapshot(self) -> Snapshot:
+        cu, dp = self.control_unit, self.data_path
+        alu = dp.alu
+        return Snapshot(
+            self.position,
+            cu.get_current_tick(),
+            cu.program_counter,
+            getattr(cu, "program", None),
+            dp.accumulator,
+            dp.address_register,
+            dp.mem_out,
+            (alu.left, alu.right, alu.out, alu.negative, alu.zero, alu.carry, alu.overflow),
+            dp.input,
+            len(dp.output),
+            (dp.dma.address, dp.dma.length, dp.dma.count),
+            (dp.memory_reads, dp.memory_writes, dp.input_bytes, dp.output_bytes, dp.dma_ticks),
+        )
+
+    def _restore(self, snapshot: Snapshot):
+        cu, dp = self.control_unit, self.data_path
+        cu._tick = snapshot.tick
+        cu._instruction_number = snapshot.position
+        cu.program_counter = snapshot.program_counter
+        if snapshot.program is not None:
+            cu.program = snapshot.program
+        dp.accumulator = snapshot.accumulator
+        dp.address_register = snapshot.address_register
+        dp.mem_out = snapshot.mem_out
+        alu = dp.alu
+        alu.left, alu.right, alu.out, alu.negative, alu.zero, alu.carry, alu.overflow = snapshot.alu
+        dp.input = snapshot.input
+        del dp.output[snapshot.output_length :]
+        dp.dma.address, dp.dma.length, dp.dma.count = snapshot.dma
+        dp.memory_reads, dp.memory_writes, dp.input_bytes, dp.output_bytes, dp.dma_ticks = snapshot.counters
+        self.halt_reason = None
+        self.watch_hit = False
+
+    def _remember(self):
+        if self.position % self.snapshot_interval != 0 or self.snapshots[-1].position == self.position:
+            return
+        self.snapshots.append(self._snapshot())
+        if len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popleft()
+            horizon = self.snapshots[0].position
+            journal = self.data_path.journal
+            while journal and journal[0].position < horizon:
+                journal.popleft()
+
+    def step(self) -> bool:
+        """Выполняет одну инструкцию. Возвращает False, если машина остановлена."""
+        if self.halt_reason is not None:
+            return False
+        journal = self.data_path.journal
+        journal_length = len(journal)
+        self.data_path.position = self.position
+        try:
+            self.control_unit.decode_and_execute()
+        except StopIteration:
+            self.halt_reason = "halt"
+            return False
+        except EOFError:
+            self.halt_reason = "eof"
+            return False
+        except DivisionByZeroError:
+            self.halt_reason = "trap"
+            return False
+        self.watch_hit = any(journal[i].address in self.watchpoints for i in range(journal_length, len(journal)))
+        self._remember()
+        return True
+
+    def at_breakpoint(self) -> bool:
+        return self.control_unit.program_counter in self.breakpoints
+
+    def continue_(self, limit: int = 1000000) -> bool:
+        """Выполняет инструкции до точки останова, срабатывания watchpoint или остановки машины.
+
+        Возвращает True, если остановились на точке останова или watchpoint.
+        """
+        for _ in range(limit):
+            if not self.step():
+                return False
+            if self.watch_hit or self.at_breakpoint():
+                return True
+        return False
+
+    def goto(self, position: int):
+        """Переводит машину в состояние перед выполнением инструкции номер `position`."""
+        horizon = self.snapshots[0].position
+        assert position >= horizon, f"Position {position} is beyond debugger history (starts at {horizon})"
+        if position < self.position or self.halt_reason is not None:
+            self._rewind(position)
+        while self.position < position and self.step():
+            pass
+
+    def _rewind(self, position: int):
+        """Откатывает машину к последнему снимку не позже `position`."""
+        while self.snapshots[-1].position > position:
+            self.snapshots.pop()
+        snapshot = self.snapshots[-1]
+        journal = self.data_path.journal
+        while journal and journal[-1].position >= snapshot.position:
+            entry = journal.pop()
+            self.data_path.memory[entry.address] = entry.old
+        self._restore(snapshot)
+
+    def reverse_step(self, count: int = 1):
+        self.goto(max(self.snapshots[0].position, self.position - count))
+
+    def _scan(self, start: int, end: int, bound: int) -> int | None:
+        """Повторяет выполнение с `start` до `end` и возвращает позицию последней остановки до `bound`.
+
+        Срабатывание watchpoint относится к позиции после записи,
+        поэтому оно может совпасть с `end` - началом уже просмотренного отрезка.
+        """
+        self.goto(start)
+        last = None
+        while self.position < end:
+            if self.at_breakpoint():
+                last = self.position
+            if not self.step():
+                break
+            if self.watch_hit and self.position < bound:
+                last = self.position
+        return last
+
+    def reverse_continue(self) -> bool:
+        """Возвращается к предыдущей точке останова или watchpoint.
+
+        Если таких нет в сохраненной истории, машина переводится в ее начало и возвращается False.
+        """
+        bound = end = self.position
+        starts = [snapshot.position for snapshot in self.snapshots if snapshot.position < end]
+        for start in reversed(starts):
+            hit = self._scan(start, end, bound)
+            if hit is not None:
+                self.goto(hit)
+                return True
+            end = start
+        self.goto(self.snapshots[0].position)
+        return False
+
+    def state(self) -> str:
+        cu, dp = self.control_unit, self.data_path
+        current = dp.memory[cu.program_counter] if 0 <= cu.program_counter < len(dp.memory) else None
+        return (
+            f"instr: {self.position}, tick: {cu.get_current_tick()}, PC: {cu.program_counter} `{current}`, "
+            f"acc: {dp.accumulator}, Z: {dp.alu.zero}, N: {dp.alu.negative}"
+            + (f", halted: {self.halt_reason}" if self.halt_reason else "")
+        )
+
+
+def load_source(source_file: str, space: AddressSpace = DEFAULT_SPACE) -> tuple[list[Instruction], int, dict[str, int]]:
+    with open(source_file, encoding="utf-8") as f:
+        lines = f.readlines()
+    instructions, pc = parse_lines(lines, space)
+    labels = parse_labels(expand_lines(remove_comment(lines)))
+    return instructions, pc, labels
+
+
+def _parse_target(debugger: Debugger, arg: str) -> int:
+    return int(arg) if arg.isdecimal() else debugger.resolve(arg)
+
+
+COMMANDS = {
+    "s": lambda d, arg: [d.step() for _ in range(int(arg or 1))],
+    "rs": lambda d, arg: d.reverse_step(int(arg or 1)),
+    "c": lambda d, arg: d.continue_(),
+    "rc": lambda d, arg: d.reverse_continue(),
+    "g": lambda d, arg: d.goto(int(arg)),
+    "b": lambda d, arg: d.add_breakpoint(_parse_target(d, arg)),
+    "w": lambda d, arg: d.add_watchpoint(_parse_target(d, arg)),
+    "m": lambda d, arg: print(d.data_path.memory[_parse_target(d, arg)]),
+    "o": lambda d, arg: print(repr("".join(d.data_path.output))),
+}
+
+
+def main(source_file: str, input_file: str, word_width: int | None = None, space: AddressSpace = DEFAULT_SPACE):
+    with open(input_file) as f:
+        input_text = f.read() + "\0"
+    instructions, pc, labels = load_source(source_file, space)
+    debugger = Debugger(instructions, pc, input_text, labels, word_width=word_width, space=space)
+    print("Commands: s/rs [n], c, rc, g <instr>, b/w <addr|label>, m <addr|label>, o, q")
+    print(debugger.state())
+    for line in sys.stdin:
+        command, _, arg = line.strip().partition(" ")
+        if command == "q":
+            break
+        if command in COMMANDS:
+            COMMANDS[command](debugger, arg.strip())
+        print(debugger.state())
+
+
+if __name__ == "__main__":
+    args, options = split_options(sys.argv[1:])
+    assert len(args) == 2, (
+        "Wrong arguments: debugger.py <source_file> <input_file> [--word-width=<bits>] "
+        "[--memory-size=<words>] [--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+    )
+    source_file, input_file = args
+    main(source_file, input_file, word_width_option(options), DEFAULT_SPACE._replace(**space_fields(options)))
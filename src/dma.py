@@ -0,0 +1,93 @@
+"""Блочное устройство ввода-вывода с прямым доступом к памяти.
+
+Регистры устройства отображены на три порта подряд (по умолчанию с `DMA_ADDRESS_PORT`),
+запись в них - обычный `ST`:
+- `DMA_ADDRESS_PORT` - адрес буфера в памяти;
+- `DMA_LENGTH_PORT` - максимальная длина передачи в словах (после сброса - весь объем памяти);
+- `DMA_CONTROL_PORT` - команда: `DMA_READ` копирует символы из ввода в буфер
+  (до `"\\0"` включительно, конца ввода или длины), `DMA_WRITE` выводит строку из буфера
+  до нулевой ячейки (не включая ее) или длины.
+
+Чтение регистра возвращает его значение, чтение `DMA_CONTROL_PORT` - количество символов,
+переданных последней командой. Пока идет передача, процессор простаивает:
+команда занимает по одному дополнительному такту на каждую прочитанную или записанную ячейку памяти.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+DMA_ADDRESS_PORT = 2048
+DMA_LENGTH_PORT = 2049
+DMA_CONTROL_PORT = 2050
+
+DMA_READ = 1
+DMA_WRITE = 2
+
+
+class DmaController:
+    def __init__(self, memory_size: int, base_port: int = DMA_ADDRESS_PORT):
+        self.memory_size = memory_size
+        self.ports = range(base_port, base_port + 3)
+        self.address_port, self.length_port, self.control_port = self.ports
+        self.address = 0
+        self.length = memory_size
+        self.count = 0
+
+    def read_register(self, port: int) -> int:
+        if port == self.address_port:
+            return self.address
+        if port == self.length_port:
+            return self.length
+        return self.count
+
+    def write_register(
+        self,
+        port: int,
+        value: int,
+        input_text: str,
+        read_cell: Callable[[int], int | None],
+        write_cell: Callable[[int, int], None],
+    ) -> tuple[str, list[str], int]:
+        """Запись в регистр. Возвращает остаток ввода, выведенные символы и такты простоя процессора."""
+        if port == self.address_port:
+            self.address = value
+            return input_text, [], 0
+        if port == self.length_port:
+            assert value >= 0, "DMA length should not be negative"
+            self.length = value
+            return input_text, [], 0
+        assert value in {DMA_READ, DMA_WRITE}, f"unknown DMA command {value}"
+        if value == DMA_READ:
+            return self._read_block(input_text, write_cell)
+        output, ticks = self._write_block(read_cell)
+        return input_text, output, ticks
+
+    def _cell(self, offset: int) -> int:
+        address = self.address + offset
+        assert 0 <= address < self.memory_size, "DMA transfer out of memory"
+        return address
+
+    def _read_block(self, input_text: str, write_cell: Callable[[int, int], None]) -> tuple[str, list[str], int]:
+        count = 0
+        while count < min(self.length, len(input_text)):
+            symbol = ord(input_text[count])
+            write_cell(self._cell(count), symbol)
+            count += 1
+            if symbol == 0:
+                break
+        self.count = count
+        return input_text[count:], [], count
+
+    def _write_block(self, read_cell: Callable[[int], int | None]) -> tuple[list[str], int]:
+        output: list[str] = []
+        ticks = 0
+        while ticks < self.length:
+            value = read_cell(self._cell(ticks))
+            ticks += 1
+            assert value is not None, "DMA transfer of a cell without value"
+            if value == 0:
+                break
+            output.append(chr(value))
+        self.count = len(output)
+        return output, ticks
@@ -0,0 +1,424 @@
+"""Быстрый интерпретатор с суперинструкциями.
+
+`FastMachine` исполняет ту же программу, что и `ControlUnit`, но целыми инструкциями,
+без пошаговой симуляции сигналов и без журналирования.
+При загрузке (и после записи в код) частые последовательности инструкций
+(`CMP x; JZ L`, `LD (I); ADD 1; ST I`, `LD [I]; CMP 0; JZ L`, `LD (I); MOD 3; JZ L`) заменяются
+суперинструкциями, которые исполняются за одну диспетчеризацию.
+Простые циклы (см. `loops`) прокручиваются сгенерированными функциями без диспетчеризации инструкций.
+Количество инструкций, тактов, аккумулятор, флаги АЛУ, память и вывод совпадают с `ControlUnit`.
+Микроархитектурные регистры (AR, MEM_OUT) не моделируются.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Callable, Sequence
+from typing import NamedTuple
+
+from alu import DivisionByZeroError
+from isa import Addressing, Instruction, Opcode, instruction_ticks, is_arithmetic_instruction, read_json
+from loops import LoopKernel, compile_loop, find_loops
+from machine import DEFAULT_SPACE, DataPath
+from memory import AddressSpace, loaded_cells
+
+
+class Fusion(NamedTuple):
+    """Суперинструкция: `handler` исполняет `length` инструкций, начиная с PC.
+
+    Если операнды во время исполнения оказываются портами ввода-вывода или некорректными адресами,
+    `handler` ничего не меняет и возвращает False - тогда инструкции исполняются по одной.
+    """
+
+    handler: Callable[[FastMachine, int], bool]
+    length: int
+    ticks: int
+
+
+def _is_jz(instruction: Instruction) -> bool:
+    return (
+        instruction.opcode is Opcode.JZ
+        and instruction.addressing is Addressing.IMMEDIATE
+        and instruction.arg is not None
+    )
+
+
+def _is_arithmetic(instruction: Instruction) -> bool:
+    return is_arithmetic_instruction(instruction.opcode) and instruction.arg is not None
+
+
+def _is_store(instruction: Instruction) -> bool:
+    return (
+        instruction.opcode is Opcode.ST
+        and instruction.addressing is Addressing.IMMEDIATE
+        and instruction.arg is not None
+    )
+
+
+def _match_op_jz(window: Sequence[Instruction]) -> bool:
+    return _is_arithmetic(window[0]) and _is_jz(window[1])
+
+
+def _match_ld_op_jz(window: Sequence[Instruction]) -> bool:
+    return window[0].opcode is Opcode.LD and window[0].arg is not None and _match_op_jz(window[1:])
+
+
+def _match_increment(window: Sequence[Instruction]) -> bool:
+    ld, op, st = window
+    return (
+        ld.opcode is Opcode.LD
+        and ld.arg is not None
+        and op.opcode in {Opcode.ADD, Opcode.SUB, Opcode.MUL}
+        and op.addressing is Addressing.IMMEDIATE
+        and op.arg is not None
+        and _is_store(st)
+    )
+
+
+def _run_op_jz(machine: FastMachine, pc: int) -> bool:
+    op, jz = machine.memory[pc], machine.memory[pc + 1]
+    operand = machine.plain_operand(op)
+    if operand is None or not machine.arithmetic(op.opcode, operand):
+        return False
+    machine.program_counter = jz.arg if machine.alu.zero else pc + 2  # type: ignore[assignment]
+    return True
+
+
+def _run_ld_op_jz(machine: FastMachine, pc: int) -> bool:
+    ld, op, jz = machine.memory[pc : pc + 3]
+    value = machine.plain_operand(ld)
+    operand = machine.plain_operand(op)
+    if value is None or operand is None or (machine.alu.wrap(operand) == 0 and op.opcode in {Opcode.DIV, Opcode.MOD}):
+        return False
+    machine.data_path.accumulator = machine.alu.wrap(value)
+    machine.arithmetic(op.opcode, operand)
+    machine.program_counter = jz.arg if machine.alu.zero else pc + 3  # type: ignore[assignment]
+    return True
+
+
+def _run_increment(machine: FastMachine, pc: int) -> bool:
+    ld, op, st = machine.memory[pc : pc + 3]
+    value = machine.plain_operand(ld)
+    if value is None or not machine.is_plain(st.arg):
+        return False
+    machine.data_path.accumulator = machine.alu.wrap(value)
+    machine.arithmetic(op.opcode, op.arg)  # type: ignore[arg-type]
+    machine.store(st.arg, machine.data_path.accumulator)  # type: ignore[arg-type]
+    machine.program_counter = pc + 3
+    return True
+
+
+FUSIONS: list[tuple[int, Callable[[Sequence[Instruction]], bool], Callable[[FastMachine, int], bool]]] = [
+    (3, _match_ld_op_jz, _run_ld_op_jz),
+    (3, _match_increment, _run_increment),
+    (2, _match_op_jz, _run_op_jz),
+]
+
+
+class FastMachine:
+    program_counter: int
+    data_path: DataPath
+
+    _tick: int = 0
+    _instruction_number: int = 0
+
+    def __init__(self, pc: int, data_path: DataPath, fusion: bool = True, fast_forward: bool = True):
+        self.program_counter = pc
+        self.data_path = data_path
+        self.memory = data_path.memory
+        self.alu = data_path.alu
+        self.fusion = fusion
+        self.fused: dict[int, Fusion] = {}
+        self.covered: dict[int, set[int]] = {}
+        self.fused_dispatches = 0
+        self.kernels: dict[int, LoopKernel] = {}
+        self.loop_cover: dict[int, int] = {}
+        self.fast_forwards = 0
+        self.halt_reason: str | None = None
+        self.executors: dict[Opcode, Callable[[Instruction, Instruction], None]] = {
+            Opcode.LD: self._execute_ld,
+            Opcode.ST: self._execute_st,
+            Opcode.JMP: self._execute_jmp,
+            Opcode.JZ: self._execute_jz,
+            Opcode.HLT: self._execute_hlt,
+            Opcode.FAA: self._execute_faa,
+        }
+        self.space = data_path.space
+        self.plain_limit = self.space.plain_limit
+        if fusion:
+            for address, instruction in loaded_cells(self.memory):
+                if instruction.opcode is not Opcode.VAR:
+                    self.fuse_at(address)
+        # ядра циклов считают в неограниченных целых Python
+        if fast_forward and self.alu.word_width is None:
+            for loop in find_loops(self.memory, self.space):
+                self.kernels[loop.header] = compile_loop(self.memory, loop)
+                self.loop_cover.update(dict.fromkeys(range(loop.header, loop.tail + 1), loop.header))
+
+    def get_current_tick(self) -> int:
+        return self._tick
+
+    def get_instruction_number(self) -> int:
+        return self._instruction_number
+
+    def fuse_at(self, address: int):
+        """Ищет суперинструкцию, начинающуюся с `address`."""
+        for length, matches, handler in FUSIONS:
+            window = self.memory[address : address + length]
+            if len(window) == length and matches(window):
+                ticks = sum(instruction_ticks(instruction) for instruction in window)
+                self.fused[address] = Fusion(handler, length, ticks)
+                for covered in range(address, address + length):
+                    self.covered.setdefault(covered, set()).add(address)
+                return
+
+    def unfuse(self, address: int):
+        """Сбрасывает суперинструкции, затронутые записью в `address`, и ищет их заново."""
+        for start in self.covered.pop(address, set()):
+            fusion = self.fused.pop(start)
+            for covered in range(start, start + fusion.length):
+                self.covered.get(covered, set()).discard(start)
+        for start in range(max(0, address - 2), address + 1):
+            if start not in self.fused and self.memory[start].opcode is not Opcode.VAR:
+                self.fuse_at(start)
+
+    def is_plain(self, address: int | None) -> bool:
+        """Адрес - ячейка памяти, а не порт."""
+        return address is not None and (0 <= address < self.plain_limit or self.space.is_memory(address))
+
+    def plain_operand(self, instruction: Instruction) -> int | None:
+        """Операнд инструкции, если его чтение не затрагивает порты; иначе None."""
+        arg = instruction.arg
+        limit = self.plain_limit
+        if instruction.addressing is Addressing.INDIRECT:
+            if arg is None or not (0 <= arg < limit or self.space.is_memory(arg)):
+                return None
+            arg = self.memory[arg].arg
+        elif instruction.addressing is not Addressing.DIRECT:
+            return arg
+        if arg is None or not (0 <= arg < limit or self.space.is_memory(arg)):
+            return None
+        return self.memory[arg].arg
+
+    def arithmetic(self, opcode: Opcode, operand: int) -> bool:
+        """Арифметика суперинструкции. Деление на ноль не исполняется (False), чтобы ошибку выдал обычный путь."""
+        if self.alu.wrap(operand) == 0 and opcode in {Opcode.DIV, Opcode.MOD}:
+            return False
+        alu = self.alu
+        alu.left, alu.right = operand, self.data_path.accumulator
+        alu.signal_alu_operation(opcode)
+        if opcode is not Opcode.CMP:
+            self.data_path.accumulator = alu.out
+        return True
+
+    def read(self, address: int) -> Instruction:
+        assert address != self.space.output_port, "program tried to read from output port"
+        if address == self.space.input_port:
+            data_path = self.data_path
+            if len(data_path.input) == 0:
+                raise EOFError()
+            symbol = ord(data_path.input[0])
+            data_path.input = data_path.input[1:]
+            return Instruction(Opcode.VAR, symbol, Addressing.IMMEDIATE)
+        if address in self.data_path.dma.ports:
+            return Instruction(Opcode.VAR, self.data_path.dma.read_register(address), Addressing.IMMEDIATE)
+        assert 0 <= address < self.space.memory_size
+        return self.memory[address]
+
+    def store(self, address: int, value: int):
+        """Запись результата ST. Флаги АЛУ выставляются по значению, как при проходе аккумулятора через АЛУ."""
+        alu = self.alu
+        alu.left, alu.right = 0, value
+        alu.signal_alu_operation(Opcode.ADD)
+        self.put(address, alu.out)
+
+    def put(self, address: int, value: int):
+        """Запись в порт или память без прохода через АЛУ."""
+        assert address != self.space.input_port, "program tried to write to input port"
+        if address == self.space.output_port:
+            self.data_path.output.append(chr(value))
+            return
+        if address in self.data_path.dma.ports:
+            self.signal_dma(address, value)
+            return
+        assert 0 <= address < self.space.memory_size
+        self.write(address, value)
+
+    def signal_dma(self, port: int, value: int):
+        """Запись в регистр DMA: передача идет через `write`, такты простоя добавляются к текущей инструкции."""
+        data_path = self.data_path
+        data_path.input, output, ticks = data_path.dma.write_register(
+            port, value, data_path.input, lambda address: self.memory[address].arg, self.write
+        )
+        data_path.output += output
+        self._tick += ticks
+
+    def write(self, address: int, value: int):
+        """Запись в память с инвалидацией суперинструкций и циклов, чей код перезаписан."""
+        self.memory[address] = Instruction(Opcode.VAR, value)
+        if address in self.covered:
+            self.unfuse(address)
+        if address in self.loop_cover:
+            self.kernels.pop(self.loop_cover.pop(address), None)
+
+    def fetch_operand(self, instruction: Instruction) -> Instruction:
+        """Аналог `address_fetch` и `operand_fetch`: возвращает MEM_OUT перед исполнением."""
+        if instruction.addressing is Addressing.DIRECT:
+            operand = self.read(instruction.arg)  # type: ignore[arg-type]
+            self._tick += 1
+            return operand
+        if instruction.addressing is Addressing.INDIRECT:
+            pointer = self.read(instruction.arg)  # type: ignore[arg-type]
+            self._tick += 1
+            assert pointer.arg is not None, "mem_out should have an argument"
+            operand = self.read(pointer.arg)
+            self._tick += 1
+            return operand
+        return instruction
+
+    def _execute_ld(self, instruction: Instruction, operand: Instruction):
+        assert operand.arg is not None, "mem_out should have an argument"
+        self.data_path.accumulator = self.alu.wrap(operand.arg)
+        self.program_counter += 1
+
+    def _execute_st(self, instruction: Instruction, operand: Instruction):
+        assert operand.arg is not None, "mem_out should have an argument"
+        self.store(operand.arg, self.data_path.accumulator)
+        self.program_counter += 1
+
+    def _execute_faa(self, instruction: Instruction, operand: Instruction):
+        assert operand.arg is not None, "mem_out should have an argument"
+        old = self.read(operand.arg)
+        self._tick += 1
+        alu = self.alu
+        alu.left, alu.right = old.arg, self.data_path.accumulator  # type: ignore[assignment]
+        alu.signal_alu_operation(Opcode.ADD)
+        self.put(operand.arg, alu.out)
+        assert old.arg is not None, "mem_out should have an argument"
+        self.data_path.accumulator = self.alu.wrap(old.arg)
+        self.program_counter += 1
+
+    def _execute_arithmetic(self, instruction: Instruction, operand: Instruction):
+        alu = self.alu
+        alu.left, alu.right = operand.arg, self.data_path.accumulator  # type: ignore[assignment]
+        alu.signal_alu_operation(instruction.opcode)
+        if instruction.opcode is not Opcode.CMP:
+            self.data_path.accumulator = alu.out
+        self.program_counter += 1
+
+    def _execute_jmp(self, instruction: Instruction, operand: Instruction):
+        assert operand.arg is not None, "instruction should have an argument"
+        self.program_counter = operand.arg
+
+    def _execute_jz(self, instruction: Instruction, operand: Instruction):
+        if self.alu.zero:
+            self._execute_jmp(instruction, operand)
+        else:
+            self.program_counter += 1
+
+    def _execute_hlt(self, instruction: Instruction, operand: Instruction):
+        raise StopIteration()
+
+    def step(self):
+        """Исполняет одну инструкцию без суперинструкций."""
+        instruction = self.read(self.program_counter)
+        self._tick += 1
+        operand = self.fetch_operand(instruction)
+        assert instruction.opcode is not Opcode.VAR, "program tried to execute VAR instruction"
+        if is_arithmetic_instruction(instruction.opcode):
+            self._execute_arithmetic(instruction, operand)
+        else:
+            self.executors[instruction.opcode](instruction, operand)
+        self._tick += 1
+        self._instruction_number += 1
+
+    def fast_forward_loop(self, budget: int) -> bool:
+        """Прокручивает простой цикл с заголовком в текущем PC. False, если ускорить не удалось."""
+        kernel = self.kernels.get(self.program_counter)
+        if kernel is None:
+            return False
+        data_path, alu = self.data_path, self.alu
+        result = kernel.function(self.memory, data_path.accumulator, alu.zero, alu.negative, alu.out, budget)
+        if result is None or result.instructions == 0:
+            return False
+        data_path.accumulator = result.accumulator
+        alu.zero, alu.negative, alu.out = result.zero, result.negative, result.alu_out
+        for cell, value, written in zip(kernel.loop.cells, result.cells, result.written):
+            if written:
+                self.write(cell, value)
+        self.program_counter = result.pc
+        self._tick += result.ticks
+        self._instruction_number += result.instructions
+        self.fast_forwards += 1
+        return True
+
+    def execute_fused(self, budget: int) -> bool:
+        """Исполняет суперинструкцию в текущем PC. False, если ее нет или она не применима."""
+        fusion = self.fused.get(self.program_counter)
+        if fusion is None or budget < fusion.length or not fusion.handler(self, self.program_counter):
+            return False
+        self._tick += fusion.ticks
+        self._instruction_number += fusion.length
+        self.fused_dispatches += 1
+        return True
+
+    def run(self, limit: int = 1000000) -> str:
+        """Исполняет не более `limit` инструкций и возвращает причину останова."""
+        end = self._instruction_number + limit
+        try:
+            while self._instruction_number < end:
+                budget = end - self._instruction_number
+                if not (self.fast_forward_loop(budget) or self.execute_fused(budget)):
+                    self.step()
+            self.halt_reason = "limit"
+        except StopIteration:
+            self.halt_reason = "halt"
+        except EOFError:
+            self.halt_reason = "eof"
+        except DivisionByZeroError:
+            self.halt_reason = "trap"
+        return self.halt_reason
+
+
+def simulate_fast(
+    instructions: list[Instruction],
+    pc: int,
+    input_text: str,
+    fusion: bool = True,
+    limit: int = 1000000,
+    fast_forward: bool = True,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+) -> tuple[str, DataPath, FastMachine]:
+    data_path = DataPath(input_text, instructions, word_width, space)
+    machine = FastMachine(pc, data_path, fusion, fast_forward)
+    machine.run(limit)
+    return "".join(data_path.output), data_path, machine
+
+
+def main(code_file: str, input_file: str, fusion: bool, fast_forward: bool = True):
+    with open(input_file) as f:
+        input_text = f.read()
+        input_text += "\0"
+    with open(code_file) as f:
+        instructions, pc = read_json(f.read())
+    output, _datapath, machine = simulate_fast(instructions, pc, input_text, fusion, fast_forward=fast_forward)
+    if machine.halt_reason == "halt":
+        print("Program halted successfully")
+    elif machine.halt_reason == "eof":
+        print("Program tried to read empty input")
+    elif machine.halt_reason == "trap":
+        print("Program trapped on division by zero")
+    print(output)
+    print("Total instructions", machine.get_instruction_number())
+    print("Total ticks", machine.get_current_tick())
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) in [3, 4, 5], (
+        "Wrong arguments: fast_machine.py <code_file> <input_file> <fusion: true | false> <fast_forward: true | false>"
+    )
+    _, code_file, input_file = sys.argv[:3]
+    fusion = (sys.argv[3].lower() == "true") if len(sys.argv) >= 4 else True
+    fast_forward = (sys.argv[4].lower() == "true") if len(sys.argv) == 5 else True
+    main(code_file, input_file, fusion, fast_forward)
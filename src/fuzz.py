@@ -0,0 +1,409 @@
+"""Дифференциальное тестирование движков исполнения против эталонного `ControlUnit`.
+
+Генератор строит случайные корректные с точки зрения `isa` программы: ячейки данных, указатели на них,
+код с допустимыми режимами адресации, переходами внутри кода, портами ввода-вывода и записью в код.
+По запросу программы используют DMA, а машина - заданную разрядность слова и адресное пространство.
+Остановка гарантируется ограничением на количество инструкций.
+Каждая программа исполняется эталоном и проверяемыми движками; сравниваются вывод, память, регистры,
+регистры DMA, счетчики инструкций и тактов и исключение, которым закончилось исполнение.
+Программа, на которой движки разошлись, уменьшается (см. `shrink`), пока расхождение сохраняется.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from alu import DivisionByZeroError
+from aot import AotMachine, load_module
+from cli import space_fields, split_options, word_width_option
+from dma import DMA_READ, DMA_WRITE
+from fast_machine import FastMachine
+from isa import Addressing, Instruction, Opcode
+from machine import DEFAULT_SPACE, ControlUnit, DataPath
+from memory import EMPTY_CELL, AddressSpace, loaded_cells
+
+ARITHMETIC = [Opcode.ADD, Opcode.SUB, Opcode.MUL, Opcode.DIV, Opcode.MOD, Opcode.CMP]
+
+
+class Outcome(NamedTuple):
+    """Результат прогона. `stop` - причина останова (`halt`, `eof`, `limit`, `trap`) или имя исключения."""
+
+    stop: str
+    output: str
+    memory: tuple[tuple[int, Instruction], ...]
+    accumulator: int
+    pc: int
+    dma: tuple[int, int, int]
+    instructions: int
+    ticks: int
+    seconds: float
+
+    def differences(self, other: Outcome) -> list[str]:
+        """Поля, в которых результаты расходятся.
+
+        Деление на ноль (`trap`) - определенный останов, такты сравниваются и для него.
+        При исключении такты не сравниваются: эталон останавливается посреди инструкции.
+        """
+        fields = ["stop", "output", "memory", "accumulator", "pc", "dma", "instructions"]
+        if self.stop in {"halt", "eof", "limit", "trap"}:
+            fields += ["ticks"]
+        return [field for field in fields if getattr(self, field) != getattr(other, field)]
+
+
+class Case(NamedTuple):
+    instructions: list[Instruction]
+    pc: int
+    input_text: str
+    word_width: int | None = None
+    space: AddressSpace = DEFAULT_SPACE
+
+
+class Failure(NamedTuple):
+    engine: str
+    case: Case
+    differences: list[str]
+
+
+Engine = Callable[[Case, int], Outcome]
+
+
+def _outcome(stop: str, data_path: DataPath, machine: ControlUnit | FastMachine, started: float) -> Outcome:
+    """Память сравнивается по непустым ячейкам, чтобы не перебирать все адреса большого пространства."""
+    seconds = time.perf_counter() - started
+    dma = data_path.dma
+    return Outcome(
+        stop,
+        "".join(data_path.output),
+        tuple((address, cell) for address, cell in loaded_cells(data_path.memory) if cell != EMPTY_CELL),
+        data_path.accumulator,
+        machine.program_counter,
+        (dma.address, dma.length, dma.count),
+        machine.get_instruction_number(),
+        machine.get_current_tick(),
+        seconds,
+    )
+
+
+def run_reference(case: Case, limit: int) -> Outcome:
+    started = time.perf_counter()
+    data_path = DataPath(case.input_text, case.instructions, case.word_width, case.space)
+    data_path.logger.setLevel(logging.CRITICAL)
+    control_unit = ControlUnit(case.pc, data_path)
+    control_unit.logger.setLevel(logging.CRITICAL)
+    stop = "limit"
+    try:
+        for _ in range(limit):
+            control_unit.decode_and_execute()
+    except StopIteration:
+        stop = "halt"
+    except EOFError:
+        stop = "eof"
+    except DivisionByZeroError:
+        stop = "trap"
+    except Exception as e:
+        stop = type(e).__name__
+    return _outcome(stop, data_path, control_unit, started)
+
+
+def _run_machine(machine: FastMachine, limit: int, started: float) -> Outcome:
+    try:
+        stop = machine.run(limit)
+    except Exception as e:
+        stop = type(e).__name__
+    return _outcome(stop, machine.data_path, machine, started)
+
+
+def fast_engine(fusion: bool, fast_forward: bool) -> Engine:
+    def run(case: Case, limit: int) -> Outcome:
+        started = time.perf_counter()
+        data_path = DataPath(case.input_text, case.instructions, case.word_width, case.space)
+        return _run_machine(FastMachine(case.pc, data_path, fusion, fast_forward), limit, started)
+
+    return run
+
+
+def aot_engine(cache_dir: Path) -> Engine:
+    """Время прогона включает генерацию и загрузку модуля."""
+
+    def run(case: Case, limit: int) -> Outcome:
+        started = time.perf_counter()
+        data_path = DataPath(case.input_text, case.instructions, case.word_width, case.space)
+        module = load_module(case.instructions, case.pc, cache_dir)
+        return _run_machine(AotMachine(case.pc, data_path, module), limit, started)
+
+    return run
+
+
+def default_engines(cache_dir: Path) -> dict[str, Engine]:
+    return {
+        "fast": fast_engine(True, True),
+        "fast-plain": fast_engine(False, False),
+        "aot": aot_engine(cache_dir),
+    }
+
+
+class ProgramGenerator:
+    """Генератор программ: `data_size` ячеек данных (часть из них - указатели), затем `code_size` инструкций.
+
+    С `dma` в код вставляются передачи DMA. Изредка данные адресуются в конце адресного пространства `space`:
+    в большом пространстве это отдельная страница `PagedMemory`.
+    """
+
+    def __init__(
+        self,
+        rng: random.Random,
+        data_size: int = 8,
+        code_size: int = 24,
+        dma: bool = False,
+        word_width: int | None = None,
+        space: AddressSpace = DEFAULT_SPACE,
+    ):
+        self.rng = rng
+        self.data_size = data_size
+        self.code_size = code_size
+        self.pointers = range(data_size // 2, data_size)
+        self.dma = dma
+        self.word_width = word_width
+        self.space = space.validate()
+        end = max(data_size + code_size, space.memory_size - 4)
+        self.far = [address for address in range(end, space.memory_size) if space.is_memory(address)]
+
+    def data_address(self) -> int:
+        if self.far and self.rng.random() < 0.1:
+            return self.rng.choice(self.far)
+        return self.rng.randrange(self.data_size)
+
+    def value(self) -> int:
+        """Непосредственное значение; при заданной разрядности иногда - на границе диапазона слова."""
+        rng = self.rng
+        if self.word_width is not None and rng.random() < 0.3:
+            bound = 1 << (self.word_width - 1)
+            return rng.choice([-bound, bound - 1, rng.randint(-bound, bound - 1)])
+        return rng.randint(-3, 120)
+
+    def source(self) -> int:
+        """Адрес чтения: ячейка данных, изредка порт ввода или регистр DMA."""
+        kind = self.rng.random()
+        if kind < 0.1:
+            return self.space.input_port
+        if self.dma and kind < 0.15:
+            return self.rng.choice(self.space.dma_ports)
+        return self.data_address()
+
+    def code_address(self) -> int:
+        return self.rng.randrange(self.data_size, self.data_size + self.code_size)
+
+    def operand(self, opcode: Opcode) -> tuple[int, Addressing]:
+        """Операнд LD, арифметики и FAA: число, ячейка данных или порт ввода, указатель.
+
+        Без ограничения разрядности множитель - только малое число: умножение на ячейку может
+        возводить аккумулятор в квадрат, и длина чисел растет экспоненциально от числа итераций.
+        """
+        rng = self.rng
+        kind = rng.random()
+        if opcode is Opcode.FAA:
+            return self.data_address(), Addressing.IMMEDIATE
+        if kind < 0.4 or (opcode is Opcode.MUL and self.word_width is None):
+            value = rng.randint(0, 3) if opcode in {Opcode.MUL, Opcode.DIV, Opcode.MOD} else self.value()
+            return value, Addressing.IMMEDIATE
+        if kind < 0.8:
+            return self.source(), Addressing.DIRECT
+        return rng.choice(self.pointers), Addressing.INDIRECT
+
+    def store(self) -> tuple[int, Addressing]:
+        """Адрес ST: ячейка данных, порт вывода, изредка код; или указатель."""
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.3:
+            return self.space.output_port, Addressing.IMMEDIATE
+        if kind < 0.4:
+            return self.code_address(), Addressing.IMMEDIATE
+        if kind < 0.8:
+            return self.data_address(), Addressing.IMMEDIATE
+        return rng.choice(self.pointers), rng.choice([Addressing.DIRECT, Addressing.INDIRECT])
+
+    def instruction(self) -> Instruction:
+        rng = self.rng
+        opcode = rng.choices(
+            [Opcode.LD, Opcode.ST, Opcode.JMP, Opcode.JZ, Opcode.FAA, Opcode.HLT, *ARITHMETIC],
+            weights=[6, 5, 2, 4, 1, 1, 3, 2, 1, 1, 1, 3],
+        )[0]
+        if opcode is Opcode.HLT:
+            return Instruction(opcode, None, None)
+        if opcode in {Opcode.JMP, Opcode.JZ}:
+            return Instruction(opcode, self.code_address(), Addressing.IMMEDIATE)
+        if opcode is Opcode.ST:
+            return Instruction(opcode, *self.store())
+        return Instruction(opcode, *self.operand(opcode))
+
+    def dma_transfer(self) -> list[Instruction]:
+        """Передача DMA: адрес буфера, длина и команда чтения или записи."""
+        rng = self.rng
+        address_port, length_port, control_port = self.space.dma_ports
+        return [
+            Instruction(Opcode.LD, self.data_address(), Addressing.IMMEDIATE),
+            Instruction(Opcode.ST, address_port, Addressing.IMMEDIATE),
+            Instruction(Opcode.LD, rng.randint(0, 4), Addressing.IMMEDIATE),
+            Instruction(Opcode.ST, length_port, Addressing.IMMEDIATE),
+            Instruction(Opcode.LD, rng.choice([DMA_READ, DMA_WRITE]), Addressing.IMMEDIATE),
+            Instruction(Opcode.ST, control_port, Addressing.IMMEDIATE),
+        ]
+
+    def generate(self) -> Case:
+        rng = self.rng
+        data = [Instruction(Opcode.VAR, self.value()) for _ in range(self.data_size // 2)]
+        data += [Instruction(Opcode.VAR, self.data_address()) for _ in self.pointers]
+        code: list[Instruction] = []
+        while len(code) < self.code_size - 1:
+            if self.dma and rng.random() < 0.1:
+                code += self.dma_transfer()
+            else:
+                code.append(self.instruction())
+        code = [*code[: self.code_size - 1], Instruction(Opcode.HLT, None, None)]
+        letters = "".join(rng.choice("abc xyz\n") for _ in range(rng.randint(0, 6)))
+        input_text = letters + ("\0" if rng.random() < 0.5 else "")
+        return Case(data + code, self.data_size, input_text, self.word_width, self.space)
+
+
+def find_differences(engine: Engine, case: Case, limit: int) -> list[str]:
+    return run_reference(case, limit).differences(engine(case, limit))
+
+
+def _shift_code_address(instruction: Instruction, removed: int, pc: int, end: int) -> Instruction:
+    opcode, arg, addressing = instruction
+    targets_code = opcode in {Opcode.JMP, Opcode.JZ, Opcode.ST} and addressing is Addressing.IMMEDIATE
+    if targets_code and arg is not None and removed < arg < end and arg >= pc:
+        return Instruction(opcode, arg - 1, addressing)
+    return instruction
+
+
+def remove_instruction(case: Case, removed: int) -> Case:
+    """Удаляет инструкцию кода и сдвигает адреса кода в переходах и ST после нее.
+    Данные лежат до точки входа, поэтому их адреса не меняются.
+    """
+    instructions, pc = case.instructions, case.pc
+    rest = [*instructions[:removed], *instructions[removed + 1 :]]
+    return case._replace(
+        instructions=[_shift_code_address(instruction, removed, pc, len(instructions)) for instruction in rest]
+    )
+
+
+def _simpler_instructions(instruction: Instruction) -> list[Instruction]:
+    opcode, arg, addressing = instruction
+    simpler = [Instruction(Opcode.HLT, None, None)]
+    if addressing is Addressing.INDIRECT:
+        simpler += [Instruction(opcode, arg, Addressing.DIRECT)]
+    if addressing is Addressing.IMMEDIATE and opcode not in {Opcode.JMP, Opcode.JZ, Opcode.ST, Opcode.FAA}:
+        simpler += [Instruction(opcode, 0, addressing)]
+    return [candidate for candidate in simpler if candidate != instruction]
+
+
+def _replace(case: Case, address: int, instruction: Instruction) -> Case:
+    return case._replace(instructions=[*case.instructions[:address], instruction, *case.instructions[address + 1 :]])
+
+
+def _candidates(case: Case) -> Iterator[Case]:
+    """Упрощения программы: удаление инструкции, обрезка ввода, замена инструкции на `HLT`,
+    упрощение адресации и аргумента, обнуление данных.
+    """
+    instructions, pc, input_text = case.instructions, case.pc, case.input_text
+    for address in range(pc, len(instructions)):
+        yield remove_instruction(case, address)
+    if input_text:
+        yield case._replace(input_text=input_text[:-1])
+    for address in range(pc, len(instructions)):
+        for instruction in _simpler_instructions(instructions[address]):
+            yield _replace(case, address, instruction)
+    for address in range(pc):
+        if instructions[address].arg != 0:
+            yield _replace(case, address, Instruction(Opcode.VAR, 0))
+
+
+def shrink(engine: Engine, case: Case, limit: int) -> Case:
+    """Жадно применяет упрощения, пока движок продолжает расходиться с эталоном."""
+    shrunk = True
+    while shrunk:
+        shrunk = False
+        for candidate in _candidates(case):
+            if find_differences(engine, candidate, limit):
+                case, shrunk = candidate, True
+                break
+    return case
+
+
+def format_case(case: Case) -> str:
+    lines = [f"{address:4}  {instruction!r}" for address, instruction in enumerate(case.instructions)]
+    header = f"pc: {case.pc}, input: {case.input_text!r}"
+    if case.word_width is not None:
+        header += f", word width: {case.word_width}"
+    if case.space != DEFAULT_SPACE:
+        header += f", {case.space}"
+    return "\n".join([header, *lines])
+
+
+def fuzz(
+    engines: dict[str, Engine],
+    runs: int,
+    seed: int = 0,
+    limit: int = 2000,
+    dma: bool = False,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+) -> tuple[list[Failure], dict[str, tuple[int, float]]]:
+    """Прогоняет `runs` случайных программ (`dma`, `word_width` и `space` - см. `ProgramGenerator`).
+    Возвращает уменьшенные расхождения и суммарные количество инструкций и время по движкам (включая `reference`).
+    """
+    generator = ProgramGenerator(random.Random(seed), dma=dma, word_width=word_width, space=space)
+    failures: list[Failure] = []
+    throughput = {name: (0, 0.0) for name in ["reference", *engines]}
+    for _ in range(runs):
+        case = generator.generate()
+        expected = run_reference(case, limit)
+        instructions, seconds = throughput["reference"]
+        throughput["reference"] = (instructions + expected.instructions, seconds + expected.seconds)
+        for name, engine in engines.items():
+            actual = engine(case, limit)
+            instructions, seconds = throughput[name]
+            throughput[name] = (instructions + actual.instructions, seconds + actual.seconds)
+            differences = expected.differences(actual)
+            if differences:
+                failures.append(Failure(name, shrink(engine, case, limit), differences))
+    return failures, throughput
+
+
+def main(runs: int, seed: int, names: list[str], options: dict[str, str] | None = None):
+    """`options` - опции командной строки: `dma`, `word-width` и поля адресного пространства, как у `machine.py`."""
+    options = options or {}
+    word_width = word_width_option(options)
+    space = DEFAULT_SPACE._replace(**space_fields(options))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engines = default_engines(Path(cache_dir))
+        selected = {name: engines[name] for name in names or engines}
+        failures, throughput = fuzz(selected, runs, seed, dma="dma" in options, word_width=word_width, space=space)
+    for failure in failures:
+        print(f"Engine {failure.engine} differs in {', '.join(failure.differences)}:")
+        print(format_case(failure.case))
+    reference_instructions, reference_seconds = throughput["reference"]
+    reference_speed = reference_instructions / reference_seconds if reference_seconds else 0.0
+    for name, (instructions, seconds) in throughput.items():
+        speed = instructions / seconds if seconds else 0.0
+        relative = speed / reference_speed if reference_speed else 0.0
+        print(f"{name}: {instructions} instructions, {speed:.0f} instr/s, x{relative:.2f}")
+    print("Failures", len(failures))
+
+
+if __name__ == "__main__":
+    args, options = split_options(sys.argv[1:])
+    assert len(args) >= 1, (
+        "Wrong arguments: fuzz.py <runs> [seed] [engines...] [--dma] [--word-width=<bits>] "
+        "[--memory-size=<words>] [--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+    )
+    seed = int(args[1]) if len(args) >= 2 else 0
+    main(int(args[0]), seed, args[2:], options)
@@ -26,6 +26,9 @@ class Opcode(str, Enum):
     # Memory
     LD = "ld"
     ST = "st"
+    # Атомарное сложение с памятью (fetch-and-add): адрес задается как у ST,
+    # в память пишется `memory[addr] + acc`, в аккумулятор - прежнее значение ячейки
+    FAA = "faa"
     # Control
     JMP = "jmp"
     JZ = "jz"
@@ -95,3 +98,22 @@ def is_arithmetic_instruction(opcode: Opcode):
         Opcode.MOD,
         Opcode.CMP,
     }
+
+
+ADDRESSING_TICKS = {
+    None: 0,
+    Addressing.IMMEDIATE: 0,
+    Addressing.DIRECT: 1,
+    Addressing.INDIRECT: 2,
+}
+
+
+def instruction_ticks(instruction: Instruction) -> int:
+    """Статическая стоимость инструкции в тактах для `ControlUnit`.
+
+    Выборка инструкции - 1 такт, выборка адреса и операнда - по такту на каждое чтение памяти
+    (см. `ADDRESSING_TICKS`), исполнение - 1 такт. `HLT` останавливает машину до такта исполнения,
+    `FAA` тратит дополнительный такт на чтение изменяемой ячейки.
+    """
+    execute = {Opcode.HLT: 0, Opcode.FAA: 2}.get(instruction.opcode, 1)
+    return 1 + ADDRESSING_TICKS[instruction.addressing] + execute
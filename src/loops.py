@@ -0,0 +1,228 @@
+"""Распознавание простых циклов и их ускоренное исполнение.
+
+Цикл - это участок `[header, tail]`, который заканчивается переходом `JMP header` или `JZ header`.
+Цикл считается простым, если его тело - чистая функция аккумулятора, флагов и нескольких ячеек памяти:
+- только `LD`, `ST`, арифметика и переходы с непосредственной или прямой адресацией;
+- нет обращений к портам ввода-вывода и косвенной адресации;
+- `ST` пишет по константному адресу вне тела цикла (нет самомодификации);
+- переходы внутри тела ведут только вперед или на заголовок.
+
+Для такого цикла генерируется функция на Python, которая держит ячейки в локальных переменных
+и прокручивает итерации без диспетчеризации инструкций, накапливая количество инструкций и тактов
+по статическим стоимостям базовых блоков.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from typing import NamedTuple
+
+from isa import Addressing, Instruction, Opcode, instruction_ticks, is_arithmetic_instruction
+from machine import DEFAULT_SPACE
+from memory import AddressSpace, loaded_cells
+
+ARITHMETIC_EXPRESSIONS = {
+    Opcode.ADD: "acc + {}",
+    Opcode.SUB: "acc - {}",
+    Opcode.MUL: "acc * {}",
+    Opcode.DIV: "acc // {}",
+    Opcode.MOD: "acc % {}",
+    Opcode.CMP: "acc - {}",
+}
+
+
+class Loop(NamedTuple):
+    header: int
+    tail: int
+    reads: frozenset[int]
+    writes: frozenset[int]
+
+    @property
+    def length(self) -> int:
+        return self.tail - self.header + 1
+
+    @property
+    def cells(self) -> list[int]:
+        return sorted(self.reads | self.writes)
+
+
+class KernelResult(NamedTuple):
+    """Состояние после ускоренного исполнения: PC, регистры, ячейки (в порядке `Loop.cells`) и счетчики."""
+
+    pc: int
+    accumulator: int
+    zero: bool
+    negative: bool
+    alu_out: int
+    cells: tuple[int, ...]
+    written: tuple[bool, ...]
+    instructions: int
+    ticks: int
+
+
+class LoopKernel(NamedTuple):
+    loop: Loop
+    source: str
+    function: Callable[..., KernelResult | None]
+
+
+def _check_jump(instruction: Instruction, pc: int, loop: range) -> bool:
+    if instruction.addressing is not Addressing.IMMEDIATE or instruction.arg is None:
+        return False
+    target = instruction.arg
+    return target not in loop or target == loop.start or target > pc
+
+
+def _check_instruction(instruction: Instruction, pc: int, loop: range, space: AddressSpace) -> bool:
+    opcode = instruction.opcode
+    if opcode in {Opcode.JMP, Opcode.JZ}:
+        return _check_jump(instruction, pc, loop)
+    if opcode is Opcode.ST:
+        return (
+            instruction.addressing is Addressing.IMMEDIATE
+            and space.is_memory(instruction.arg)
+            and instruction.arg not in loop
+        )
+    if opcode is not Opcode.LD and not is_arithmetic_instruction(opcode):
+        return False
+    if instruction.addressing is Addressing.DIRECT:
+        return space.is_memory(instruction.arg)
+    return instruction.addressing is Addressing.IMMEDIATE and instruction.arg is not None
+
+
+def analyze_loop(
+    memory: Sequence[Instruction], header: int, tail: int, space: AddressSpace = DEFAULT_SPACE
+) -> Loop | None:
+    """Проверяет, что участок `[header, tail]` - простой цикл, и собирает используемые ячейки."""
+    loop = range(header, tail + 1)
+    reads, writes = set(), set()
+    for pc in loop:
+        instruction = memory[pc]
+        if not _check_instruction(instruction, pc, loop, space):
+            return None
+        if instruction.opcode is Opcode.ST:
+            writes.add(instruction.arg)
+        elif instruction.addressing is Addressing.DIRECT:
+            reads.add(instruction.arg)
+    return Loop(header, tail, frozenset(reads), frozenset(writes))  # type: ignore[arg-type]
+
+
+def find_loops(memory: Sequence[Instruction], space: AddressSpace = DEFAULT_SPACE) -> list[Loop]:
+    """Ищет простые циклы по обратным переходам. Для каждого заголовка берется самый длинный цикл."""
+    tails: dict[int, int] = {}
+    for pc, instruction in loaded_cells(memory):
+        if (
+            instruction.opcode in {Opcode.JMP, Opcode.JZ}
+            and instruction.addressing is Addressing.IMMEDIATE
+            and instruction.arg is not None
+            and 0 <= instruction.arg <= pc
+        ):
+            tails[instruction.arg] = pc
+    loops = [analyze_loop(memory, header, tail, space) for header, tail in tails.items()]
+    return [loop for loop in loops if loop is not None]
+
+
+def _operand(instruction: Instruction) -> str:
+    if instruction.addressing is Addressing.DIRECT:
+        return f"c{instruction.arg}"
+    return str(instruction.arg)
+
+
+def _emit_instruction(instruction: Instruction, pc: int) -> list[str]:
+    """Код для одной инструкции. Переходы устанавливают переменную `pc`."""
+    opcode = instruction.opcode
+    if opcode is Opcode.LD:
+        return [f"acc = {_operand(instruction)}"]
+    if opcode is Opcode.ST:
+        return [
+            "out = acc",
+            "zero = acc == 0",
+            "negative = acc < 0",
+            f"c{instruction.arg} = acc",
+            f"w{instruction.arg} = True",
+        ]
+    if opcode is Opcode.JMP:
+        return [f"pc = {instruction.arg}"]
+    if opcode is Opcode.JZ:
+        return [f"pc = {instruction.arg} if zero else {pc + 1}"]
+    result = "t" if opcode is Opcode.CMP else "out"
+    lines = [f"{result} = {ARITHMETIC_EXPRESSIONS[opcode].format(_operand(instruction))}"]
+    lines += [f"zero = {result} == 0", f"negative = {result} < 0"]
+    if opcode is not Opcode.CMP:
+        lines += ["acc = out"]
+    return lines
+
+
+def _leaders(memory: Sequence[Instruction], loop: Loop) -> list[int]:
+    leaders = {loop.header}
+    for pc in range(loop.header, loop.tail + 1):
+        instruction = memory[pc]
+        if instruction.opcode in {Opcode.JMP, Opcode.JZ}:
+            if loop.header <= instruction.arg <= loop.tail:  # type: ignore[operator]
+                leaders.add(instruction.arg)  # type: ignore[arg-type]
+            if pc < loop.tail:
+                leaders.add(pc + 1)
+    return sorted(leaders)
+
+
+def _emit_block(memory: Sequence[Instruction], start: int, end: int) -> list[str]:
+    lines = []
+    for pc in range(start, end):
+        lines += _emit_instruction(memory[pc], pc)
+    last = memory[end - 1]
+    if last.opcode not in {Opcode.JMP, Opcode.JZ}:
+        lines += [f"pc = {end}"]
+    ticks = sum(instruction_ticks(memory[pc]) for pc in range(start, end))
+    lines += [f"instructions += {end - start}", f"ticks += {ticks}"]
+    return lines
+
+
+def generate_source(memory: Sequence[Instruction], loop: Loop) -> str:
+    cells = loop.cells
+    state = ", ".join(["acc", "zero", "negative", "out", *[f"c{cell}" for cell in cells], "instructions", "ticks"])
+    cells_tuple = "".join(f"c{cell}, " for cell in cells)
+    written_tuple = "".join(f"w{cell}, " for cell in cells)
+    result = f"Result(pc, acc, zero, negative, out, ({cells_tuple}), ({written_tuple}), instructions, ticks)"
+    lines = [
+        "def kernel(mem, acc, zero, negative, out, budget):",
+        *[f"    c{cell} = mem[{cell}].arg" for cell in cells],
+        *[f"    if c{cell} is None:\n        return None" for cell in sorted(loop.reads)],
+        *[f"    w{cell} = False" for cell in cells],
+        "    instructions = ticks = 0",
+        f"    pc = {loop.header}",
+        f"    while instructions + {loop.length} <= budget:",
+        f"        saved = {state}",
+        "        try:",
+        "            while True:",
+    ]
+    leaders = _leaders(memory, loop)
+    for i, start in enumerate(leaders):
+        end = leaders[i + 1] if i + 1 < len(leaders) else loop.tail + 1
+        lines += [f"                {'if' if i == 0 else 'elif'} pc == {start}:"]
+        lines += [f"                    {line}" for line in _emit_block(memory, start, end)]
+    lines += [
+        "                else:",
+        f"                    return {result}",
+        f"                if pc == {loop.header}:",
+        "                    break",
+        "        except ZeroDivisionError:",
+        f"            {state} = saved",
+        f"            pc = {loop.header}",
+        "            break",
+        f"    return {result}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def compile_loop(memory: Sequence[Instruction], loop: Loop) -> LoopKernel:
+    """Генерирует функцию `kernel(mem, acc, zero, negative, out, budget) -> KernelResult | None`.
+
+    Функция выполняет целые итерации, пока их суммарная длина укладывается в `budget` инструкций,
+    и возвращает состояние на выходе из цикла или в его заголовке.
+    При делении на ноль откатывается к началу итерации, чтобы ошибку выдал обычный интерпретатор.
+    None означает, что одна из читаемых ячеек не содержит значения.
+    """
+    source = generate_source(memory, loop)
+    namespace: dict[str, object] = {"Result": KernelResult}
+    exec(compile(source, f"<loop {loop.header}-{loop.tail}>", "exec"), namespace)
+    return LoopKernel(loop, source, namespace["kernel"])  # type: ignore[arg-type]
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
+import json
 import logging
 import sys
+import time
+from collections.abc import MutableSequence
 from enum import Enum
 
-from alu import ALU
+from alu import ALU, DivisionByZeroError
+from cli import parse_arguments, space_fields, word_width_option
+from dma import DMA_ADDRESS_PORT, DmaController
 from isa import Addressing, Instruction, Opcode, is_arithmetic_instruction, read_json
+from memory import AddressSpace, make_memory
+from memory_profile import Access, MemoryProfile, code_addresses
+
+MEMORY_SIZE = 2046
+INPUT_PORT = 2046
+OUTPUT_PORT = 2047
+DEFAULT_SPACE = AddressSpace(MEMORY_SIZE, INPUT_PORT, OUTPUT_PORT, DMA_ADDRESS_PORT)
 
 
 class RegisterSelector(Enum):
@@ -19,23 +31,42 @@ class DataPath:
     address_register: int
     mem_out: Instruction | None
 
-    def __init__(self, input_str: str, initial_memory: list[Instruction] = []):
+    def __init__(
+        self,
+        input_str: str,
+        initial_memory: list[Instruction] = [],
+        word_width: int | None = None,
+        space: AddressSpace = DEFAULT_SPACE,
+        memory: MutableSequence[Instruction] | None = None,
+        dma: DmaController | None = None,
+    ):
         """
         Для простоты реализации в памяти хранятся инструкции.
         чтобы сохранить число необходимо указать `Opcode.VAR` и `Addressing.Immediate`
+        `word_width` - разрядность слова АЛУ (None - без ограничения, см. `alu`).
+        `space` - размер памяти и адреса портов (см. `memory`).
+        `memory` и `dma` - уже созданные память и устройство DMA (общие для ядер, см. `multicore`),
+        тогда `initial_memory` не используется.
         """
-        self.memory = [Instruction(Opcode.VAR, 0, Addressing.IMMEDIATE)] * 2046
-
-        for i in range(len(initial_memory)):
-            self.memory[i] = initial_memory[i]
+        self.space = space.validate()
+        self.memory = make_memory(space.memory_size, initial_memory) if memory is None else memory
 
         self.address_register: int = 0
         self.accumulator: int = 0
         self.input = input_str
         self.output: list[str] = []
-        self.alu = ALU()
+        self.alu = ALU(word_width)
         self.mem_out = None
+        self.memory_reads = 0
+        self.memory_writes = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.dma = DmaController(space.memory_size, space.dma_port) if dma is None else dma
+        self.dma_ticks = 0
+        self.plain_limit = space.plain_limit
+        self.profile: MemoryProfile | None = None
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.logger.handlers.clear()
         sh = logging.StreamHandler(sys.stderr)
         sh.setFormatter(
             logging.Formatter(
@@ -53,34 +84,79 @@ class DataPath:
             "mem_out": self.mem_out.arg if (self.mem_out is not None and self.mem_out.arg is not None) else 0,
         }
 
-    def signal_read_memory(self):
-        assert self.address_register != 2047, "program tried to read from output port"
+    def signal_read_memory(self, access: Access = Access.OPERAND):
+        """Чтение по адресу из AR. `access` - вид обращения для профиля памяти."""
         self.logger.debug(f"Reading memory on AR #{self.address_register}", extra=self._get_extra())
-        if self.address_register == 2046:  # Input
+        if 0 <= self.address_register < self.plain_limit:
+            self.mem_out = self.memory[self.address_register]
+            self.memory_reads += 1
+            if self.profile is not None:
+                self.profile.record(access, self.address_register)
+            self.logger.debug(f"MEM_OUT <- MEM[{self.address_register}]", extra=self._get_extra())
+            return
+        assert self.address_register != self.space.output_port, "program tried to read from output port"
+        if self.address_register == self.space.input_port:
             if len(self.input) == 0:
-                self.logger.warning("Input buffer is empty!")
+                self.logger.warning("Input buffer is empty!", extra=self._get_extra())
                 raise EOFError()
             symbol = ord(self.input[0])
             self.logger.info(f"Input: {self.input[0]!r} ({symbol})", extra=self._get_extra())
             self.input = self.input[1:]
+            self.input_bytes += 1
             self.mem_out = Instruction(Opcode.VAR, symbol, Addressing.IMMEDIATE)
             self.logger.debug(f"MEM_OUT <- {chr(symbol)!r} ({symbol})", extra=self._get_extra())
             return
-        assert 0 <= self.address_register < 2046
+        if self.address_register in self.dma.ports:
+            self.mem_out = Instruction(Opcode.VAR, self.dma.read_register(self.address_register), Addressing.IMMEDIATE)
+            self.logger.debug(f"MEM_OUT <- DMA[{self.address_register}]", extra=self._get_extra())
+            return
+        assert 0 <= self.address_register < self.space.memory_size
         self.mem_out = self.memory[self.address_register]
+        self.load_cell(self.address_register, access)
         self.logger.debug(f"MEM_OUT <- MEM[{self.address_register}]", extra=self._get_extra())
 
     def signal_write_memory(self):
-        assert self.address_register != 2046, "program tried to write to input port"
         self.logger.debug(f"Writing to memory on AR #{self.address_register}", extra=self._get_extra())
-        if self.address_register == 2047:
+        if 0 <= self.address_register < self.plain_limit:
+            self.store_cell(self.address_register, self.alu.out)
+            return
+        assert self.address_register != self.space.input_port, "program tried to write to input port"
+        if self.address_register == self.space.output_port:
             char = chr(self.alu.out)
             self.logger.info(f"Output: {chr(self.alu.out)!r} ({self.alu.out})", extra=self._get_extra())
             self.output += [char]
+            self.output_bytes += 1
+            return
+        if self.address_register in self.dma.ports:
+            self.signal_dma(self.address_register, self.alu.out)
             return
-        assert 0 <= self.address_register < 2046
-        self.memory[self.address_register] = Instruction(Opcode.VAR, self.alu.out)
-        self.logger.debug(f"MEM[{self.address_register}] <- {self.alu.out}", extra=self._get_extra())
+        assert 0 <= self.address_register < self.space.memory_size
+        self.store_cell(self.address_register, self.alu.out)
+
+    def load_cell(self, address: int, access: Access = Access.OPERAND) -> int | None:
+        """Чтение ячейки памяти устройством DMA (и процессором по адресу, перекрытому портом)."""
+        self.memory_reads += 1
+        if self.profile is not None:
+            self.profile.record(access, address)
+        return self.memory[address].arg
+
+    def store_cell(self, address: int, value: int):
+        """Запись в ячейку памяти процессором или устройством DMA."""
+        self.memory_writes += 1
+        if self.profile is not None:
+            self.profile.record(Access.STORE, address)
+        self.memory[address] = Instruction(Opcode.VAR, value)
+        self.logger.debug(f"MEM[{address}] <- {value}", extra=self._get_extra())
+
+    def signal_dma(self, port: int, value: int):
+        """Запись в регистр DMA. Такты передачи копятся в `dma_ticks`, их отрабатывает `ControlUnit`."""
+        input_size = len(self.input)
+        self.input, output, ticks = self.dma.write_register(port, value, self.input, self.load_cell, self.store_cell)
+        self.dma_ticks += ticks
+        self.input_bytes += input_size - len(self.input)
+        self.output += output
+        self.output_bytes += len(output)
+        self.logger.info(f"DMA[{port}] <- {value}: {ticks} ticks", extra=self._get_extra())
 
     def signal_latch_address_register(self, sel: RegisterSelector, pc: int):
         if sel is RegisterSelector.ALU:
@@ -105,10 +181,66 @@ class DataPath:
         elif sel is RegisterSelector.MEM:
             assert self.mem_out is not None, "mem_out should not be None"
             assert self.mem_out.arg is not None, "mem_out should have an argument"
-            self.accumulator = self.mem_out.arg
+            self.accumulator = self.alu.wrap(self.mem_out.arg)
             self.logger.debug("ACC <- MEM_OUT", extra=self._get_extra())
 
 
+class RunMetrics:
+    """Счетчики прогона для машиночитаемого отчета (см. `report`).
+
+    Заполняются, если переданы в `simulate` (или в `ControlUnit`); без них машина не тратит время на учет.
+    """
+
+    def __init__(self):
+        self.by_opcode: dict[str, dict[str, int]] = {}
+        self.by_addressing: dict[str, dict[str, int]] = {}
+        self.instructions = 0
+        self.ticks = 0
+        self.memory = {"reads": 0, "writes": 0}
+        self.io = {"input_bytes": 0, "output_bytes": 0}
+        self.halt_reason: str | None = None
+        self.wall_time = 0.0
+
+    def record(self, instruction: Instruction, ticks: int):
+        addressing = instruction.addressing.value if instruction.addressing is not None else "none"
+        for key, table in [(instruction.opcode.value, self.by_opcode), (addressing, self.by_addressing)]:
+            counters = table.setdefault(key, {"instructions": 0, "ticks": 0})
+            counters["instructions"] += 1
+            counters["ticks"] += ticks
+
+    def finish(self, data_path: DataPath, control_unit: ControlUnit, wall_time: float):
+        """Итоги прогона: счетчики `DataPath` и `ControlUnit` на момент остановки."""
+        self.instructions = control_unit.get_instruction_number()
+        self.ticks = control_unit.get_current_tick()
+        self.memory = {"reads": data_path.memory_reads, "writes": data_path.memory_writes}
+        self.io = {"input_bytes": data_path.input_bytes, "output_bytes": data_path.output_bytes}
+        self.halt_reason = control_unit.halt_reason
+        self.wall_time = wall_time
+
+    def report(self) -> dict:
+        """Отчет о прогоне.
+
+        `instructions` совпадает с `ControlUnit.get_instruction_number` и не учитывает остановивший машину `HLT`,
+        а в разбивке по опкодам и режимам адресации он учтен, чтобы такты в разбивке давали `ticks`.
+        """
+        instructions, ticks = self.instructions, self.ticks
+        return {
+            "instructions": instructions,
+            "ticks": ticks,
+            "cpi": ticks / instructions if instructions else None,
+            "by_opcode": self.by_opcode,
+            "by_addressing": self.by_addressing,
+            "memory": self.memory,
+            "io": self.io,
+            "halt_reason": self.halt_reason,
+            "host": {
+                "wall_time_seconds": self.wall_time,
+                "instructions_per_second": instructions / self.wall_time if self.wall_time else None,
+                "ticks_per_second": ticks / self.wall_time if self.wall_time else None,
+            },
+        }
+
+
 class ControlUnit:
     program: Instruction
     program_counter: int
@@ -142,9 +274,11 @@ class ControlUnit:
             else 0,
         }
 
-    def __init__(self, pc: int, data_path: DataPath):
+    def __init__(self, pc: int, data_path: DataPath, metrics: RunMetrics | None = None):
         self.program_counter = pc
         self.data_path = data_path
+        self.metrics = metrics
+        self.halt_reason: str | None = None
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.handlers.clear()
         sh = logging.StreamHandler(sys.stderr)
@@ -180,7 +314,7 @@ class ControlUnit:
         self.signal_latch_address_register(
             RegisterSelector.PC,
         )
-        self.data_path.signal_read_memory()
+        self.data_path.signal_read_memory(Access.FETCH)
         self.signal_latch_program()
         self.tick()
 
@@ -240,6 +374,36 @@ class ControlUnit:
         self.data_path.alu.signal_sel_right(self.data_path.accumulator, True)
         self.data_path.alu.signal_alu_operation(Opcode.ADD)
         self.data_path.signal_write_memory()
+        if self.data_path.dma_ticks:
+            self.dma_stall()
+        self.signal_latch_pc(False)
+        self.tick()
+
+    def dma_stall(self):
+        """Простой процессора, пока устройство DMA передает блок."""
+        while self.data_path.dma_ticks > 0:
+            self.data_path.dma_ticks -= 1
+            self.tick()
+
+    def _execute_jump(self):
+        self.signal_latch_pc(self.program.opcode is Opcode.JMP or self.data_path.alu.zero)
+        self.tick()
+
+    def _execute_faa(self):
+        self.signal_latch_address_register(
+            RegisterSelector.MEM,
+        )
+        self.data_path.signal_read_memory()
+        self.tick()
+        self.data_path.alu.signal_sel_left(self.data_path.mem_out.arg, True)
+        self.data_path.alu.signal_sel_right(self.data_path.accumulator, True)
+        self.data_path.alu.signal_alu_operation(Opcode.ADD)
+        self.data_path.signal_write_memory()
+        if self.data_path.dma_ticks:
+            self.dma_stall()
+        self.signal_latch_accumulator(
+            RegisterSelector.MEM,
+        )
         self.signal_latch_pc(False)
         self.tick()
 
@@ -251,21 +415,25 @@ class ControlUnit:
             self._execute_ld()
         if self.program.opcode is Opcode.ST:
             self._execute_st()
+        elif self.program.opcode is Opcode.FAA:
+            self._execute_faa()
         elif is_arithmetic_instruction(self.program.opcode):
             self._execute_arithmetic()
-        elif self.program.opcode is Opcode.JMP:
-            self.signal_latch_pc(True)
-            self.tick()
-        elif self.program.opcode is Opcode.JZ:
-            self.signal_latch_pc(self.data_path.alu.zero)
-            self.tick()
+        elif self.program.opcode is Opcode.JMP or self.program.opcode is Opcode.JZ:
+            self._execute_jump()
 
     def decode_and_execute(self):
         ticks_before = self.get_current_tick()
         self.program_fetch()
         self.address_fetch()
         self.operand_fetch()
-        self.execute()
+        if self.metrics is None:
+            self.execute()
+        else:
+            try:
+                self.execute()
+            finally:
+                self.metrics.record(self.program, self.get_current_tick() - ticks_before)
         self._instruction_number += 1
         ticks_after = self.get_current_tick()
         self.logger.info(
@@ -274,36 +442,105 @@ class ControlUnit:
 
 
 def simulate(
-    instructions: list[Instruction], pc: int, input_text: str, debug_mode: bool = False
+    instructions: list[Instruction],
+    pc: int,
+    input_text: str,
+    debug_mode: bool = False,
+    memory_profile: MemoryProfile | None = None,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+    metrics: RunMetrics | None = None,
 ) -> tuple[str, DataPath, ControlUnit]:
-    data_path = DataPath(input_text, instructions)
+    """Запускает программу. Причина остановки - в `control_unit.halt_reason`.
+    Если переданы `metrics`, они заполняются, и после возврата отчет о прогоне - `metrics.report()`;
+    обращения к памяти записываются в `memory_profile`, если он передан.
+    """
+    data_path = DataPath(input_text, instructions, word_width, space)
+    data_path.profile = memory_profile
     data_path.logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
-    control_unit = ControlUnit(pc, data_path)
+    control_unit = ControlUnit(pc, data_path, metrics)
     control_unit.logger.setLevel(logging.DEBUG if debug_mode else logging.INFO)
+    control_unit.halt_reason = "limit"
+    started = time.perf_counter()
     try:
         for i in range(1000000):
             control_unit.decode_and_execute()
     except StopIteration:
+        control_unit.halt_reason = "halt"
         print("Program halted successfully")
     except EOFError:
+        control_unit.halt_reason = "eof"
         print("Program tried to read empty input")
+    except DivisionByZeroError:
+        control_unit.halt_reason = "trap"
+        print("Program trapped on division by zero")
+    if metrics is not None:
+        metrics.finish(data_path, control_unit, time.perf_counter() - started)
     return "".join(data_path.output), data_path, control_unit
 
 
-def main(code_file: str, input_file: str, debug: bool):
+def write_metrics(metrics: dict, metrics_file: str):
+    """Пишет отчет в JSON-файл или в stderr, если `metrics_file` равен `-`: stdout занят выводом программы."""
+    if metrics_file == "-":
+        print(json.dumps(metrics, indent=2), file=sys.stderr)
+        return
+    with open(metrics_file, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+
+def write_memory_profile(profile: MemoryProfile, profile_file: str):
+    """Пишет профиль памяти: CSV для файлов `.csv`, иначе текстовый отчет с тепловой картой (`-` - в stdout)."""
+    if profile_file == "-":
+        print(profile.report(), end="")
+        return
+    with open(profile_file, "w", encoding="utf-8", newline="") as f:
+        if profile_file.endswith(".csv"):
+            profile.write_csv(f)
+        else:
+            f.write(profile.report())
+
+
+def main(
+    code_file: str,
+    input_file: str,
+    debug: bool,
+    metrics_file: str | None = None,
+    profile_file: str | None = None,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+):
     with open(input_file) as f:
         input_text = f.read()
         input_text += "\0"
     with open(code_file) as f:
         instructions, pc = read_json(f.read())
-    output, _datapath, _control_unit = simulate(instructions, pc, input_text, debug)
+    profile = MemoryProfile(code_addresses(instructions)) if profile_file is not None else None
+    metrics = RunMetrics() if metrics_file is not None else None
+    output, _datapath, _control_unit = simulate(
+        instructions, pc, input_text, debug, profile, word_width, space, metrics
+    )
     print(output)
     print("Total instructions", _control_unit.get_instruction_number())
     print("Total ticks", _control_unit.get_current_tick())
+    if metrics_file is not None and metrics is not None:
+        write_metrics(metrics.report(), metrics_file)
+    if profile_file is not None and profile is not None:
+        write_memory_profile(profile, profile_file)
+
+
+def main_with_options(code_file: str, input_file: str, debug: bool, options: dict[str, str]):
+    """`main` с опциями командной строки в виде `cli.parse_arguments`."""
+    space = DEFAULT_SPACE._replace(**space_fields(options))
+    main(
+        code_file,
+        input_file,
+        debug,
+        options.get("metrics"),
+        options.get("memory-profile"),
+        word_width_option(options),
+        space,
+    )
 
 
 if __name__ == "__main__":
-    assert len(sys.argv) in [3, 4], "Wrong arguments: machine.py <code_file> <input_file> <debug: true | false>"
-    _, code_file, input_file = sys.argv[:3]
-    debug = (sys.argv[3].lower() == "true") if len(sys.argv) == 4 else False
-    main(code_file, input_file, debug)
+    main_with_options(*parse_arguments(sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""Тонкий клиент к `daemon.py`, заменяющий `machine.py` в командной строке.
+
+Аргументы и вывод те же, что у `machine.py`. Путь к сокету берется из `CSA_MACHINE_SOCKET`.
+Сначала отправляется только идентификатор программы, код - только если сервис его еще не знает.
+Разрядность слова и адресное пространство передаются сервису вместе с запросом.
+Если сервис недоступен, включен режим отладки (журнал пишет только эталонная модель)
+или запрошены `--metrics` и `--memory-profile` (их собирает только эталонная модель),
+программа исполняется локально через `machine.main_with_options`.
+
+Модуль не импортирует модель процессора, чтобы запуск клиента оставался дешевым.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import sys
+
+from cli import parse_arguments, space_fields
+
+LOCAL_OPTIONS = ("metrics", "memory-profile")
+DEFAULT_SOCKET = "/tmp/csa-machine.sock"
+
+
+def request(socket_path: str, payload: dict) -> dict:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps(payload).encode("utf-8") + b"\n")
+            f.flush()
+            return json.loads(f.readline())
+
+
+def machine_settings(options: dict[str, str]) -> dict:
+    """Поля запроса к сервису, соответствующие опциям `--word-width` и адресного пространства."""
+    settings: dict = {}
+    if "word-width" in options:
+        settings["word_width"] = int(options["word-width"])
+    if space := space_fields(options):
+        settings["space"] = space
+    return settings
+
+
+def run_remote(socket_path: str, code: str, input_text: str, settings: dict | None = None) -> dict:
+    settings = settings or {}
+    payload = {"program": hashlib.sha256(code.encode("utf-8")).hexdigest(), "input": input_text, **settings}
+    response = request(socket_path, payload)
+    if response.get("error") == "unknown program":
+        response = request(socket_path, {"code": code, "input": input_text, **settings})
+    return response
+
+
+def main(
+    code_file: str,
+    input_file: str,
+    debug: bool,
+    socket_path: str = DEFAULT_SOCKET,
+    options: dict[str, str] | None = None,
+):
+    options = options or {}
+    with open(input_file) as f:
+        input_text = f.read()
+    with open(code_file) as f:
+        code = f.read()
+    response = None
+    if not debug and not any(name in options for name in LOCAL_OPTIONS):
+        try:
+            response = run_remote(socket_path, code, input_text, machine_settings(options))
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+    if response is None:
+        import machine
+
+        machine.main_with_options(code_file, input_file, debug, options)
+        return
+    assert "error" not in response, response.get("error")
+    if response["halt_reason"] == "halt":
+        print("Program halted successfully")
+    elif response["halt_reason"] == "eof":
+        print("Program tried to read empty input")
+    elif response["halt_reason"] == "trap":
+        print("Program trapped on division by zero")
+    print(response["output"])
+    print("Total instructions", response["instructions"])
+    print("Total ticks", response["ticks"])
+
+
+if __name__ == "__main__":
+    code_file, input_file, debug, options = parse_arguments(sys.argv[1:], "machine_client.py")
+    main(code_file, input_file, debug, os.environ.get("CSA_MACHINE_SOCKET", DEFAULT_SOCKET), options)
@@ -0,0 +1,141 @@
+"""Адресное пространство и память машины.
+
+`AddressSpace` задает размер памяти и адреса портов. Порты перекрывают ячейки памяти
+с теми же адресами, поэтому программы со стандартными портами (2046/2047) работают
+и в адресном пространстве большего размера.
+
+Память до `DENSE_LIMIT` слов - обычный список. Большая память - `PagedMemory`:
+страницы по `PAGE_SIZE` слов выделяются при первой записи, а непрочитанные ячейки
+читаются как `Instruction(Opcode.VAR, 0)`, поэтому машина с мегасловами памяти
+не выделяет и не копирует все адресное пространство.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, MutableSequence, Sequence
+from typing import NamedTuple, overload
+
+from isa import Addressing, Instruction, Opcode
+
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+DENSE_LIMIT = 1 << 16
+
+EMPTY_CELL = Instruction(Opcode.VAR, 0, Addressing.IMMEDIATE)
+
+
+class AddressSpace(NamedTuple):
+    memory_size: int
+    input_port: int
+    output_port: int
+    dma_port: int
+
+    @property
+    def dma_ports(self) -> range:
+        """Регистры DMA: адрес буфера, длина и команда."""
+        return range(self.dma_port, self.dma_port + 3)
+
+    @property
+    def symbols(self) -> dict[str, int]:
+        """Имена портов для ассемблера: `INPUT`, `OUTPUT` и регистры DMA."""
+        address, length, control = self.dma_ports
+        return {
+            "INPUT": self.input_port,
+            "OUTPUT": self.output_port,
+            "DMA_ADDRESS": address,
+            "DMA_LENGTH": length,
+            "DMA_CONTROL": control,
+        }
+
+    @property
+    def ports(self) -> frozenset[int]:
+        return frozenset({self.input_port, self.output_port, *self.dma_ports})
+
+    @property
+    def plain_limit(self) -> int:
+        """Адреса `[0, plain_limit)` - ячейки памяти, не перекрытые портами."""
+        return min(self.memory_size, *self.ports)
+
+    def is_memory(self, address: int | None) -> bool:
+        return address is not None and 0 <= address < self.memory_size and address not in self.ports
+
+    def validate(self) -> AddressSpace:
+        assert self.memory_size > 0, "memory size should be positive"
+        assert min(self.ports) >= 0, "port addresses should not be negative"
+        assert len(self.ports) == 5, "port addresses should not overlap"
+        return self
+
+
+class PagedMemory(MutableSequence[Instruction]):
+    """Разреженная память фиксированного размера. Срезы возвращают список."""
+
+    def __init__(self, size: int, initial: Sequence[Instruction] = ()):
+        assert len(initial) <= size, "program does not fit into memory"
+        self.size = size
+        self.pages: dict[int, list[Instruction]] = {}
+        for address, instruction in enumerate(initial):
+            self[address] = instruction
+
+    def __len__(self) -> int:
+        return self.size
+
+    @overload
+    def __getitem__(self, index: int) -> Instruction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Instruction]: ...
+
+    def __getitem__(self, index: int | slice) -> Instruction | list[Instruction]:
+        if isinstance(index, slice):
+            return [self[address] for address in range(*index.indices(self.size))]
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        page = self.pages.get(index >> PAGE_BITS)
+        return EMPTY_CELL if page is None else page[index & (PAGE_SIZE - 1)]
+
+    def __setitem__(self, index, value):
+        assert isinstance(index, int), "only single cells can be written"
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        page = self.pages.get(index >> PAGE_BITS)
+        if page is None:
+            page = self.pages[index >> PAGE_BITS] = [EMPTY_CELL] * PAGE_SIZE
+        page[index & (PAGE_SIZE - 1)] = value
+
+    def __delitem__(self, index):
+        """Размер памяти фиксирован."""
+        raise TypeError
+
+    def insert(self, index: int, value: Instruction):
+        """Размер памяти фиксирован."""
+        raise TypeError
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or len(other) != self.size:
+            return False
+        if isinstance(other, PagedMemory):
+            empty = [EMPTY_CELL] * PAGE_SIZE
+            pages = self.pages.keys() | other.pages.keys()
+            return all(self.pages.get(page, empty) == other.pages.get(page, empty) for page in pages)
+        return all(a == b for a, b in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+def make_memory(size: int, initial: Sequence[Instruction] = ()) -> MutableSequence[Instruction]:
+    if size > DENSE_LIMIT:
+        return PagedMemory(size, initial)
+    assert len(initial) <= size, "program does not fit into memory"
+    memory = [EMPTY_CELL] * size
+    memory[: len(initial)] = initial
+    return memory
+
+
+def loaded_cells(memory: Sequence[Instruction]) -> Iterator[tuple[int, Instruction]]:
+    """Ячейки, которые могут отличаться от пустых: все для списка, выделенные страницы для `PagedMemory`."""
+    if not isinstance(memory, PagedMemory):
+        yield from enumerate(memory)
+        return
+    for page in sorted(memory.pages):
+        start = page << PAGE_BITS
+        yield from enumerate(memory.pages[page][: memory.size - start], start)
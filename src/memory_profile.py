@@ -0,0 +1,110 @@
+"""Профиль обращений к памяти.
+
+`DataPath` с подключенным `MemoryProfile` сообщает о каждом чтении и записи ячейки памяти
+(порты ввода-вывода не учитываются). Чтения делятся на выборку инструкции и выборку операнда
+(адреса при косвенной адресации, операнда, ячейки `FAA`), записи - на запись данных.
+Рабочее множество - количество различных адресов, к которым обращались в окне из `window` инструкций.
+Запись в ячейку, которая при загрузке была инструкцией или уже исполнялась, считается записью в код.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from enum import Enum
+from typing import TextIO
+
+from isa import Instruction, Opcode
+
+HEATMAP_LEVELS = " .:-=+*#%@"
+
+
+class Access(Enum):
+    FETCH = "fetch"
+    OPERAND = "operand"
+    STORE = "store"
+
+
+def code_addresses(memory: Sequence[Instruction]) -> list[int]:
+    return [address for address, instruction in enumerate(memory) if instruction.opcode is not Opcode.VAR]
+
+
+class MemoryProfile:
+    def __init__(self, code: Iterable[int] = (), window: int = 1000):
+        assert window > 0, "window should be positive"
+        self.counts: dict[Access, Counter[int]] = {access: Counter() for access in Access}
+        self.window = window
+        self.instructions = 0
+        self.window_addresses: set[int] = set()
+        self.working_sets: list[int] = []
+        self.code = set(code)
+        self.code_writes: list[tuple[int, int]] = []
+
+    def record(self, access: Access, address: int):
+        if access is Access.FETCH:
+            if self.instructions and self.instructions % self.window == 0:
+                self.working_sets.append(len(self.window_addresses))
+                self.window_addresses = set()
+            self.instructions += 1
+            self.code.add(address)
+        elif access is Access.STORE and address in self.code:
+            self.code_writes.append((self.instructions, address))
+        self.counts[access][address] += 1
+        self.window_addresses.add(address)
+
+    def working_set_sizes(self) -> list[int]:
+        """Размеры рабочего множества по окнам, включая незаконченное последнее."""
+        return self.working_sets + ([len(self.window_addresses)] if self.window_addresses else [])
+
+    def total(self, address: int) -> int:
+        return sum(counts[address] for counts in self.counts.values())
+
+    def addresses(self) -> list[int]:
+        return sorted(set().union(*self.counts.values()))
+
+    def write_csv(self, f: TextIO):
+        writer = csv.writer(f)
+        writer.writerow(["address", *[access.value for access in Access], "total"])
+        for address in self.addresses():
+            writer.writerow([address, *[self.counts[access][address] for access in Access], self.total(address)])
+
+    def heatmap(self, columns: int = 32) -> str:
+        """Текстовая карта обращений: строка на `columns` адресов, яркость символа - логарифм числа обращений.
+        Подряд идущие строки без обращений сворачиваются в `...`.
+        """
+        addresses = self.addresses()
+        if not addresses:
+            return ""
+        peak = math.log(max(self.total(address) for address in addresses) + 1)
+        touched = {address // columns for address in addresses}
+        rows: list[str] = []
+        for start in range(0, addresses[-1] + 1, columns):
+            if start // columns not in touched:
+                if not rows or rows[-1] != "  ...":
+                    rows += ["  ..."]
+                continue
+            cells = ""
+            for address in range(start, start + columns):
+                level = math.log(self.total(address) + 1) / peak if peak else 0
+                cells += HEATMAP_LEVELS[math.ceil(level * (len(HEATMAP_LEVELS) - 1))]
+            rows += [f"{start:5} |{cells}|"]
+        return "\n".join(rows) + "\n"
+
+    def report(self) -> str:
+        sizes = self.working_set_sizes()
+        lines = [
+            f"Accesses: {', '.join(f'{access.value} {self.counts[access].total()}' for access in Access)}",
+            f"Touched addresses: {len(self.addresses())}",
+        ]
+        if sizes:
+            lines += [
+                f"Working set per {self.window} instructions: min {min(sizes)}, "
+                f"avg {sum(sizes) / len(sizes):.1f}, max {max(sizes)}"
+            ]
+        lines += [
+            f"Write into code at instruction {instruction}: address {address}"
+            for instruction, address in self.code_writes
+        ]
+        return "\n".join(lines) + "\n\n" + self.heatmap()
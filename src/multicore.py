@@ -0,0 +1,184 @@
+"""Многоядерный режим: несколько `ControlUnit` с общей памятью.
+
+Каждое ядро - это `ControlUnit` со своим `CoreDataPath`: аккумулятор, АЛУ и регистры у ядра свои,
+а память, порты ввода-вывода и устройство DMA общие (`SharedBus`); буфер ввода передается ядру
+на время его кванта. Передачу DMA отрабатывает (простаивает) ядро, которое ее запустило.
+При старте аккумулятор ядра равен его номеру.
+Планировщик детерминированный: ядра по кругу исполняют по `quantum` инструкций.
+Так как переключение происходит только между инструкциями, `FAA` атомарна,
+а последовательность `LD (X); ADD 1; ST X` - нет.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+
+from alu import DivisionByZeroError
+from cli import space_fields, split_options, word_width_option
+from dma import DmaController
+from isa import Instruction, Opcode, read_json
+from machine import DEFAULT_SPACE, ControlUnit, DataPath
+from memory import AddressSpace, make_memory
+from memory_profile import Access
+
+
+class SharedBus:
+    """Общая память, порты ввода-вывода и устройство DMA."""
+
+    def __init__(self, instructions: list[Instruction], input_text: str, space: AddressSpace = DEFAULT_SPACE):
+        self.space = space.validate()
+        self.memory = make_memory(space.memory_size, instructions)
+        self.dma = DmaController(space.memory_size, space.dma_port)
+        self.input = input_text
+        self.output: list[str] = []
+        self.last_writer: dict[int, int] = {}
+
+
+class CoreDataPath(DataPath):
+    """DataPath ядра. Дополнительно считает обращения к ячейкам, которые последним писало другое ядро."""
+
+    def __init__(self, core_id: int, bus: SharedBus, word_width: int | None = None):
+        super().__init__(bus.input, word_width=word_width, space=bus.space, memory=bus.memory, dma=bus.dma)
+        self.bus = bus
+        self.core_id = core_id
+        self.output = bus.output
+        self.accumulator = core_id
+        self.shared_accesses = 0
+
+    def _count_access(self):
+        if not self.space.is_memory(self.address_register):
+            return
+        if self.bus.last_writer.get(self.address_register, self.core_id) != self.core_id:
+            self.shared_accesses += 1
+
+    def signal_read_memory(self, access: Access = Access.OPERAND):
+        self._count_access()
+        super().signal_read_memory(access)
+
+    def signal_write_memory(self):
+        self._count_access()
+        super().signal_write_memory()
+
+    def store_cell(self, address: int, value: int):
+        super().store_cell(address, value)
+        self.bus.last_writer[address] = self.core_id
+
+
+class MultiCoreMachine:
+    def __init__(
+        self,
+        instructions: list[Instruction],
+        pcs: list[int],
+        input_text: str,
+        quantum: int = 1,
+        debug_mode: bool = False,
+        word_width: int | None = None,
+        space: AddressSpace = DEFAULT_SPACE,
+    ):
+        assert len(pcs) > 0, "at least one core is required"
+        assert quantum > 0, "quantum should be positive"
+        self.bus = SharedBus(instructions, input_text, space)
+        self.quantum = quantum
+        self.cores: list[ControlUnit] = []
+        for core_id, pc in enumerate(pcs):
+            data_path = CoreDataPath(core_id, self.bus, word_width)
+            data_path.logger.setLevel(logging.DEBUG if debug_mode else logging.WARNING)
+            control_unit = ControlUnit(pc, data_path)
+            control_unit.logger.setLevel(logging.DEBUG if debug_mode else logging.WARNING)
+            self.cores.append(control_unit)
+        self.halt_reasons: list[str | None] = [None] * len(pcs)
+        self.faa_counts = [0] * len(pcs)
+
+    def _run_quantum(self, core_id: int) -> int:
+        """Исполняет квант ядра и возвращает количество исполненных инструкций."""
+        core = self.cores[core_id]
+        core.data_path.input = self.bus.input
+        executed = 0
+        try:
+            for _ in range(self.quantum):
+                core.decode_and_execute()
+                executed += 1
+                self.faa_counts[core_id] += core.program.opcode is Opcode.FAA
+        except StopIteration:
+            self.halt_reasons[core_id] = "halt"
+        except EOFError:
+            self.halt_reasons[core_id] = "eof"
+        except DivisionByZeroError:
+            self.halt_reasons[core_id] = "trap"
+        self.bus.input = core.data_path.input
+        return executed
+
+    def run(self, limit: int = 1000000) -> str:
+        """Исполняет ядра по кругу, пока все не остановятся или суммарно не будет исполнено `limit` инструкций.
+
+        Причины остановки отдельных ядер - в `halt_reasons`.
+        """
+        executed = 0
+        while executed < limit:
+            alive = [core_id for core_id, reason in enumerate(self.halt_reasons) if reason is None]
+            if not alive:
+                return "stopped"
+            for core_id in alive:
+                executed += self._run_quantum(core_id)
+        return "limit"
+
+    def output(self) -> str:
+        return "".join(self.bus.output)
+
+    def stats(self) -> list[dict[str, int | str | None]]:
+        result: list[dict[str, int | str | None]] = []
+        for core_id, core in enumerate(self.cores):
+            data_path = core.data_path
+            assert isinstance(data_path, CoreDataPath)
+            result.append(
+                {
+                    "core": core_id,
+                    "instructions": core.get_instruction_number(),
+                    "ticks": core.get_current_tick(),
+                    "memory_reads": data_path.memory_reads,
+                    "memory_writes": data_path.memory_writes,
+                    "shared_accesses": data_path.shared_accesses,
+                    "faa": self.faa_counts[core_id],
+                    "halt": self.halt_reasons[core_id],
+                }
+            )
+        return result
+
+
+def main(
+    code_file: str,
+    input_file: str,
+    cores: int,
+    quantum: int,
+    word_width: int | None = None,
+    space: AddressSpace = DEFAULT_SPACE,
+):
+    with open(input_file) as f:
+        input_text = f.read()
+        input_text += "\0"
+    with open(code_file) as f:
+        instructions, pc = read_json(f.read())
+    machine = MultiCoreMachine(instructions, [pc] * cores, input_text, quantum, word_width=word_width, space=space)
+    print("Scheduler finished:", machine.run())
+    print(machine.output())
+    for core in machine.stats():
+        print(
+            "Core {core}: instructions {instructions}, ticks {ticks}, reads {memory_reads}, writes {memory_writes}, "
+            "shared accesses {shared_accesses}, faa {faa}, halt {halt}".format(**core)
+        )
+    print("Total instructions", sum(core.get_instruction_number() for core in machine.cores))
+    print("Max ticks", max(core.get_current_tick() for core in machine.cores))
+
+
+if __name__ == "__main__":
+    args, options = split_options(sys.argv[1:])
+    assert len(args) in [3, 4], (
+        "Wrong arguments: multicore.py <code_file> <input_file> <cores> [quantum] [--word-width=<bits>] "
+        "[--memory-size=<words>] [--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+    )
+    code_file, input_file, cores = args[:3]
+    quantum = int(args[3]) if len(args) == 4 else 1
+    word_width = word_width_option(options)
+    space = DEFAULT_SPACE._replace(**space_fields(options))
+    main(code_file, input_file, int(cores), quantum, word_width, space)
@@ -4,7 +4,10 @@ import json
 import re
 import sys
 
-from isa import Addressing, Instruction, Opcode
+from cli import space_fields, split_options
+from isa import Addressing, Instruction, Opcode, instruction_ticks
+from machine import DEFAULT_SPACE
+from memory import AddressSpace
 
 
 def parse_int_or_none(a: str) -> int | None:
@@ -18,16 +21,24 @@ def is_label(s: str) -> bool:
     return s != "" and parse_int_or_none(s) is None and s[0] != "'" and s[-1] != "'"
 
 
-def parse_lines(lines: list[str]) -> tuple[list[Instruction], int]:
-    lines = expand_lines(remove_comment(lines))
+def parse_lines(lines: list[str], space: AddressSpace = DEFAULT_SPACE) -> tuple[list[Instruction], int]:
+    """Транслирует программу. Имена портов (`AddressSpace.symbols`) разрешаются по `space`,
+    метки программы с теми же именами их перекрывают.
+    """
+    return parse_expanded_lines(expand_lines(remove_comment(lines)), space)
+
+
+def parse_expanded_lines(lines: list[str], space: AddressSpace = DEFAULT_SPACE) -> tuple[list[Instruction], int]:
+    """Как `parse_lines`, но для строк, уже прошедших `remove_comment` и `expand_lines`."""
     instructions = []
     labels = parse_labels(lines)
+    symbols = {**space.symbols, **labels}
     for i in range(len(lines)):
         line = lines[i]
         if line.strip() == "":
             continue
         _, opcode, arg_raw = split_instruction(line)
-        arg, addressing = parse_argument(arg_raw, labels)
+        arg, addressing = parse_argument(arg_raw, symbols)
         instructions += [Instruction(Opcode[opcode], arg, addressing)]
     pc = labels["START"] if "START" in labels else 0
     return instructions, pc
@@ -136,18 +147,123 @@ def remove_comment(lines: list[str]) -> list[str]:
     return list(map(lambda line: line.split("#")[0].strip(), lines))
 
 
-def main(input_file, output_file):
+def _is_static_jump(instruction: Instruction) -> bool:
+    return instruction.opcode in {Opcode.JMP, Opcode.JZ} and instruction.addressing is Addressing.IMMEDIATE
+
+
+def _successors(instruction: Instruction, address: int) -> list[int]:
+    if _is_static_jump(instruction):
+        return [instruction.arg, address + 1] if instruction.opcode is Opcode.JZ else [instruction.arg]  # type: ignore[list-item]
+    if instruction.opcode in {Opcode.JMP, Opcode.JZ, Opcode.HLT}:
+        return []
+    return [address + 1]
+
+
+def _leaders(instructions: list[Instruction]) -> set[int]:
+    leaders = set()
+    for address, instruction in enumerate(instructions):
+        if instruction.opcode is Opcode.VAR:
+            continue
+        if address == 0 or _successors(instructions[address - 1], address - 1) != [address]:
+            leaders.add(address)
+        if _is_static_jump(instruction) and instruction.arg is not None:
+            leaders.add(instruction.arg)
+    return leaders
+
+
+def basic_blocks(instructions: list[Instruction]) -> list[range]:
+    """Делит код на базовые блоки. Ячейки `VAR` считаются данными и в блоки не входят."""
+    leaders = _leaders(instructions)
+    blocks = []
+    for start in sorted(leader for leader in leaders if 0 <= leader < len(instructions)):
+        end = start
+        while end < len(instructions) and instructions[end].opcode is not Opcode.VAR:
+            end += 1
+            if _successors(instructions[end - 1], end - 1) != [end] or end in leaders:
+                break
+        if end > start:
+            blocks.append(range(start, end))
+    return blocks
+
+
+def loop_bounds(instructions: list[Instruction]) -> list[tuple[int, int]]:
+    """Циклы как пары (заголовок, хвост) по обратным переходам `JMP`/`JZ` с непосредственной адресацией."""
+    return [
+        (instruction.arg, address)  # type: ignore[misc]
+        for address, instruction in enumerate(instructions)
+        if _is_static_jump(instruction) and instruction.arg is not None and instruction.arg <= address
+    ]
+
+
+def iteration_ticks(instructions: list[Instruction], header: int, tail: int) -> tuple[int, int] | None:
+    """Минимальная и максимальная стоимость итерации цикла `[header, tail]` в тактах.
+
+    Учитываются пути из заголовка обратно в заголовок по переходам вперед; выходы из цикла
+    и вложенные циклы не учитываются. None - если таких путей нет (например, переход косвенный).
+    """
+    costs: dict[int, tuple[int, int]] = {}
+    for address in range(tail, header - 1, -1):
+        paths = []
+        for successor in _successors(instructions[address], address):
+            if successor == header:
+                paths.append((0, 0))
+            elif address < successor <= tail and successor in costs:
+                paths.append(costs[successor])
+        if paths:
+            ticks = instruction_ticks(instructions[address])
+            costs[address] = (ticks + min(low for low, _ in paths), ticks + max(high for _, high in paths))
+    return costs.get(header)
+
+
+def annotate_lines(lines: list[str], space: AddressSpace = DEFAULT_SPACE) -> str:
+    """Строит листинг: адрес, метка, инструкция и ее статическая стоимость в тактах,
+    затем суммы по базовым блокам и стоимости итераций циклов.
+
+    Цикл - участок от цели обратного перехода до самого перехода, см. `iteration_ticks`.
+    Стоимость косвенных обращений к портам ввода-вывода такая же, как к памяти.
+    """
+    lines = [line for line in expand_lines(remove_comment(lines)) if line.strip() != ""]
+    instructions, _ = parse_expanded_lines(lines, space)
+    labels = {address: label for label, address in parse_labels(lines).items()}
+    listing = []
+    for address, (line, instruction) in enumerate(zip(lines, instructions)):
+        _, opcode, arg = split_instruction(line)
+        ticks = "-" if instruction.opcode is Opcode.VAR else str(instruction_ticks(instruction))
+        listing += [f"{address:5}  {labels.get(address, ''):16}{opcode:4}{arg:20}{ticks:>6}"]
+    listing += ["", "Basic blocks:"]
+    for block in basic_blocks(instructions):
+        block_ticks = sum(instruction_ticks(instructions[address]) for address in block)
+        name = f" ({labels[block.start]})" if block.start in labels else ""
+        listing += [f"{block.start:5}-{block.stop - 1:<5} {len(block):3} instr {block_ticks:5} ticks{name}"]
+    listing += ["", "Loops:"]
+    for header, tail in loop_bounds(instructions):
+        costs = iteration_ticks(instructions, header, tail)
+        cost = "?" if costs is None else str(costs[0]) if costs[0] == costs[1] else f"{costs[0]}..{costs[1]}"
+        name = f" ({labels[header]})" if header in labels else ""
+        listing += [f"{header:5}-{tail:<5} {tail - header + 1:3} instr {cost:>9} ticks per iteration{name}"]
+    return "\n".join(listing) + "\n"
+
+
+def main(input_file, output_file, listing_file=None, space: AddressSpace = DEFAULT_SPACE):
     with open(input_file, encoding="utf-8") as f:
         lines = f.readlines()
-    instructions, pc = parse_lines(lines)
+    instructions, pc = parse_lines(lines, space)
     json = convert_to_json(instructions, pc)
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(json)
     print(f"Input file LoC: {len(lines)}")
     print(f"Code instr: {len(instructions)}")
+    if listing_file is not None:
+        with open(listing_file, "w", encoding="utf-8") as f:
+            f.write(annotate_lines(lines, space))
 
 
 if __name__ == "__main__":
-    assert len(sys.argv) == 3, "Wrong arguments: translator.py <input_file> <target_file>"
-    _, input_file, output_file = sys.argv
-    main(input_file, output_file)
+    args, options = split_options(sys.argv[1:])
+    assert len(args) in [2, 3], (
+        "Wrong arguments: translator.py <input_file> <target_file> [listing_file] "
+        "[--memory-size=<words>] [--input-port=<address>] [--output-port=<address>] [--dma-port=<address>]"
+    )
+    input_file, target_file = args[:2]
+    listing_file = args[2] if len(args) == 3 else None
+    main(input_file, target_file, listing_file, DEFAULT_SPACE._replace(**space_fields(options)).validate())
@@ -1,6 +1,8 @@
 import unittest
 
-from alu import ALU
+import pytest
+
+from alu import ALU, DivisionByZeroError
 from isa import Opcode
 
 
@@ -12,3 +14,55 @@ class TestALU(unittest.TestCase):
         # -1 - 1
         alu.signal_alu_operation(Opcode.SUB)
         assert -2 == alu.out
+
+    def test_unbounded_by_default(self):
+        alu = ALU()
+        alu.signal_sel_left(2**40, True)
+        alu.signal_sel_right(2**40, True)
+        alu.signal_alu_operation(Opcode.MUL)
+        assert alu.out == 2**80
+        assert not alu.overflow
+        alu.signal_sel_left(2, True)
+        alu.signal_sel_right(-7, True)
+        alu.signal_alu_operation(Opcode.DIV)
+        assert alu.out == -4
+
+    def test_fixed_width_wraps_and_sets_flags(self):
+        alu = ALU(8)
+        for operation, right, left, out, carry, overflow in [
+            (Opcode.ADD, 127, 1, -128, False, True),
+            (Opcode.ADD, -1, 1, 0, True, False),
+            (Opcode.SUB, 0, 1, -1, True, False),
+            (Opcode.SUB, -128, 1, 127, False, True),
+            (Opcode.MUL, 16, 16, 0, True, True),
+            (Opcode.MUL, 300, 1, 44, False, False),
+            (Opcode.DIV, -7, 2, -3, False, False),
+            (Opcode.MOD, -7, 2, -1, False, False),
+            (Opcode.DIV, -128, -1, -128, False, True),
+        ]:
+            with self.subTest(operation=operation, right=right, left=left):
+                alu.signal_sel_left(left, True)
+                alu.signal_sel_right(right, True)
+                alu.signal_alu_operation(operation)
+                assert alu.out == out
+                assert alu.zero == (out == 0)
+                assert alu.negative == (out < 0)
+                assert alu.carry == carry
+                assert alu.overflow == overflow
+
+    def test_cmp_keeps_out(self):
+        alu = ALU(8)
+        alu.signal_sel_left(5, True)
+        alu.signal_sel_right(5, True)
+        alu.signal_alu_operation(Opcode.ADD)
+        alu.signal_alu_operation(Opcode.CMP)
+        assert alu.out == 10
+        assert alu.zero
+
+    def test_division_by_zero_traps(self):
+        for word_width, divisor in [(None, 0), (8, 0), (8, 256)]:
+            alu = ALU(word_width)
+            alu.signal_sel_left(divisor, True)
+            alu.signal_sel_right(1, True)
+            with pytest.raises(DivisionByZeroError):
+                alu.signal_alu_operation(Opcode.MOD)
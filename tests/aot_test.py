@@ -0,0 +1,134 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pytest
+
+from aot import AotMachine, generate_module, load_module, simulate_aot
+from isa import Instruction
+from machine import DataPath, simulate
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+
+def load(name: str) -> tuple[list[Instruction], int]:
+    with open(PROGRAMS / name, encoding="utf-8") as f:
+        return parse_lines(f.readlines())
+
+
+class AotTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.cache.name)
+
+    def tearDown(self):
+        self.cache.cleanup()
+
+    def assert_same_as_reference(self, instructions: list[Instruction], pc: int, input_text: str, limit: int):
+        output, data_path, control_unit = simulate(instructions, pc, input_text)
+        aot_output, aot_data_path, machine = simulate_aot(instructions, pc, input_text, limit, self.cache_dir)
+        assert aot_output == output
+        assert machine.get_instruction_number() == control_unit.get_instruction_number()
+        assert machine.get_current_tick() == control_unit.get_current_tick()
+        assert machine.program_counter == control_unit.program_counter
+        assert aot_data_path.accumulator == data_path.accumulator
+        assert aot_data_path.alu.zero == data_path.alu.zero
+        assert aot_data_path.alu.negative == data_path.alu.negative
+        assert aot_data_path.memory == data_path.memory
+        assert aot_data_path.input == data_path.input
+        return machine
+
+    def test_sample_programs(self):
+        for name, input_text in [
+            ("cat.asm", "hello world!!!\0"),
+            ("cat.asm", "abc"),
+            ("hello.asm", ""),
+            ("hello_username.asm", "Egor Fedorov\n\0"),
+            ("prob1.asm", ""),
+            ("sum.asm", ""),
+        ]:
+            with self.subTest(name):
+                instructions, pc = load(name)
+                machine = self.assert_same_as_reference(instructions, pc, input_text, 1000000)
+                assert machine.compiled_instructions * 2 > machine.get_instruction_number()
+
+    def test_limit_inside_block(self):
+        instructions, pc = load("prob1.asm")
+        data_path = DataPath("", instructions)
+        machine = AotMachine(pc, data_path, load_module(instructions, pc, self.cache_dir))
+        assert machine.run(1001) == "limit"
+        assert machine.get_instruction_number() == 1001
+
+    def test_indirect_port_access_falls_back(self):
+        lines = [
+            "IN: VAR 2046",
+            "OUT: VAR 2047",
+            "START: LD [IN]",
+            "ST (OUT)",
+            "CMP 0",
+            "JZ STOP",
+            "JMP START",
+            "STOP: HLT",
+        ]
+        instructions, pc = parse_lines(lines)
+        self.assert_same_as_reference(instructions, pc, "ab\0", 1000000)
+
+    def test_overwritten_block_is_not_executed(self):
+        lines = ["START: LD 1", "ST TARGET", "JMP TARGET", "TARGET: ADD 1", "HLT"]
+        instructions, pc = parse_lines(lines)
+        machine = AotMachine(pc, DataPath("", instructions), load_module(instructions, pc, self.cache_dir))
+        with pytest.raises(AssertionError, match="VAR"):
+            machine.run()
+        assert machine.stale == {3}
+        assert machine.get_instruction_number() == 3
+
+    def test_division_by_zero_is_interpreted(self):
+        lines = ["X: VAR 0", "START: LD 6", "DIV (X)", "HLT"]
+        instructions, pc = parse_lines(lines)
+        machine = AotMachine(pc, DataPath("", instructions), load_module(instructions, pc, self.cache_dir))
+        assert machine.run() == "trap"
+        assert machine.get_instruction_number() == 1
+        instructions, pc = parse_lines(["START: MOD (2046)", "HLT"])
+        machine = AotMachine(pc, DataPath("\0", instructions), load_module(instructions, pc, self.cache_dir))
+        assert machine.run() == "trap"
+        assert machine.get_instruction_number() == 0
+        assert machine.data_path.input == ""
+
+    def test_fixed_word_width_is_interpreted(self):
+        instructions, pc = load("prob1.asm")
+        output, _, control_unit = simulate(instructions, pc, "", word_width=12)
+        data_path = DataPath("", instructions, word_width=12)
+        machine = AotMachine(pc, data_path, load_module(instructions, pc, self.cache_dir))
+        assert machine.run() == "halt"
+        assert "".join(data_path.output) == output
+        assert machine.get_current_tick() == control_unit.get_current_tick()
+        assert machine.compiled_instructions == 0
+
+    def test_module_is_cached_on_disk(self):
+        instructions, pc = load("hello.asm")
+        load_module(instructions, pc, self.cache_dir)
+        [path] = self.cache_dir.iterdir()
+        assert path.read_text(encoding="utf-8") == generate_module(instructions, pc)
+        path.write_text(path.read_text(encoding="utf-8") + "CACHED = True\n", encoding="utf-8")
+        assert load_module(instructions, pc, self.cache_dir).CACHED
+
+    def test_faults_are_reproduced_by_interpreter(self):
+        for lines, input_text, executed in [
+            (["START: SUB 110", "ST 2047", "HLT"], "", 1),
+            (["P: VAR 3", "START: LD 3", "LD [P]", "HLT"], "", 1),
+        ]:
+            with self.subTest(lines[-2]):
+                instructions, pc = parse_lines(lines)
+                expected_error = None
+                try:
+                    simulate(instructions, pc, input_text)
+                except Exception as e:
+                    expected_error = type(e)
+                assert expected_error is not None
+                machine = AotMachine(
+                    pc, DataPath(input_text, instructions), load_module(instructions, pc, self.cache_dir)
+                )
+                with pytest.raises(expected_error):
+                    machine.run()
+                assert machine.get_instruction_number() == executed
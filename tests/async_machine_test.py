@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+from pathlib import Path
+
+from async_machine import AsyncRunner, input_reads, simulate_async
+from isa import Addressing, Instruction, Opcode
+from machine import DEFAULT_SPACE, ControlUnit, DataPath
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+CAT = ["START: LD (INPUT)", "ST OUTPUT", "CMP 0", "JZ STOP", "JMP START", "STOP: HLT"]
+
+
+class BufferWriter:
+    def __init__(self):
+        self.data = b""
+        self.drains = 0
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        self.drains += 1
+
+
+async def feed_slowly(reader: asyncio.StreamReader, chunks: list[bytes]):
+    for chunk in chunks:
+        await asyncio.sleep(0.001)
+        reader.feed_data(chunk)
+    reader.feed_eof()
+
+
+class AsyncMachineTest(unittest.TestCase):
+    def test_input_reads(self):
+        memory = [Instruction(Opcode.VAR, 2046, Addressing.IMMEDIATE)]
+        assert input_reads(Instruction(Opcode.LD, 2046, Addressing.DIRECT), memory, 1) == 1
+        assert input_reads(Instruction(Opcode.LD, 0, Addressing.INDIRECT), memory, 1) == 1
+        assert input_reads(Instruction(Opcode.LD, 2046, Addressing.IMMEDIATE), memory, 1) == 0
+
+    def test_streaming_cat(self):
+        instructions, pc = parse_lines(CAT)
+
+        async def run():
+            reader = asyncio.StreamReader()
+            writer = BufferWriter()
+            feeder = asyncio.create_task(feed_slowly(reader, [b"he", b"llo ", "мир".encode()[:3], "мир".encode()[3:]]))
+            reason, _, _ = await simulate_async(instructions, pc, reader, writer)
+            await feeder
+            return reason, writer
+
+        reason, writer = asyncio.run(run())
+        assert reason == "halt"
+        assert writer.data == "hello мир\0".encode()
+        assert writer.drains == len("hello мир\0")
+
+    def test_address_space(self):
+        space = DEFAULT_SPACE._replace(memory_size=1 << 20, input_port=500000, output_port=500001)
+        instructions, pc = parse_lines(CAT, space)
+
+        async def run():
+            reader = asyncio.StreamReader()
+            writer = BufferWriter()
+            feeder = asyncio.create_task(feed_slowly(reader, [b"ab", b"c"]))
+            reason, data_path, _ = await simulate_async(instructions, pc, reader, writer, word_width=8, space=space)
+            await feeder
+            return reason, writer, data_path
+
+        reason, writer, data_path = asyncio.run(run())
+        assert reason == "halt"
+        assert writer.data == b"abc\0"
+        assert (data_path.space, data_path.alu.word_width) == (space, 8)
+
+    def test_dma_read_from_open_stream(self):
+        with open(PROGRAMS / "cat_dma.asm", encoding="utf-8") as f:
+            instructions, pc = parse_lines(f.readlines())
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"abc\0")
+            writer = BufferWriter()
+            reason, _, _ = await asyncio.wait_for(simulate_async(instructions, pc, reader, writer), timeout=3)
+            return reason, writer.data
+
+        assert asyncio.run(run()) == ("halt", b"abc")
+
+    def test_concurrent_machines(self):
+        instructions, pc = parse_lines(CAT)
+
+        async def run_one(text: bytes):
+            reader = asyncio.StreamReader()
+            reader.feed_data(text)
+            reader.feed_eof()
+            data_path = DataPath("", instructions)
+            control_unit = ControlUnit(pc, data_path)
+            writer = BufferWriter()
+            await AsyncRunner(control_unit, reader, writer, yield_every=1).run()
+            return writer.data
+
+        async def run():
+            return await asyncio.gather(run_one(b"first"), run_one(b"second"))
+
+        assert asyncio.run(run()) == [b"first\0", b"second\0"]
@@ -0,0 +1,79 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import builder
+import translator
+from isa import read_json
+from machine import DEFAULT_SPACE
+
+PROGRAMS = Path(__file__).parent / "in"
+
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sources = Path(self.directory.name) / "src"
+        self.images = Path(self.directory.name) / "out"
+        shutil.copytree(PROGRAMS, self.sources / "programs")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_images_match_translator(self):
+        report = builder.build(self.sources, self.images)
+        assert len(report.translated) == len(list(PROGRAMS.glob("*.asm")))
+        for name in report.translated:
+            target = Path(self.directory.name) / "target.json"
+            translator.main(self.sources / name, target)
+            assert (self.images / builder.image_name(name)).read_text(encoding="utf-8") == target.read_text(
+                encoding="utf-8"
+            )
+        with open(self.images / builder.MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+        assert manifest["toolchain"] == builder.toolchain_hash()
+        assert manifest["images"]["programs/hello.asm"]["image"] == "programs/hello.json"
+
+    def test_unchanged_sources_are_skipped(self):
+        builder.build(self.sources, self.images)
+        report = builder.build(self.sources, self.images)
+        assert report.translated == []
+        assert len(report.unchanged) == len(list(PROGRAMS.glob("*.asm")))
+        (self.sources / "programs" / "sum.asm").write_text("START: HLT\n", encoding="utf-8")
+        (self.images / "programs" / "cat.json").unlink()
+        (self.sources / "programs" / "hello.asm").unlink()
+        report = builder.build(self.sources, self.images)
+        assert sorted(report.translated) == ["programs/cat.asm", "programs/sum.asm"]
+        assert report.removed == ["programs/hello.asm"]
+        assert not (self.images / "programs" / "hello.json").exists()
+
+    def test_space_change_rebuilds_images(self):
+        builder.build(self.sources, self.images)
+        space = DEFAULT_SPACE._replace(input_port=3000, output_port=3001)
+        report = builder.build(self.sources, self.images, space=space)
+        assert len(report.translated) == len(list(PROGRAMS.glob("*.asm")))
+        instructions, _ = read_json((self.images / "programs" / "cat.json").read_text(encoding="utf-8"))
+        assert [instruction.arg for instruction in instructions[:2]] == [3000, 3001]
+        assert builder.build(self.sources, self.images, space=space).translated == []
+        assert builder.toolchain_hash(space) != builder.toolchain_hash()
+        assert {"machine.py", "memory.py", "dma.py"} <= set(builder.TOOLCHAIN_FILES)
+
+    def test_failures_do_not_stop_build(self):
+        builder.build(self.sources, self.images)
+        (self.sources / "programs" / "cat.asm").write_text("START: JMP NOWHERE\n", encoding="utf-8")
+        report = builder.build(self.sources, self.images)
+        assert list(report.failed) == ["programs/cat.asm"]
+        assert not (self.images / "programs" / "cat.json").exists()
+        assert "programs/cat.asm" not in builder.read_manifest(self.images)
+        assert builder.build(self.sources, self.images).failed == report.failed
+
+    def test_process_pool(self):
+        for i in range(builder.POOL_THRESHOLD):
+            shutil.copy(PROGRAMS / "prob1.asm", self.sources / f"copy{i}.asm")
+        report = builder.build(self.sources, self.images, jobs=2)
+        assert not report.failed
+        assert (self.images / "copy0.json").read_text(encoding="utf-8") == (
+            self.images / "programs" / "prob1.json"
+        ).read_text(encoding="utf-8")
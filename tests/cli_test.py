@@ -0,0 +1,29 @@
+import contextlib
+import io
+import unittest
+
+import pytest
+
+from cli import parse_arguments, space_fields
+
+
+class CliTest(unittest.TestCase):
+    def test_arguments(self):
+        assert parse_arguments(["code.json", "input.txt"]) == ("code.json", "input.txt", False, {})
+        code_file, input_file, debug, options = parse_arguments(
+            ["code.json", "--word-width=16", "input.txt", "True", "--metrics=-", "--memory-size=65536"]
+        )
+        assert (code_file, input_file, debug) == ("code.json", "input.txt", True)
+        assert options == {"word-width": "16", "metrics": "-", "memory-size": "65536"}
+        assert space_fields(options) == {"memory_size": 65536}
+
+    def test_usage_errors(self):
+        for argv in [["code.json"], ["a", "b", "true", "extra"], ["a", "b", "--speed=2"], ["a", "b", "--metrics"]]:
+            with (
+                self.subTest(argv),
+                contextlib.redirect_stderr(io.StringIO()) as stderr,
+                pytest.raises(SystemExit) as exit_info,
+            ):
+                parse_arguments(argv, "machine_client.py")
+            assert exit_info.value.code == 2
+            assert stderr.getvalue().startswith("usage: machine_client.py <code_file> <input_file>")
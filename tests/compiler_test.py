@@ -0,0 +1,94 @@
+import unittest
+from pathlib import Path
+
+import pytest
+
+import compiler
+from machine import simulate
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+
+def run(source: str, input_text: str = "") -> tuple[str, int]:
+    instructions, pc = parse_lines(compiler.compile_source(source))
+    output, _, control_unit = simulate(instructions, pc, input_text)
+    return output, control_unit.get_current_tick()
+
+
+class CompilerTest(unittest.TestCase):
+    def test_programs(self):
+        cases = [
+            ("a = 7 b = 3 print a - b * 2 putc ' ' print (a + b) * (a - b) / 4 % 7", "", "1 3"),
+            ("x = -5 print 0 - x putc ' ' print x * -3 putc ' ' print 3 - x", "", "5 15 8"),
+            ("a = getc - getc print a putc ' ' print (getc - '0') * 10 + getc - '0'", "9242", "7 42"),
+            (
+                "i = 0 while i != 3 { j = 0 while j != 2 { print i * 10 + j putc ' ' j = j + 1 } i = i + 1 }",
+                "",
+                "0 1 10 11 20 21 ",
+            ),
+            (
+                'n = 10 if n == 10 { print "ten" } else { print "other" } if n != 10 { } else if n - 10 { } else { print "!" }',
+                "",
+                "ten!",
+            ),
+            (
+                "a = 1 b = 0 if a and b { putc 1 } if a or b { putc 2 } if not b { putc 3 } if not a == 1 or b { putc 4 }",
+                "",
+                "\2\3",
+            ),
+            ("c = getc while c { if c != ' ' { putc c } c = getc }", "a b c\0", "abc"),
+            ('while 1 == 0 { print "no" } i = 2 while i { i = i - 1 print i } print "\\t\\"#"', "", '10\t"#'),
+        ]
+        for source, input_text, expected in cases:
+            with self.subTest(source):
+                assert run(source, input_text)[0] == expected
+
+    def test_division_by_zero_traps(self):
+        instructions, pc = parse_lines(compiler.compile_source("x = 3 print x / 0"))
+        _, _, control_unit = simulate(instructions, pc, "")
+        assert control_unit.halt_reason == "trap"
+
+    def test_constants_become_initial_values(self):
+        assert compiler.compile_source((PROGRAMS / "sum.src").read_text(encoding="utf-8")) == [
+            "START: HLT",
+            "v_result: VAR 15",
+        ]
+
+    def test_accumulator_is_kept_between_statements(self):
+        assert compiler.compile_source("x = getc y = x + 1 putc y") == [
+            "START: LD (INPUT)",
+            "ST v_x",
+            "ADD 1",
+            "ST v_y",
+            "ST OUTPUT",
+            "HLT",
+            "v_x: VAR 0",
+            "v_y: VAR 0",
+        ]
+
+    def test_temporaries_are_reused(self):
+        lines = compiler.compile_source("a = getc b = (a - 1) * (a - 2) - (a - 3) * (a - 4) c = (b - 1) - (a - 2)")
+        assert [line for line in lines if line.startswith("T")] == ["T0: VAR 0", "T1: VAR 0"]
+        assert run("a = getc b = (a - 1) * (a - 2) - (a - 3) * (a - 4) print b", "\7")[0] == "18"
+
+    def test_beats_hand_written_programs(self):
+        comparisons = {comparison.baseline: comparison for comparison in compiler.benchmark(PROGRAMS)}
+        assert set(comparisons) == {"cat", "cat_dma", "hello", "hello_dma", "prob1", "sum"}
+        for comparison in comparisons.values():
+            with self.subTest(comparison.baseline):
+                assert comparison.name == comparison.baseline.removesuffix("_dma")
+                if comparison.baseline != "cat_dma":
+                    assert comparison.same_output
+                    assert comparison.compiled_ticks <= comparison.hand_ticks
+        assert comparisons["prob1"].compiled_ticks < comparisons["prob1"].hand_ticks
+        # строки выводятся через DMA: против DMA-варианта выигрыша нет, против посимвольного - есть
+        assert comparisons["hello"].compiled_ticks == comparisons["hello_dma"].hand_ticks
+        assert comparisons["hello"].compiled_ticks < comparisons["hello"].hand_ticks
+        # cat_dma читает ввод блоком и не выводит завершающий ноль, в языке такого чтения нет
+        assert not comparisons["cat_dma"].same_output
+
+    def test_syntax_errors(self):
+        for source in ["x = ", "while x { x = 1", "if = 1", "x = 'ab'", "x = $"]:
+            with self.subTest(source), pytest.raises(AssertionError):
+                compiler.compile_source(source)
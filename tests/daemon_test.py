@@ -0,0 +1,99 @@
+import asyncio
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import machine
+import machine_client
+from daemon import SimulatorService, program_id
+from translator import convert_to_json, parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+CAT = ["START: LD (2046)", "ST 2047", "CMP 0", "JZ STOP", "JMP START", "STOP: HLT"]
+
+
+class DaemonTest(unittest.TestCase):
+    def test_cache_and_engines(self):
+        instructions, pc = parse_lines(CAT)
+        code = convert_to_json(instructions, pc)
+
+        async def run():
+            service = SimulatorService(jobs=2, max_programs=1)
+            unknown = await service.execute({"program": program_id(code), "input": "x"})
+            loaded = await service.execute({"code": code, "input": "abc"})
+            by_id = await service.execute({"program": program_id(code), "input": "abc", "engine": "reference"})
+            limited = await service.execute({"program": program_id(code), "input": "abc", "limit": 3})
+            await service.execute({"source": "START: HLT"})
+            evicted = await service.execute({"program": program_id(code)})
+            return unknown, loaded, by_id, limited, evicted
+
+        unknown, loaded, by_id, limited, evicted = asyncio.run(run())
+        assert unknown == {"error": "unknown program"}
+        assert loaded["program"] == program_id(code)
+        assert loaded["output"] == "abc\0"
+        assert loaded["halt_reason"] == "halt"
+        assert (by_id["output"], by_id["instructions"], by_id["ticks"]) == (
+            loaded["output"],
+            loaded["instructions"],
+            loaded["ticks"],
+        )
+        assert limited["halt_reason"] == "limit"
+        assert limited["instructions"] == 3
+        assert evicted == {"error": "unknown program"}
+
+    def test_client_is_drop_in(self):
+        remote, requests, local = run_client(runs=2)
+        assert remote == local * 2
+        # первый запуск: неизвестный идентификатор и повтор с кодом, второй - только идентификатор
+        assert requests == 3
+
+    def test_client_passes_machine_options(self):
+        options = {"word-width": "16", "memory-size": "4096", "dma-port": "4000"}
+        remote, requests, local = run_client(options)
+        assert remote == local
+        assert requests == 2
+        assert remote != run_client()[0]
+
+    def test_client_runs_metrics_locally(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics = str(Path(tmp) / "metrics.json")
+            remote, requests, local = run_client({"metrics": metrics})
+            assert Path(metrics).exists()
+        assert remote == local
+        assert requests == 0
+
+
+def run_client(options: dict[str, str] | None = None, runs: int = 1) -> tuple[str, int, str]:
+    """Запускает prob1 через клиент и сервис `runs` раз и локально через `machine.py` с теми же опциями.
+
+    Возвращает вывод клиента, число запросов к сервису и локальный вывод.
+    """
+    options = options or {}
+    with tempfile.TemporaryDirectory() as tmp:
+        code_file, input_file = str(Path(tmp) / "prob1.json"), str(Path(tmp) / "input.txt")
+        with open(PROGRAMS / "prob1.asm", encoding="utf-8") as f:
+            instructions, pc = parse_lines(f.readlines())
+        Path(code_file).write_text(convert_to_json(instructions, pc), encoding="utf-8")
+        Path(input_file).write_text("", encoding="utf-8")
+        socket_path = str(Path(tmp) / "machine.sock")
+
+        async def run():
+            service = SimulatorService()
+            ready = asyncio.Event()
+            server = asyncio.create_task(service.serve(socket_path, ready))
+            await ready.wait()
+            remote = io.StringIO()
+            for _ in range(runs):
+                with contextlib.redirect_stdout(remote), contextlib.redirect_stderr(io.StringIO()):
+                    await asyncio.to_thread(machine_client.main, code_file, input_file, False, socket_path, options)
+            server.cancel()
+            return remote.getvalue(), service.requests
+
+        remote, requests = asyncio.run(run())
+        local = io.StringIO()
+        with contextlib.redirect_stdout(local), contextlib.redirect_stderr(io.StringIO()):
+            machine.main_with_options(code_file, input_file, False, options)
+    return remote, requests, local.getvalue()
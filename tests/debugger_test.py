@@ -0,0 +1,113 @@
+import unittest
+
+from debugger import Debugger
+from machine import DEFAULT_SPACE
+from memory import loaded_cells
+from translator import parse_lines
+
+COUNTER = [
+    "I: VAR 0",
+    "START: LD (I)",
+    "ADD 1",
+    "ST I",
+    "ST OUTPUT",
+    "CMP 'z'",
+    "JZ STOP",
+    "JMP START",
+    "STOP: HLT",
+]
+LABELS = {"I": 0, "START": 1, "STOP": 8}
+
+
+def make_debugger(**kwargs) -> Debugger:
+    instructions, pc = parse_lines(COUNTER)
+    return Debugger(instructions, pc, "", LABELS, **kwargs)
+
+
+def machine_state(debugger: Debugger) -> tuple:
+    cu, dp = debugger.control_unit, debugger.data_path
+    return (
+        cu.get_instruction_number(),
+        cu.get_current_tick(),
+        cu.program_counter,
+        dp.accumulator,
+        dp.alu.zero,
+        list(loaded_cells(dp.memory)),
+        list(dp.output),
+        (dp.memory_reads, dp.memory_writes, dp.input_bytes, dp.output_bytes),
+    )
+
+
+class DebuggerTest(unittest.TestCase):
+    def test_reverse_step_restores_state(self):
+        debugger = make_debugger(snapshot_interval=7, max_snapshots=1000)
+        states = [machine_state(debugger)]
+        while debugger.step():
+            states.append(machine_state(debugger))
+        assert debugger.halt_reason == "halt"
+        for position in [len(states) - 2, 100, 13, 7, 6, 0]:
+            debugger.goto(position)
+            assert machine_state(debugger) == states[position]
+        debugger.reverse_step()
+        assert machine_state(debugger) == states[0]
+
+    def test_breakpoint_and_reverse_continue(self):
+        debugger = make_debugger(snapshot_interval=5)
+        debugger.add_breakpoint("STOP")
+        assert debugger.continue_()
+        assert debugger.control_unit.program_counter == LABELS["STOP"]
+        assert debugger.data_path.memory[0].arg == ord("z")
+        debugger.remove_breakpoint("STOP")
+        debugger.add_breakpoint("START")
+        position = debugger.position
+        assert debugger.reverse_continue()
+        assert debugger.control_unit.program_counter == LABELS["START"]
+        assert debugger.position == position - 6
+        assert debugger.data_path.memory[0].arg == ord("z") - 1
+
+    def test_watchpoint(self):
+        debugger = make_debugger(snapshot_interval=3)
+        debugger.add_watchpoint("I")
+        assert debugger.continue_()
+        assert debugger.position == 3
+        assert debugger.data_path.memory[0].arg == 1
+        assert debugger.continue_()
+        assert debugger.data_path.memory[0].arg == 2
+        assert debugger.reverse_continue()
+        assert debugger.position == 3
+        assert not debugger.reverse_continue()
+        assert debugger.position == 0
+
+    def test_history_is_bounded(self):
+        debugger = make_debugger(snapshot_interval=10, max_snapshots=4)
+        while debugger.step():
+            pass
+        assert len(debugger.snapshots) == 4
+        horizon = debugger.snapshots[0].position
+        assert all(entry.position >= horizon for entry in debugger.data_path.journal)
+        debugger.goto(horizon)
+        assert debugger.position == horizon
+
+    def test_address_space(self):
+        space = DEFAULT_SPACE._replace(memory_size=1 << 20, output_port=700000)
+        instructions, pc = parse_lines(COUNTER, space)
+        debugger = Debugger(instructions, pc, "", LABELS, 5, 1000, word_width=8, space=space)
+        states = [machine_state(debugger)]
+        while debugger.step():
+            states.append(machine_state(debugger))
+        assert "".join(debugger.data_path.output) == "".join(chr(c) for c in range(1, ord("z") + 1))
+        debugger.goto(12)
+        assert machine_state(debugger) == states[12]
+
+    def test_rewind_restores_alu_flags(self):
+        instructions, pc = parse_lines(["START: LD 200", "ADD 100", "LD 1", "HLT"])
+        debugger = Debugger(instructions, pc, "", {}, snapshot_interval=1, word_width=8)
+        debugger.goto(3)
+        flags = (debugger.data_path.alu.carry, debugger.data_path.alu.overflow)
+        assert flags == (True, False)
+        debugger.reverse_step(2)
+        debugger.step()
+        debugger.step()
+        assert (debugger.data_path.alu.carry, debugger.data_path.alu.overflow) == flags
+        debugger.goto(0)
+        assert (debugger.data_path.alu.carry, debugger.data_path.alu.overflow) == (False, False)
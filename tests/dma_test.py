@@ -0,0 +1,109 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+import pytest
+
+from aot import simulate_aot
+from async_machine import simulate_async
+from debugger import Debugger
+from dma import DMA_ADDRESS_PORT, DMA_CONTROL_PORT, DMA_LENGTH_PORT, DMA_READ, DmaController
+from fast_machine import simulate_fast
+from isa import Instruction
+from machine import simulate
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+
+class BufferWriter:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        pass
+
+
+def load(name: str) -> tuple[list[Instruction], int]:
+    with open(PROGRAMS / name, encoding="utf-8") as f:
+        return parse_lines(f.readlines())
+
+
+class DmaTest(unittest.TestCase):
+    def test_hello_in_one_transfer(self):
+        instructions, pc = load("hello_dma.asm")
+        output, data_path, control_unit = simulate(instructions, pc, "")
+        assert output == "hello, world"
+        assert control_unit.get_instruction_number() == 4
+        # 4 инструкции по 2 такта, HLT и 13 прочитанных ячеек (12 символов и ноль)
+        assert control_unit.get_current_tick() == 4 * 2 + 1 + 13
+        assert data_path.output_bytes == 12
+        _, _, reference = simulate(*load("hello.asm"), "")
+        assert reference.get_instruction_number() > 20 * control_unit.get_instruction_number()
+
+    def test_cat_reads_block_into_memory(self):
+        instructions, pc = load("cat_dma.asm")
+        output, data_path, _ = simulate(instructions, pc, "hello\0rest")
+        assert output == "hello"
+        assert data_path.input == "rest"
+        assert data_path.input_bytes == 6
+        buffer = len(instructions) - 1
+        assert [cell.arg for cell in data_path.memory[buffer : buffer + 6]] == [*map(ord, "hello"), 0]
+
+    def test_registers(self):
+        dma = DmaController(16)
+        cells: dict[int, int] = {}
+        rest, _, ticks = dma.write_register(DMA_ADDRESS_PORT, 10, "abcdef", cells.get, cells.__setitem__)
+        assert (rest, ticks) == ("abcdef", 0)
+        dma.write_register(DMA_LENGTH_PORT, 4, rest, cells.get, cells.__setitem__)
+        rest, output, ticks = dma.write_register(DMA_CONTROL_PORT, DMA_READ, rest, cells.get, cells.__setitem__)
+        assert (rest, output, ticks) == ("ef", [], 4)
+        assert cells == {10: 97, 11: 98, 12: 99, 13: 100}
+        assert [dma.read_register(port) for port in [DMA_ADDRESS_PORT, DMA_LENGTH_PORT, DMA_CONTROL_PORT]] == [10, 4, 4]
+        dma.write_register(DMA_ADDRESS_PORT, 14, rest, cells.get, cells.__setitem__)
+        with pytest.raises(AssertionError):
+            dma.write_register(DMA_CONTROL_PORT, DMA_READ, "xyz", cells.get, cells.__setitem__)
+
+    def test_engines_match_reference(self):
+        for name, input_text in [("hello_dma.asm", ""), ("cat_dma.asm", "hello world!!!\0")]:
+            instructions, pc = load(name)
+            output, data_path, control_unit = simulate(instructions, pc, input_text)
+            with tempfile.TemporaryDirectory() as cache_dir:
+                runs = [
+                    simulate_fast(instructions, pc, input_text),
+                    simulate_aot(instructions, pc, input_text, cache_dir=Path(cache_dir)),
+                ]
+                for engine_output, engine_data_path, machine in runs:
+                    with self.subTest(name, engine=type(machine).__name__):
+                        assert engine_output == output
+                        assert machine.get_current_tick() == control_unit.get_current_tick()
+                        assert engine_data_path.memory == data_path.memory
+                        assert engine_data_path.dma.count == data_path.dma.count
+
+    def test_transfer_is_reverted_by_debugger(self):
+        instructions, pc = load("cat_dma.asm")
+        debugger = Debugger(instructions, pc, "abc\0")
+        memory = list(debugger.data_path.memory)
+        debugger.goto(4)
+        assert debugger.data_path.memory != memory
+        debugger.goto(0)
+        assert debugger.data_path.memory == memory
+        assert debugger.data_path.input == "abc\0"
+
+    def test_streaming_transfer(self):
+        instructions, pc = load("cat_dma.asm")
+        writer = BufferWriter()
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"stream")
+            reader.feed_eof()
+            reason, _, _ = await simulate_async(instructions, pc, reader, writer)
+            return reason
+
+        assert asyncio.run(run()) == "halt"
+        assert writer.data == b"stream"
@@ -0,0 +1,102 @@
+import unittest
+from pathlib import Path
+
+from fast_machine import FastMachine, simulate_fast
+from isa import Addressing, Instruction, Opcode
+from machine import DataPath, simulate
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+
+def load(name: str) -> tuple[list[Instruction], int]:
+    with open(PROGRAMS / name, encoding="utf-8") as f:
+        return parse_lines(f.readlines())
+
+
+class FastMachineTest(unittest.TestCase):
+    def assert_same_as_reference(self, instructions: list[Instruction], pc: int, input_text: str):
+        output, data_path, control_unit = simulate(instructions, pc, input_text)
+        for fusion in [False, True]:
+            fast_output, fast_data_path, machine = simulate_fast(instructions, pc, input_text, fusion)
+            assert fast_output == output
+            assert machine.get_instruction_number() == control_unit.get_instruction_number()
+            assert machine.get_current_tick() == control_unit.get_current_tick()
+            assert machine.program_counter == control_unit.program_counter
+            assert fast_data_path.accumulator == data_path.accumulator
+            assert fast_data_path.alu.zero == data_path.alu.zero
+            assert fast_data_path.alu.negative == data_path.alu.negative
+            assert fast_data_path.memory == data_path.memory
+            assert fast_data_path.input == data_path.input
+
+    def test_sample_programs(self):
+        for name, input_text in [
+            ("cat.asm", "hello world!!!\0"),
+            ("hello.asm", ""),
+            ("hello_username.asm", "Egor Fedorov\n\0"),
+            ("prob1.asm", ""),
+            ("sum.asm", ""),
+        ]:
+            with self.subTest(name):
+                instructions, pc = load(name)
+                self.assert_same_as_reference(instructions, pc, input_text)
+
+    def test_fixed_word_width(self):
+        for name, input_text in [("prob1.asm", ""), ("sum.asm", ""), ("hello_username.asm", "Egor Fedorov\n\0")]:
+            with self.subTest(name):
+                instructions, pc = load(name)
+                output, data_path, control_unit = simulate(instructions, pc, input_text, word_width=12)
+                fast_output, fast_data_path, machine = simulate_fast(instructions, pc, input_text, word_width=12)
+                assert fast_output == output
+                assert machine.get_current_tick() == control_unit.get_current_tick()
+                assert fast_data_path.memory == data_path.memory
+                assert (fast_data_path.alu.carry, fast_data_path.alu.overflow) == (
+                    data_path.alu.carry,
+                    data_path.alu.overflow,
+                )
+                assert not machine.kernels
+
+    def test_loads_are_wrapped_to_word_width(self):
+        for lines, accumulator in [
+            (["START: LD 70000", "HLT"], 70000 - 65536),
+            (["X: VAR 40000", "START: LD (X)", "HLT"], 40000 - 65536),
+            (["X: VAR 40000", "START: LD (X)", "ST 100", "HLT"], 40000 - 65536),
+            (["X: VAR 65536", "START: LD 0", "FAA X", "HLT"], 0),
+        ]:
+            with self.subTest(lines):
+                instructions, pc = parse_lines(lines)
+                _, data_path, _ = simulate(instructions, pc, "", word_width=16)
+                _, fast_data_path, _ = simulate_fast(instructions, pc, "", word_width=16)
+                assert data_path.accumulator == accumulator
+                assert fast_data_path.accumulator == accumulator
+                assert fast_data_path.memory == data_path.memory
+
+    def test_empty_input(self):
+        instructions, pc = load("cat.asm")
+        self.assert_same_as_reference(instructions, pc, "abc")
+
+    def test_fusions_are_used(self):
+        instructions, pc = load("hello.asm")
+        machine = FastMachine(pc, DataPath("", instructions))
+        assert machine.run() == "halt"
+        assert machine.fused_dispatches > 0
+        assert machine.fused_dispatches * 2 < machine.get_instruction_number()
+
+    def test_self_modifying_write_unfuses(self):
+        lines = [
+            "START: LD (X)",
+            "CMP 0",
+            "JZ DONE",
+            "LD 0",
+            "ST 1",  # replaces `CMP 0` with data
+            "JMP START",
+            "DONE: HLT",
+            "X: VAR 1",
+        ]
+        instructions, pc = parse_lines(lines)
+        machine = FastMachine(pc, DataPath("", instructions))
+        assert 0 in machine.fused
+        machine.run(limit=6)
+        assert 0 not in machine.fused
+        assert 1 not in machine.fused
+        assert machine.memory[1] == Instruction(Opcode.VAR, 0, Addressing.IMMEDIATE)
@@ -0,0 +1,91 @@
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from fuzz import Case, Outcome, ProgramGenerator, default_engines, fast_engine, fuzz, remove_instruction, run_reference
+from isa import Addressing, Instruction, Opcode
+from machine import DEFAULT_SPACE
+from translator import parse_lines
+
+
+def sub_as_add(case: Case, limit: int) -> Outcome:
+    """Движок с ошибкой: исполняет SUB как ADD."""
+    instructions = [
+        Instruction(Opcode.ADD, instruction.arg, instruction.addressing)
+        if instruction.opcode is Opcode.SUB
+        else instruction
+        for instruction in case.instructions
+    ]
+    return fast_engine(False, False)(case._replace(instructions=instructions), limit)
+
+
+class FuzzTest(unittest.TestCase):
+    def test_engines_match_reference(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            failures, throughput = fuzz(default_engines(Path(cache_dir)), 40, seed=7)
+        assert failures == []
+        assert set(throughput) == {"reference", "fast", "fast-plain", "aot"}
+        assert len({instructions for instructions, _ in throughput.values()}) == 1
+
+    def test_engines_match_reference_with_machine_options(self):
+        large = DEFAULT_SPACE._replace(memory_size=1 << 20)
+        moved = DEFAULT_SPACE._replace(memory_size=100000, input_port=90000, output_port=90001, dma_port=90002)
+        cases = [
+            {"dma": True},
+            {"word_width": 8},
+            {"space": large},
+            {"dma": True, "word_width": 12, "space": moved},
+        ]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            engines = default_engines(Path(cache_dir))
+            for options in cases:
+                with self.subTest(**options):
+                    failures, _ = fuzz(engines, 30, seed=11, **options)
+                    assert failures == []
+
+    def test_trap_compares_ticks(self):
+        instructions, pc = parse_lines(["START: LD 5", "DIV 0", "HLT"])
+        expected = run_reference(Case(instructions, pc, ""), 10)
+        assert expected.stop == "trap"
+        assert expected.differences(expected._replace(ticks=expected.ticks + 1)) == ["ticks"]
+
+    def test_generated_programs_are_valid(self):
+        generator = ProgramGenerator(random.Random(1))
+        for _ in range(20):
+            case = generator.generate()
+            assert case.instructions[-1].opcode is Opcode.HLT
+            assert run_reference(case, 100).stop in {"halt", "eof", "limit", "trap", "ValueError", "AssertionError"}
+
+    def test_generator_options(self):
+        space = DEFAULT_SPACE._replace(memory_size=1 << 20, dma_port=3000)
+        generator = ProgramGenerator(random.Random(2), dma=True, word_width=8, space=space)
+        cases = [generator.generate() for _ in range(20)]
+        assert all((case.word_width, case.space) == (8, space) for case in cases)
+        stores = {
+            instruction.arg
+            for case in cases
+            for instruction in case.instructions[case.pc :]
+            if instruction.opcode is Opcode.ST and instruction.addressing is Addressing.IMMEDIATE
+        }
+        assert set(space.dma_ports) <= stores
+        pointers = {instruction.arg for case in cases for instruction in case.instructions[: case.pc]}
+        assert any(address >= space.memory_size - 4 for address in pointers)
+
+    def test_shrinks_failing_program(self):
+        failures, _ = fuzz({"broken": sub_as_add}, 5, seed=3, limit=300)
+        assert len(failures) > 0
+        for failure in failures:
+            code = failure.case.instructions[failure.case.pc :]
+            assert len(code) <= 4
+            assert any(instruction.opcode is Opcode.SUB for instruction in code)
+
+    def test_remove_instruction_shifts_code_addresses(self):
+        instructions, pc = parse_lines(["X: VAR 0", "START: LD 1", "ADD 2", "ST X", "ST 4", "JMP START", "JZ 5"])
+        case = remove_instruction(Case(instructions, pc, ""), 2)
+        assert case.instructions[2:] == [
+            Instruction(Opcode.ST, 0, Addressing.IMMEDIATE),
+            Instruction(Opcode.ST, 3, Addressing.IMMEDIATE),
+            Instruction(Opcode.JMP, 1, Addressing.IMMEDIATE),
+            Instruction(Opcode.JZ, 4, Addressing.IMMEDIATE),
+        ]
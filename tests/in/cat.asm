@@ -1,5 +1,5 @@
-START: LD (2046)
-ST 2047
+START: LD (INPUT)
+ST OUTPUT
 CMP 0
 JZ STOP
 JMP START
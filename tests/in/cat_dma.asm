@@ -0,0 +1,8 @@
+START: LD BUFFER
+ST DMA_ADDRESS
+LD 1
+ST DMA_CONTROL
+LD 2
+ST DMA_CONTROL
+HLT
+BUFFER: VAR 0
@@ -3,7 +3,7 @@ I: VAR HELLO
 START: LD [I]
 CMP 0
 JZ STOP
-ST 2047
+ST OUTPUT
 LD (I)
 ADD 1
 ST I
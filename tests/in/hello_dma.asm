@@ -0,0 +1,6 @@
+HELLO: VAR 'hello, world'
+START: LD HELLO
+ST DMA_ADDRESS
+LD 2
+ST DMA_CONTROL
+HLT
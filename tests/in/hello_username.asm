@@ -9,7 +9,7 @@ ST I
 PRINT_PROMPT: LD [I]
 CMP 0
 JZ PREPARE_INPUT
-ST 2047
+ST OUTPUT
 LD (I)
 ADD 1
 ST I
@@ -17,8 +17,8 @@ JMP PRINT_PROMPT
 PREPARE_INPUT: LD (BUFFER_START)
 ST I
 LD 10
-ST 2047
-CYCLE: LD (2046)
+ST OUTPUT
+CYCLE: LD (INPUT)
 ST (I)
 CMP 0
 JZ PRINT_GREETING
@@ -31,7 +31,7 @@ ST I
 GREETING_CYCLE: LD [I]
 CMP 0
 JZ PRINT_USERNAME
-ST 2047
+ST OUTPUT
 LD (I)
 ADD 1
 ST I
@@ -44,7 +44,7 @@ JZ SKIP_NEWLINE
 LD [I]
 CMP 0
 JZ PRINT_SUFFIX
-ST 2047
+ST OUTPUT
 SKIP_NEWLINE: LD (I)
 ADD 1
 ST I
@@ -54,7 +54,7 @@ ST I
 SUFFIX_CYCLE: LD [I]
 CMP 0
 JZ STOP
-ST 2047
+ST OUTPUT
 LD (I)
 ADD 1
 ST I
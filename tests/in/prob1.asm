@@ -31,7 +31,7 @@ CMP 0
 JZ PRINT
 JMP PREPARE_STR
 PRINT: LD [RESULT_STR]
-ST 2047
+ST OUTPUT
 LD (RESULT_STR)
 SUB 1
 ST RESULT_STR
@@ -1,7 +1,13 @@
+import contextlib
+import io
+import json
+import tempfile
 import unittest
+from pathlib import Path
 
-from machine import ControlUnit, DataPath, simulate
-from translator import parse_lines
+import machine
+from machine import ControlUnit, DataPath, RunMetrics, simulate
+from translator import convert_to_json, parse_lines
 
 
 class IntegrationTest(unittest.TestCase):
@@ -93,3 +99,33 @@ class IntegrationTest(unittest.TestCase):
             i += 1
         buffer += "\0"
         assert buffer == name
+
+    def test_metrics(self):
+        lines = ["X: VAR 0", "START: LD (2046)", "ST X", "ST 2047", "HLT"]
+        instructions, pc = parse_lines(lines)
+        metrics = RunMetrics()
+        _, _, control_unit = simulate(instructions, pc, "a", metrics=metrics)
+        report = metrics.report()
+        assert report["halt_reason"] == "halt"
+        assert report["instructions"] == 3
+        assert report["ticks"] == control_unit.get_current_tick()
+        assert sum(counters["ticks"] for counters in report["by_opcode"].values()) == report["ticks"]
+        assert report["by_opcode"]["st"]["instructions"] == 2
+        assert report["memory"] == {"reads": 4, "writes": 1}
+        assert report["io"] == {"input_bytes": 1, "output_bytes": 1}
+        json.dumps(report)
+
+    def test_metrics_to_stderr(self):
+        instructions, pc = parse_lines(["START: LD (2046)", "ST 2047", "HLT"])
+        with tempfile.TemporaryDirectory() as tmp:
+            code_file, input_file = str(Path(tmp) / "code.json"), str(Path(tmp) / "input.txt")
+            Path(code_file).write_text(convert_to_json(instructions, pc), encoding="utf-8")
+            Path(input_file).write_text("a", encoding="utf-8")
+            with (
+                contextlib.redirect_stdout(io.StringIO()) as stdout,
+                contextlib.redirect_stderr(io.StringIO()) as stderr,
+            ):
+                machine.main(code_file, input_file, False, "-")
+        assert "{" not in stdout.getvalue()
+        log = stderr.getvalue()
+        assert json.loads(log[log.index("{") :])["io"] == {"input_bytes": 1, "output_bytes": 1}
@@ -0,0 +1,83 @@
+import unittest
+from pathlib import Path
+
+from fast_machine import FastMachine
+from loops import analyze_loop, compile_loop, find_loops
+from machine import ControlUnit, DataPath
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+COUNTDOWN = [
+    "N: VAR 10",
+    "SUM: VAR 0",
+    "START: LD (SUM)",
+    "ADD (N)",
+    "ST SUM",
+    "LD (N)",
+    "SUB 1",
+    "ST N",
+    "JZ STOP",
+    "JMP START",
+    "STOP: HLT",
+]
+
+
+def run_reference(lines: list[str], limit: int) -> tuple[DataPath, ControlUnit]:
+    instructions, pc = parse_lines(lines)
+    data_path = DataPath("", instructions)
+    control_unit = ControlUnit(pc, data_path)
+    try:
+        for _ in range(limit):
+            control_unit.decode_and_execute()
+    except StopIteration:
+        pass
+    return data_path, control_unit
+
+
+class LoopsTest(unittest.TestCase):
+    def test_find_loops_in_prob1(self):
+        with open(PROGRAMS / "prob1.asm", encoding="utf-8") as f:
+            instructions, _ = parse_lines(f.readlines())
+        loops = find_loops(instructions)
+        # the main loop only: the others use indirect stores or the output port
+        assert [(loop.header, loop.tail) for loop in loops] == [(3, 18)]
+        assert loops[0].reads == {0, 1, 2}
+        assert loops[0].writes == {0, 1}
+
+    def test_reject_io_and_self_modification(self):
+        instructions, _ = parse_lines(["START: LD (2046)", "ST 2047", "JMP START"])
+        assert analyze_loop(instructions, 0, 2) is None
+        instructions, _ = parse_lines(["START: LD 1", "ST 1", "JMP START"])
+        assert analyze_loop(instructions, 0, 2) is None
+
+    def test_kernel_respects_budget(self):
+        instructions, _ = parse_lines(COUNTDOWN)
+        kernel = compile_loop(instructions, find_loops(instructions)[0])
+        result = kernel.function(instructions, 0, True, False, 0, 17)
+        assert result.pc == 2
+        assert result.instructions == 16
+        assert result.cells == (8, 19)
+
+    def test_matches_reference_at_any_limit(self):
+        for limit in [5, 8, 9, 40, 1000]:
+            data_path, control_unit = run_reference(COUNTDOWN, limit)
+            instructions, pc = parse_lines(COUNTDOWN)
+            fast_data_path = DataPath("", instructions)
+            machine = FastMachine(pc, fast_data_path)
+            machine.run(limit)
+            assert machine.fast_forwards > 0 or limit < 8
+            assert machine.get_instruction_number() == control_unit.get_instruction_number()
+            assert machine.get_current_tick() == control_unit.get_current_tick()
+            assert machine.program_counter == control_unit.program_counter
+            assert fast_data_path.accumulator == data_path.accumulator
+            assert fast_data_path.alu.zero == data_path.alu.zero
+            assert fast_data_path.memory == data_path.memory
+
+    def test_division_by_zero_falls_back(self):
+        lines = ["X: VAR 3", "START: LD 6", "DIV (X)", "LD (X)", "SUB 1", "ST X", "JMP START"]
+        instructions, pc = parse_lines(lines)
+        machine = FastMachine(pc, DataPath("", instructions))
+        assert machine.run() == "trap"
+        assert machine.get_instruction_number() == 3 * 6 + 1
+        assert machine.memory[0].arg == 0
@@ -0,0 +1,38 @@
+import io
+import unittest
+
+from machine import simulate
+from memory_profile import Access, MemoryProfile, code_addresses
+from translator import parse_lines
+
+
+class MemoryProfileTest(unittest.TestCase):
+    def test_access_split(self):
+        lines = ["X: VAR 5", "P: VAR 0", "START: LD [P]", "ADD (X)", "ST X", "ST 2047", "HLT"]
+        instructions, pc = parse_lines(lines)
+        profile = MemoryProfile(code_addresses(instructions), window=2)
+        simulate(instructions, pc, "", memory_profile=profile)
+        assert profile.counts[Access.FETCH] == {2: 1, 3: 1, 4: 1, 5: 1, 6: 1}
+        assert profile.counts[Access.OPERAND] == {0: 2, 1: 1}
+        assert profile.counts[Access.STORE] == {0: 1}
+        assert profile.working_set_sizes() == [4, 3, 1]
+        assert profile.code_writes == []
+        f = io.StringIO()
+        profile.write_csv(f)
+        assert f.getvalue().splitlines()[:2] == ["address,fetch,operand,store,total", "0,0,2,1,3"]
+
+    def test_write_into_code(self):
+        lines = ["START: LD 0", "ST PATCH", "HLT", "PATCH: HLT"]
+        instructions, pc = parse_lines(lines)
+        profile = MemoryProfile(code_addresses(instructions))
+        simulate(instructions, pc, "", memory_profile=profile)
+        assert profile.code_writes == [(2, 3)]
+        assert "Write into code at instruction 2: address 3" in profile.report()
+
+    def test_heatmap(self):
+        profile = MemoryProfile()
+        for _ in range(9):
+            profile.record(Access.OPERAND, 1)
+        profile.record(Access.STORE, 2)
+        profile.record(Access.STORE, 100)
+        assert profile.heatmap(columns=4) == "    0 | @- |\n  ...\n  100 |-   |\n"
@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pytest
+
+from aot import AotMachine, load_module
+from fast_machine import simulate_fast
+from isa import Addressing, Instruction, Opcode
+from machine import DEFAULT_SPACE, DataPath, simulate
+from memory import EMPTY_CELL, PAGE_SIZE, AddressSpace, PagedMemory, loaded_cells, make_memory
+from translator import parse_lines
+
+PROGRAMS = Path(__file__).parent / "in"
+
+BIG_BUFFER = [
+    "P: VAR 1000000",
+    "START: LD 'h'",
+    "ST (P)",
+    "LD (P)",
+    "ADD 1",
+    "ST P",
+    "LD 'i'",
+    "ST (P)",
+    "LD 1000000",
+    "ST 2048",
+    "LD 2",
+    "ST 2050",
+    "HLT",
+]
+
+
+class MemoryTest(unittest.TestCase):
+    def test_paged_memory(self):
+        memory = PagedMemory(3 * PAGE_SIZE, [Instruction(Opcode.HLT, None, None)])
+        assert len(memory) == 3 * PAGE_SIZE
+        assert memory[0].opcode is Opcode.HLT
+        assert memory[2 * PAGE_SIZE + 5] == EMPTY_CELL
+        memory[2 * PAGE_SIZE + 5] = Instruction(Opcode.VAR, 7)
+        assert sorted(memory.pages) == [0, 2]
+        assert memory[2 * PAGE_SIZE + 4 : 2 * PAGE_SIZE + 7] == [EMPTY_CELL, Instruction(Opcode.VAR, 7), EMPTY_CELL]
+        assert [address for address, _ in loaded_cells(memory)][-1] == 3 * PAGE_SIZE - 1
+        assert len(list(loaded_cells(memory))) == 2 * PAGE_SIZE
+        dense = [EMPTY_CELL] * (3 * PAGE_SIZE)
+        dense[0], dense[2 * PAGE_SIZE + 5] = memory[0], memory[2 * PAGE_SIZE + 5]
+        assert memory == dense
+        assert dense == memory
+        assert memory != PagedMemory(3 * PAGE_SIZE)
+        with pytest.raises(IndexError):
+            memory[3 * PAGE_SIZE] = EMPTY_CELL
+
+    def test_make_memory(self):
+        assert isinstance(make_memory(DEFAULT_SPACE.memory_size), list)
+        assert isinstance(make_memory(1 << 20), PagedMemory)
+
+    def test_address_space(self):
+        space = AddressSpace(1 << 20, 2046, 2047, 2048)
+        assert space.plain_limit == 2046
+        assert not space.is_memory(2047)
+        assert space.is_memory(3000)
+        with pytest.raises(AssertionError):
+            AddressSpace(100, 100, 101, 101).validate()
+
+    def test_megaword_buffer(self):
+        instructions, pc = parse_lines(BIG_BUFFER)
+        space = AddressSpace(1 << 22, 2046, 2047, 2048)
+        output, data_path, control_unit = simulate(instructions, pc, "", space=space)
+        assert output == "hi"
+        assert len(data_path.memory.pages) == 2  # type: ignore[attr-defined]
+        fast_output, fast_data_path, machine = simulate_fast(instructions, pc, "", space=space)
+        assert fast_output == output
+        assert machine.get_current_tick() == control_unit.get_current_tick()
+        assert fast_data_path.memory == data_path.memory
+
+    def test_ports_after_memory(self):
+        with open(PROGRAMS / "prob1.asm", encoding="utf-8") as f:
+            lines = f.readlines()
+        space = AddressSpace(4096, 4096, 4097, 4098)
+        instructions, pc = parse_lines(lines, space)
+        assert Instruction(Opcode.ST, 4097, Addressing.IMMEDIATE) in instructions
+        output, _, control_unit = simulate(instructions, pc, "", space=space)
+        with open(PROGRAMS / "prob1.asm", encoding="utf-8") as f:
+            assert output == simulate(*parse_lines(f.readlines()), "")[0]
+        fast_output, _, machine = simulate_fast(instructions, pc, "", space=space)
+        assert fast_output == output
+        assert machine.get_current_tick() == control_unit.get_current_tick()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            data_path = DataPath("", instructions, space=space)
+            aot = AotMachine(pc, data_path, load_module(instructions, pc, Path(cache_dir)))
+            assert aot.run() == "halt"
+            assert "".join(data_path.output) == output
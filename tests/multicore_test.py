@@ -0,0 +1,90 @@
+import unittest
+
+from fast_machine import simulate_fast
+from isa import Addressing, Instruction, Opcode, instruction_ticks
+from machine import DEFAULT_SPACE, simulate
+from memory import PagedMemory
+from multicore import MultiCoreMachine
+from translator import parse_lines
+
+TICKETS = [
+    "TICKET: VAR 0",
+    "SUM: VAR 0",
+    "START: LD 1",
+    "FAA TICKET",
+    "CMP 100",
+    "JZ STOP",
+    "CMP 101",
+    "JZ STOP",
+    "FAA SUM",
+    "JMP START",
+    "STOP: HLT",
+]
+
+
+class MultiCoreTest(unittest.TestCase):
+    def test_faa(self):
+        lines = ["X: VAR 40", "START: LD 2", "FAA X", "HLT"]
+        instructions, pc = parse_lines(lines)
+        _, data_path, control_unit = simulate(instructions, pc, "")
+        assert data_path.memory[0].arg == 42
+        assert data_path.accumulator == 40
+        assert control_unit.get_current_tick() == 2 + 3 + 1
+        assert instruction_ticks(Instruction(Opcode.FAA, 0, Addressing.IMMEDIATE)) == 3
+        _, fast_data_path, machine = simulate_fast(instructions, pc, "")
+        assert fast_data_path.memory == data_path.memory
+        assert machine.get_current_tick() == control_unit.get_current_tick()
+
+    def test_atomic_ticket_sum(self):
+        instructions, pc = parse_lines(TICKETS)
+        machine = MultiCoreMachine(instructions, [pc, pc], "")
+        assert machine.run() == "stopped"
+        assert machine.bus.memory[1].arg == sum(range(100))
+        stats = machine.stats()
+        assert sum(core["faa"] for core in stats) == 102 + 100
+        assert all(core["shared_accesses"] > 0 for core in stats)
+
+    def test_cores_have_private_accumulators(self):
+        lines = ["START: ADD 10", "ST 2047", "HLT"]
+        instructions, pc = parse_lines(lines)
+        machine = MultiCoreMachine(instructions, [pc, pc, pc], "")
+        machine.run()
+        assert machine.output() == "\n\x0b\x0c"
+
+    def test_non_atomic_increment_loses_updates(self):
+        increment = ["LD (C)", "ADD 1", "ST C"]
+        racy, _ = parse_lines(["C: VAR 0", *increment * 3, "HLT"])
+        machine = MultiCoreMachine(racy, [1, 1], "")
+        machine.run()
+        assert machine.bus.memory[0].arg == 3
+        atomic, _ = parse_lines(["C: VAR 0", *["LD 1", "FAA C"] * 3, "HLT"])
+        machine = MultiCoreMachine(atomic, [1, 1], "")
+        machine.run()
+        assert machine.bus.memory[0].arg == 6
+
+    def test_shared_input(self):
+        lines = ["START: LD (2046)", "ST 2047", "HLT"]
+        instructions, pc = parse_lines(lines)
+        machine = MultiCoreMachine(instructions, [pc, pc], "ab")
+        machine.run()
+        assert machine.output() == "ab"
+
+    def test_address_space_and_shared_dma(self):
+        space = DEFAULT_SPACE._replace(memory_size=1 << 20)
+        lines = ["TEXT: VAR 'hi'", "START: LD TEXT", "ST 2048", "LD 2", "ST 2050", "LD 1", "FAA 100000", "HLT"]
+        instructions, pc = parse_lines(lines)
+        machine = MultiCoreMachine(instructions, [pc, pc], "", space=space)
+        assert machine.run() == "stopped"
+        assert machine.output() == "hihi"
+        assert isinstance(machine.bus.memory, PagedMemory)
+        assert machine.bus.memory[100000].arg == 2
+        data_paths = [core.data_path for core in machine.cores]
+        assert all(data_path.memory is machine.bus.memory for data_path in data_paths)
+        assert all(data_path.dma is machine.bus.dma for data_path in data_paths)
+        assert machine.bus.dma.count == 2
+
+    def test_word_width(self):
+        instructions, pc = parse_lines(["START: LD 127", "ADD 1", "HLT"])
+        machine = MultiCoreMachine(instructions, [pc], "", word_width=8)
+        machine.run()
+        assert machine.cores[0].data_path.accumulator == -128
@@ -1,9 +1,20 @@
 import unittest
+from pathlib import Path
 
 import pytest
 
 from isa import Addressing, Instruction, Opcode
-from translator import expand_lines, parse_labels, parse_lines, remove_comment, split_instruction
+from memory import AddressSpace
+from translator import (
+    annotate_lines,
+    basic_blocks,
+    expand_lines,
+    iteration_ticks,
+    parse_labels,
+    parse_lines,
+    remove_comment,
+    split_instruction,
+)
 
 
 class TestTranslator(unittest.TestCase):
@@ -116,6 +127,14 @@ class TestTranslator(unittest.TestCase):
         ]
         assert expand_lines(lines) == expected
 
+    def test_port_names(self):
+        lines = ["START: LD (INPUT)", "ST OUTPUT", "ST DMA_ADDRESS", "ST DMA_LENGTH", "ST [DMA_CONTROL]", "ST OUTPUT"]
+        args = [instruction.arg for instruction in parse_lines(lines)[0]]
+        assert args == [2046, 2047, 2048, 2049, 2050, 2047]
+        space = AddressSpace(1 << 20, 1 << 19, 5, 100)
+        assert [instruction.arg for instruction in parse_lines(lines, space)[0]] == [1 << 19, 5, 100, 101, 102, 5]
+        assert parse_lines(["OUTPUT: VAR 0", "START: ST OUTPUT"])[0][1].arg == 0
+
     def test_label_duplicate(self):
         lines = ["LABEL: HLT", "LABEL: HLT"]
         pytest.raises(AssertionError, lambda: parse_lines(lines))
@@ -125,3 +144,42 @@ class TestTranslator(unittest.TestCase):
         expected = ["", "VAR 'a'"]
         actual = remove_comment(lines)
         assert actual == expected
+
+    def test_basic_blocks_and_loops(self):
+        lines = [
+            "X: VAR 3",
+            "START: LD (X)",
+            "SUB 1",
+            "JZ STOP",
+            "ST X",
+            "JMP START",
+            "STOP: HLT",
+        ]
+        instructions, _ = parse_lines(lines)
+        assert basic_blocks(instructions) == [range(1, 4), range(4, 6), range(6, 7)]
+        assert iteration_ticks(instructions, 1, 5) == (3 + 2 + 2 + 2 + 2,) * 2
+        listing = annotate_lines(lines)
+        assert "    1  START           LD  (X)                      3" in listing
+        assert "    1-3       3 instr     7 ticks (START)" in listing
+        assert "    1-5       5 instr        11 ticks per iteration (START)" in listing
+
+    def test_listing_with_strings(self):
+        for name, size, loop in [
+            ("hello.asm", 23, "   14-21      8 instr        19 ticks per iteration (START)"),
+            ("hello_username.asm", 88, "   66-76     11 instr    17..27 ticks per iteration (USERNAME_CYCLE)"),
+        ]:
+            with open(Path(__file__).parent / "in" / name, encoding="utf-8") as f:
+                lines = f.readlines()
+            instructions, pc = parse_lines(lines)
+            listing = annotate_lines(lines).split("\n")
+            assert len(instructions) == size
+            assert [row[:5] for row in listing[:size]] == [f"{address:5}" for address in range(size)]
+            assert listing[size] == ""
+            assert listing[pc].split()[1] == "START"
+            assert not listing[pc].endswith("-")
+            assert loop in listing
+
+    def test_iteration_ticks_over_branches(self):
+        lines = ["START: LD 1", "JZ SKIP", "ADD (0)", "SKIP: JMP START"]
+        instructions, _ = parse_lines(lines)
+        assert iteration_ticks(instructions, 0, 3) == (2 + 2 + 2, 2 + 2 + 3 + 2)